@@ -63,6 +63,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         raise credentials_exception
     return user
 
+async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+    if current_user.is_deleted or current_user.status == models.UserStatus.INACTIVE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    return current_user
+
 # Middleware multi-tenant
 class TenantMiddleware:
     def __init__(self, tenant_header: str = "X-Tenant-ID"):
@@ -14,7 +14,32 @@ class Settings(BaseSettings):
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
     
     SECRET_KEY: str = "dev-secret-key-change-in-production"
-    
+
+    # Índice de disponibilidade em memória (a verificação via SQL continua como fallback).
+    # Só atende consultas: com vários workers pode ficar até o TTL desatualizado,
+    # por isso criação e alteração de agendamentos sempre consultam o banco.
+    AVAILABILITY_INDEX_ENABLED: bool = False
+    AVAILABILITY_INDEX_WINDOW_DAYS: int = 60
+    AVAILABILITY_INDEX_TTL_SECONDS: int = 300
+
+    # Cache do calendário mensal invalidado pelas escritas deste processo.
+    # Só é consistente com um único worker: com vários, as escritas de um
+    # worker não invalidam os demais e o calendário pode ficar até
+    # CALENDAR_CACHE_TTL_SECONDS desatualizado.
+    CALENDAR_CACHE_ENABLED: bool = False
+    CALENDAR_CACHE_MAX_ENTRIES: int = 1000
+    CALENDAR_CACHE_TTL_SECONDS: int = 30
+
+    # Importações em segundo plano (arquivo lido em blocos de IMPORT_CHUNK_SIZE linhas)
+    IMPORT_WORKERS: int = 2
+    IMPORT_CHUNK_SIZE: int = 1000
+    IMPORT_JOBS_MAX_FINISHED: int = 200
+
+    # dry_run: blocos maiores, validados em shards por um pool de processos (0 = nº de CPUs)
+    IMPORT_DRY_RUN_CHUNK_SIZE: int = 50000
+    IMPORT_VALIDATION_SHARD_ROWS: int = 5000
+    IMPORT_VALIDATION_PROCESSES: int = 0
+
     class Config:
         env_file = ".env"
 
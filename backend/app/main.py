@@ -1,10 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routes import auth, tenants, users, roles, appointments, categories, products, schedules
+from app.routes import auth, tenants, users, roles, appointments, categories, products, schedules, imports
 
-# Criar tabelas no banco de dados
-Base.metadata.create_all(bind=engine)
+# Tabelas e índices são criados pelas migrações: alembic upgrade head
 
 app = FastAPI(
     title="Medschedule - Sistema de Agendamento Multi-tenant",
@@ -22,6 +20,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # Incluir rotas
@@ -33,6 +32,8 @@ app.include_router(appointments.router, prefix="/api/v1")
 # Incluir novas rotas
 app.include_router(categories.router, prefix="/api/v1")
 app.include_router(products.router, prefix="/api/v1")
+app.include_router(schedules.router, prefix="/api/v1")
+app.include_router(imports.router, prefix="/api/v1")
 
 @app.get("/")
 async def root():
@@ -48,7 +49,8 @@ async def root():
             "appointments": "/api/v1/appointments",
             "categories": "/api/v1/categories",
             "products": "/api/v1/products",
-            "schedules": "/api/v1/schedules"# Novo endpoint
+            "schedules": "/api/v1/schedules",# Novo endpoint
+            "imports": "/api/v1/imports"
 
         },
         "ports": {
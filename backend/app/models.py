@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table, Text, Enum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table, Text, Enum, Index, DDL, event, text
+from sqlalchemy.dialects.postgresql import UUID, ExcludeConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -127,6 +127,11 @@ class User(Base):
     updater = relationship("User", foreign_keys=[updated_by_id], remote_side=[id], back_populates="updated_users")
     created_users = relationship("User", foreign_keys=[created_by_id], back_populates="creator")
     updated_users = relationship("User", foreign_keys=[updated_by_id], back_populates="updater")
+    
+    # Paginação por cursor (created_at, id)
+    __table_args__ = (
+        Index('ix_users_created_id', 'created_at', 'id'),
+    )
 
 class Appointment(Base):
     __tablename__ = 'appointments'
@@ -146,6 +151,11 @@ class Appointment(Base):
     
     tenant = relationship("Tenant", back_populates="appointments")
     user = relationship("User", back_populates="appointments")
+    
+    # Paginação por cursor (created_at, id) dentro do tenant
+    __table_args__ = (
+        Index('ix_appointments_tenant_created_id', 'tenant_id', 'created_at', 'id'),
+    )
 
 class Payment(Base):
     __tablename__ = 'payments'
@@ -202,6 +212,11 @@ class Category(Base):
     # Relacionamento com tenants (muitos-para-muitos)
     tenants = relationship("Tenant", secondary="tenant_categories", back_populates="categories")
 
+    # Paginação por cursor (created_at, id)
+    __table_args__ = (
+        Index('ix_categories_created_id', 'created_at', 'id'),
+    )
+
     # Tabela de associação entre categorias e tenants
     tenant_categories = Table('tenant_categories', Base.metadata,
     Column('tenant_id', Integer, ForeignKey('tenants.id'), primary_key=True),
@@ -261,6 +276,11 @@ class Product(Base):
     professional = relationship("User", foreign_keys=[professional_id], back_populates="professional_products")
     tenant = relationship("Tenant", back_populates="products")
 
+    # Paginação por cursor (created_at, id) dentro do tenant
+    __table_args__ = (
+        Index('ix_products_tenant_created_id', 'tenant_id', 'created_at', 'id'),
+    )
+
 # Atualizar modelo User para incluir produtos como profissional
 # Adicionar no modelo User existente:
 # professional_products = relationship("Product", foreign_keys="Product.professional_id", back_populates="professional")
@@ -343,6 +363,72 @@ class Schedule(Base):
     category = relationship("Category", back_populates="schedules")
     product = relationship("Product", back_populates="schedules")
     tenant = relationship("Tenant", back_populates="schedules")
+    
+    # Impede sobreposição de horários ativos do mesmo profissional no banco (PostgreSQL).
+    # Só agendamentos simples: o período da linha de uma série recorrente não é uma
+    # ocorrência (exceções e dias da semana mudam a agenda) e a série é verificada
+    # pela expansão, como na verificação de disponibilidade.
+    __table_args__ = (
+        ExcludeConstraint(
+            (provider_id, '='),
+            (func.tstzrange(start_date, end_date, '[)'), '&&'),
+            name='schedules_provider_no_overlap',
+            using='gist',
+            where=text("is_deleted = false AND status = 'ACTIVE' AND recurrence_type = 'NONE'")
+        ).ddl_if(dialect='postgresql'),
+        # Leituras por período do tenant (calendário, próximos agendamentos)
+        Index(
+            'ix_schedules_tenant_period',
+            tenant_id,
+            func.tstzrange(start_date, end_date, '[)'),
+            postgresql_using='gist',
+            postgresql_where=text("is_deleted = false")
+        ).ddl_if(dialect='postgresql'),
+        # Paginação por cursor (start_date, id) dentro do tenant
+        Index('ix_schedules_tenant_start_id', 'tenant_id', 'start_date', 'id'),
+        # Paginação por cursor sem tenant único (super admin, tenant_id IN)
+        Index(
+            'ix_schedules_start_id',
+            'start_date', 'id',
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = 0")
+        ),
+        # Agenda do profissional em ordem de início (sobreposição usa a constraint GiST)
+        Index(
+            'ix_schedules_provider_start',
+            'provider_id', 'start_date',
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = 0")
+        ),
+        # Agendamentos do cliente
+        Index(
+            'ix_schedules_user_start',
+            'user_id', 'start_date',
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = 0")
+        ),
+        # Séries recorrentes expandidas no calendário e na disponibilidade
+        Index(
+            'ix_schedules_recurring',
+            'tenant_id', 'provider_id',
+            postgresql_where=text("is_deleted = false AND recurrence_type <> 'NONE'"),
+            sqlite_where=text("is_deleted = 0 AND recurrence_type <> 'NONE'")
+        ),
+        # Chave natural usada na detecção de duplicados da importação
+        Index(
+            'ix_schedules_natural_key',
+            'provider_id', 'start_date', 'end_date', 'user_id', 'product_id',
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = 0")
+        ),
+    )
+
+# btree_gist permite combinar igualdade de UUID com sobreposição de intervalos no GiST
+event.listen(
+    Schedule.__table__,
+    'before_create',
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect='postgresql')
+)
 
 # Tabela para agendamentos recorrentes gerados
 class RecurringScheduleInstance(Base):
@@ -364,6 +450,11 @@ class RecurringScheduleInstance(Base):
     
     # Relacionamentos
     parent_schedule = relationship("Schedule", foreign_keys=[parent_schedule_id])
+    
+    # Exceções das séries buscadas por período
+    __table_args__ = (
+        Index('ix_recurring_instances_parent_date', 'parent_schedule_id', 'instance_date'),
+    )
 
 
 
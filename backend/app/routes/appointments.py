@@ -1,18 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
 from app import schemas, models, auth, deps
 from app.database import get_db
+from app.utils.pagination import paginate
 
 router = APIRouter(prefix="/appointments", tags=["Agendamentos"])
 
 @router.get("/", response_model=List[schemas.Appointment])
 async def list_appointments(
+    response: Response,
     tenant_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (X-Next-Cursor)"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user),
     current_tenant: Optional[models.Tenant] = Depends(deps.get_tenant_from_header)
@@ -32,8 +35,9 @@ async def list_appointments(
         tenant_ids = [t.id for t in current_user.tenants]
         query = query.filter(models.Appointment.tenant_id.in_(tenant_ids))
     
-    appointments = query.offset(skip).limit(limit).all()
-    return appointments
+    return paginate(
+        query, [models.Appointment.created_at, models.Appointment.id], response, cursor, skip, limit
+    )
 
 @router.post("/", response_model=schemas.Appointment)
 async def create_appointment(
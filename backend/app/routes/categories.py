@@ -1,18 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uuid
 
 from app import schemas, models, deps, auth
 from app.database import get_db
+from app.utils.etag import compute_etag, not_modified, CATEGORY_VERSIONS
+from app.utils.pagination import paginate
 from app.services.category_service import CategoryService
+from app.services.import_jobs import import_jobs, spool_upload
 
 router = APIRouter(prefix="/categories", tags=["Categorias"])
 
 @router.get("/", response_model=List[schemas.Category])
 async def list_categories(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (X-Next-Cursor)"),
     status: Optional[schemas.CategoryStatus] = None,
     tenant_id: Optional[int] = Query(None, description="Filtrar por tenant"),
     db: Session = Depends(get_db),
@@ -41,8 +47,19 @@ async def list_categories(
                 models.tenant_categories.c.tenant_id.in_(tenant_ids)
             )
     
-    categories = query.offset(skip).limit(limit).all()
-    return categories
+    # Cliente com a versão atual recebe 304 sem carregar as linhas; os tenants
+    # embutidos em cada categoria também entram no hash
+    etag = compute_etag(
+        query, models.Category.updated_at, request.url.query, current_user.id,
+        related=CATEGORY_VERSIONS
+    )
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
+    
+    return paginate(
+        query, [models.Category.created_at, models.Category.id], response, cursor, skip, limit
+    )
 
 @router.post("/", response_model=schemas.Category)
 async def create_category(
@@ -140,13 +157,14 @@ async def delete_category(
     service.delete_category(category_id)
     return {"message": "Categoria deletada com sucesso"}
 
-@router.post("/import/csv")
+@router.post("/import/csv", response_model=schemas.ImportJob, status_code=status.HTTP_202_ACCEPTED)
 async def import_categories_csv(
     file: UploadFile = File(...),
+    dry_run: bool = Form(False, description="Só valida o arquivo e devolve o relatório, sem gravar"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    """Importa categorias de arquivo CSV"""
+    """Importa categorias de arquivo CSV ou Excel (.xlsx) em segundo plano (progresso em /imports/{job_id})"""
     # Verificar permissão (apenas super admin pode importar categorias globais)
     if not current_user.is_super_admin:
         raise HTTPException(
@@ -154,13 +172,18 @@ async def import_categories_csv(
             detail="Apenas super admin pode importar categorias"
         )
     
-    # Ler arquivo
-    content = await file.read()
+    path = await spool_upload(file)
     
-    service = CategoryService(db, current_user)
-    result = service.import_categories_from_csv(content)
+    def handler(job_db, user, chunk, first_row):
+        service = CategoryService(job_db, user)
+        if dry_run:
+            return service.validate_frame(chunk, first_row)
+        return service.import_frame(chunk, first_row=first_row)
     
-    return result
+    return import_jobs.submit(
+        "categories", path, handler, db, current_user,
+        file_name=file.filename, dry_run=dry_run
+    )
 
 @router.post("/resolve-duplicate/{category_id}")
 async def resolve_duplicate(
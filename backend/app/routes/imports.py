@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends
+import uuid
+
+from app import schemas, models, auth
+from app.services.import_jobs import import_jobs
+
+router = APIRouter(prefix="/imports", tags=["Importações"])
+
+@router.get("/{job_id}", response_model=schemas.ImportJob)
+async def get_import_job(
+    job_id: uuid.UUID,
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Progresso de uma importação: linhas processadas, erros e linhas por segundo"""
+    return import_jobs.get(job_id, current_user)
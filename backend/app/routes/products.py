@@ -1,26 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uuid
 
 from app import schemas, models, deps, auth
 from app.database import get_db
+from app.utils.etag import compute_etag, not_modified, CATEGORY_VERSIONS, USER_VERSIONS
+from app.utils.fields import parse_fields, fields_load_only, sparse_response
+from app.utils.pagination import paginate
 from app.services.product_service import ProductService
+from app.services.import_jobs import import_jobs, spool_upload
 
 router = APIRouter(prefix="/products", tags=["Produtos"])
 
+FIELDS_DESCRIPTION = "Colunas retornadas, ex.: name,price,status (id sempre incluído; sem relacionamentos)"
+
 @router.get("/", response_model=List[schemas.Product])
 async def list_products(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (X-Next-Cursor)"),
     status: Optional[schemas.ProductStatus] = None,
     category_id: Optional[uuid.UUID] = None,
     professional_id: Optional[uuid.UUID] = None,
     tenant_id: Optional[int] = Query(None, description="Filtrar por tenant"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """Lista todos os produtos (com filtros)"""
+    selected = parse_fields(fields, models.Product, schemas.Product)
     query = db.query(models.Product).filter(models.Product.is_deleted == False)
     
     if status:
@@ -43,8 +54,24 @@ async def list_products(
             tenant_ids = [t.id for t in current_user.tenants]
             query = query.filter(models.Product.tenant_id.in_(tenant_ids))
     
-    products = query.offset(skip).limit(limit).all()
-    return products
+    # Cliente com a versão atual recebe 304 sem carregar as linhas; a resposta
+    # completa embute categoria, profissional e tenant, que entram no hash
+    etag = compute_etag(
+        query, models.Product.updated_at, request.url.query, current_user.id,
+        related=() if selected else CATEGORY_VERSIONS + USER_VERSIONS
+    )
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
+    
+    order = [models.Product.created_at, models.Product.id]
+    if selected:
+        # Só as colunas pedidas são lidas e serializadas
+        query = query.options(fields_load_only(models.Product, selected, *order))
+        products = paginate(query, order, response, cursor, skip, limit)
+        return sparse_response(products, schemas.Product, selected, response)
+    
+    return paginate(query, order, response, cursor, skip, limit)
 
 @router.post("/", response_model=schemas.Product)
 async def create_product(
@@ -73,12 +100,14 @@ async def list_public_products(
 @router.get("/{product_id}", response_model=schemas.Product)
 async def get_product(
     product_id: uuid.UUID,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """Obtém detalhes de um produto específico"""
     service = ProductService(db, current_user)
-    product = service.get_product_by_id(product_id)
+    selected = parse_fields(fields, models.Product, schemas.Product)
+    product = service.get_product_by_id(product_id, selected)
     
     if not product:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
@@ -92,6 +121,8 @@ async def get_product(
                 detail="Sem acesso a este produto"
             )
     
+    if selected:
+        return sparse_response(product, schemas.Product, selected)
     return product
 
 @router.put("/{product_id}", response_model=schemas.Product)
@@ -144,25 +175,31 @@ async def delete_product(
     service.delete_product(product_id)
     return {"message": "Produto deletado com sucesso"}
 
-@router.post("/import/csv")
+@router.post("/import/csv", response_model=schemas.ImportJob, status_code=status.HTTP_202_ACCEPTED)
 async def import_products_csv(
     file: UploadFile = File(...),
     tenant_id: int = Form(...),
+    dry_run: bool = Form(False, description="Só valida o arquivo e devolve o relatório, sem gravar"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    """Importa produtos de arquivo CSV"""
+    """Importa produtos de arquivo CSV ou Excel (.xlsx) em segundo plano (progresso em /imports/{job_id})"""
     # Verificar permissão
     if not current_user.is_super_admin:
         deps.require_tenant_access(tenant_id, current_user, db)
     
-    # Ler arquivo
-    content = await file.read()
+    path = await spool_upload(file)
     
-    service = ProductService(db, current_user)
-    result = service.import_products_from_csv(content, tenant_id)
+    def handler(job_db, user, chunk, first_row):
+        service = ProductService(job_db, user)
+        if dry_run:
+            return service.validate_frame(chunk, tenant_id, first_row)
+        return service.import_frame(chunk, tenant_id, first_row)
     
-    return result
+    return import_jobs.submit(
+        "products", path, handler, db, current_user,
+        tenant_id=tenant_id, file_name=file.filename, dry_run=dry_run
+    )
 
 @router.post("/resolve-duplicate/{product_id}")
 async def resolve_duplicate(
@@ -1,19 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uuid
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 from app import schemas, models, deps, auth
 from app.database import get_db
-from app.services.schedule_service import ScheduleService
+from app.utils.etag import compute_etag, not_modified
+from app.utils.fields import parse_fields, fields_load_only, sparse_response
+from app.utils.pagination import paginate
+from app.services.schedule_service import ScheduleService, parse_expand, schedule_load_options, schedule_versions
+from app.services.schedule_import_service import ScheduleImportService
+from app.services.calendar_cache import calendar_cache
+from app.services.import_jobs import import_jobs, spool_upload
 
 router = APIRouter(prefix="/schedules", tags=["Agendamentos"])
 
+EXPAND_DESCRIPTION = "Relacionamentos incluídos na resposta: provider,user,category,product,tenant ou all (os demais voltam só como *_id)"
+FIELDS_DESCRIPTION = "Colunas retornadas, ex.: start_date,end_date,status (id sempre incluído; sem relacionamentos)"
+
 @router.get("/", response_model=List[schemas.Schedule])
 async def list_schedules(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (X-Next-Cursor)"),
     status: Optional[schemas.ScheduleStatus] = None,
     provider_id: Optional[uuid.UUID] = None,
     user_id: Optional[uuid.UUID] = None,
@@ -22,10 +35,14 @@ async def list_schedules(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     tenant_id: Optional[int] = Query(None, description="Filtrar por tenant"),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """Lista agendamentos com filtros"""
+    relations = parse_expand(expand)
+    selected = parse_fields(fields, models.Schedule, schemas.Schedule)
     query = db.query(models.Schedule).filter(models.Schedule.is_deleted == False)
     
     if status:
@@ -54,8 +71,28 @@ async def list_schedules(
             tenant_ids = [t.id for t in current_user.tenants]
             query = query.filter(models.Schedule.tenant_id.in_(tenant_ids))
     
-    schedules = query.order_by(models.Schedule.start_date).offset(skip).limit(limit).all()
-    return schedules
+    # Cliente com a versão atual recebe 304 sem carregar as linhas; com fields
+    # nenhum relacionamento é serializado, senão entram as versões dos expandidos
+    etag = compute_etag(
+        query, models.Schedule.updated_at, request.url.query, current_user.id,
+        related=() if selected else schedule_versions(relations)
+    )
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
+    
+    order = [models.Schedule.start_date, models.Schedule.id]
+    if selected:
+        # Só as colunas pedidas são lidas e serializadas
+        query = query.options(
+            fields_load_only(models.Schedule, selected, *order),
+            *schedule_load_options(set())
+        )
+        schedules = paginate(query, order, response, cursor, skip, limit)
+        return sparse_response(schedules, schemas.Schedule, selected, response)
+    
+    query = query.options(*schedule_load_options(relations))
+    return paginate(query, order, response, cursor, skip, limit)
 
 @router.post("/", response_model=schemas.Schedule)
 async def create_schedule(
@@ -71,7 +108,7 @@ async def create_schedule(
     service = ScheduleService(db, current_user)
     return service.create_schedule(schedule)
 
-@router.post("/bulk", response_model=List[schemas.Schedule])
+@router.post("/bulk", response_model=schemas.BulkScheduleResult)
 async def create_bulk_schedules(
     bulk_data: schemas.BulkScheduleCreate,
     db: Session = Depends(get_db),
@@ -102,6 +139,72 @@ async def get_calendar(
     service = ScheduleService(db, current_user)
     return service.get_calendar_view(tenant_id, year, month, provider_id)
 
+@router.get("/calendar-cache/stats")
+async def get_calendar_cache_stats(
+    current_user: models.User = Depends(deps.require_super_admin)
+):
+    """Estatísticas do cache do calendário (acertos, falhas e ocupação)"""
+    return calendar_cache.stats()
+
+@router.get("/calendar/{tenant_id}/heatmap", response_model=schemas.CalendarHeatmap)
+async def get_calendar_heatmap(
+    tenant_id: int,
+    start_date: date = Query(..., description="Primeiro dia"),
+    end_date: date = Query(..., description="Último dia"),
+    provider_id: Optional[uuid.UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Retorna quantidade e minutos agendados por dia, profissional e status"""
+    # Verificar acesso ao tenant
+    if not current_user.is_super_admin:
+        deps.require_tenant_access(tenant_id, current_user, db)
+    
+    service = ScheduleService(db, current_user)
+    return service.get_calendar_heatmap(tenant_id, start_date, end_date, provider_id)
+
+@router.get("/export/{tenant_id}")
+async def export_schedules(
+    tenant_id: int,
+    start_date: datetime = Query(..., description="Início do período"),
+    end_date: datetime = Query(..., description="Fim do período (exclusivo)"),
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson ou csv"),
+    provider_id: Optional[uuid.UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Exporta os agendamentos do período em streaming (NDJSON ou CSV)"""
+    # Verificar acesso ao tenant
+    if not current_user.is_super_admin:
+        deps.require_tenant_access(tenant_id, current_user, db)
+    
+    service = ScheduleService(db, current_user)
+    content = service.export_schedules(tenant_id, start_date, end_date, export_format, provider_id)
+    
+    filename = f"agendamentos_{tenant_id}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{export_format}"
+    return StreamingResponse(
+        content,
+        media_type="text/csv" if export_format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/resource-view/{tenant_id}", response_model=schemas.ResourceView)
+async def get_resource_view(
+    tenant_id: int,
+    day: date = Query(..., description="Dia inicial"),
+    days: int = Query(1, ge=1, le=7, description="Quantidade de dias (1 = dia, 7 = semana)"),
+    provider_ids: Optional[List[uuid.UUID]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Agenda dos profissionais lado a lado, em formato colunar"""
+    # Verificar acesso ao tenant
+    if not current_user.is_super_admin:
+        deps.require_tenant_access(tenant_id, current_user, db)
+    
+    service = ScheduleService(db, current_user)
+    return service.get_resource_view(tenant_id, day, days, provider_ids)
+
 @router.post("/check-availability")
 async def check_availability(
     check: schemas.AvailabilityCheck,
@@ -123,17 +226,104 @@ async def check_availability(
         "end_time": check.end_time
     }
 
-@router.get("/by-provider/{provider_id}")
+@router.post("/check-availability/batch")
+async def check_availability_batch(
+    batch: schemas.AvailabilityBatchCheck,
+    tenant_id: int = Query(..., description="Tenant dos profissionais consultados"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Verifica disponibilidade de vários horários (resultados na ordem enviada)"""
+    # Verificar acesso ao tenant (só profissionais do tenant são consultados)
+    deps.require_tenant_access(tenant_id, current_user, db)
+    
+    service = ScheduleService(db, current_user)
+    
+    return {"results": service.check_availability_batch(batch.items, tenant_id)}
+
+@router.get("/free-slots", response_model=schemas.FreeSlots)
+async def get_free_slots(
+    provider_id: uuid.UUID,
+    start_date: datetime,
+    end_date: datetime,
+    duration_minutes: int = Query(..., gt=0, description="Duração do horário em minutos"),
+    tenant_id: int = Query(..., description="Tenant do profissional"),
+    step_minutes: int = Query(15, gt=0, description="Intervalo entre inícios possíveis"),
+    limit: int = Query(200, gt=0, le=1000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Lista horários livres de um profissional do tenant no período"""
+    # Verificar acesso ao tenant
+    deps.require_tenant_access(tenant_id, current_user, db)
+    
+    service = ScheduleService(db, current_user)
+    
+    return service.find_free_slots(
+        provider_id, tenant_id, start_date, end_date, duration_minutes, step_minutes, limit
+    )
+
+@router.get("/first-available", response_model=schemas.FirstAvailable)
+async def get_first_available(
+    start_date: datetime,
+    end_date: datetime,
+    duration_minutes: int = Query(..., gt=0, description="Duração do horário em minutos"),
+    tenant_id: int = Query(..., description="Tenant onde buscar os profissionais"),
+    product_id: Optional[uuid.UUID] = None,
+    category_id: Optional[uuid.UUID] = None,
+    step_minutes: int = Query(15, gt=0, description="Intervalo entre inícios possíveis"),
+    limit: int = Query(5, gt=0, le=50, description="Quantidade de opções"),
+    max_per_provider: int = Query(1, gt=0, le=50, description="Opções por profissional"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Busca o primeiro horário livre entre os profissionais de um produto ou categoria do tenant"""
+    # Verificar acesso ao tenant (a busca nunca atravessa tenants)
+    deps.require_tenant_access(tenant_id, current_user, db)
+    
+    service = ScheduleService(db, current_user)
+    
+    return service.find_first_available(
+        start_date,
+        end_date,
+        duration_minutes,
+        tenant_id,
+        product_id=product_id,
+        category_id=category_id,
+        step_minutes=step_minutes,
+        limit=limit,
+        max_per_provider=max_per_provider
+    )
+
+@router.get("/occurrences", response_model=List[schemas.ScheduleOccurrence])
+async def list_occurrences(
+    start_date: datetime,
+    end_date: datetime,
+    tenant_id: int = Query(..., description="Tenant"),
+    provider_id: Optional[uuid.UUID] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Agenda do período com as séries recorrentes expandidas"""
+    # Verificar acesso ao tenant
+    if not current_user.is_super_admin:
+        deps.require_tenant_access(tenant_id, current_user, db)
+    
+    service = ScheduleService(db, current_user)
+    return service.get_occurrences(start_date, end_date, tenant_id, provider_id)
+
+@router.get("/by-provider/{provider_id}", response_model=List[schemas.Schedule])
 async def get_provider_schedules(
     provider_id: uuid.UUID,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """Lista agendamentos de um profissional"""
     service = ScheduleService(db, current_user)
-    schedules = service.get_schedules_by_provider(provider_id, start_date, end_date)
+    schedules = service.get_schedules_by_provider(provider_id, start_date, end_date, parse_expand(expand))
     
     # Filtrar por acesso do usuário
     if not current_user.is_super_admin:
@@ -145,12 +335,17 @@ async def get_provider_schedules(
 @router.get("/{schedule_id}", response_model=schemas.Schedule)
 async def get_schedule(
     schedule_id: uuid.UUID,
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """Obtém detalhes de um agendamento"""
     service = ScheduleService(db, current_user)
-    schedule = service.get_schedule_by_id(schedule_id)
+    selected = parse_fields(fields, models.Schedule, schemas.Schedule)
+    schedule = service.get_schedule_by_id(
+        schedule_id, set() if selected else parse_expand(expand), selected
+    )
     
     if not schedule:
         raise HTTPException(status_code=404, detail="Agendamento não encontrado")
@@ -164,6 +359,8 @@ async def get_schedule(
                 detail="Sem acesso a este agendamento"
             )
     
+    if selected:
+        return sparse_response(schedule, schemas.Schedule, selected)
     return schedule
 
 @router.put("/{schedule_id}", response_model=schemas.Schedule)
@@ -216,30 +413,64 @@ async def cancel_schedule(
     service.cancel_schedule(schedule_id)
     return {"message": "Agendamento cancelado com sucesso"}
 
-@router.post("/import/csv")
+@router.put("/{schedule_id}/occurrences/{occurrence_date}", response_model=schemas.ScheduleOccurrence)
+async def update_occurrence(
+    schedule_id: uuid.UUID,
+    occurrence_date: date,
+    occurrence_update: schemas.ScheduleOccurrenceUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Altera status/observações de uma ocorrência da série"""
+    service = ScheduleService(db, current_user)
+    
+    # Verificar permissão
+    schedule = service.get_schedule_by_id(schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Agendamento não encontrado")
+    
+    if not current_user.is_super_admin:
+        tenant_ids = [t.id for t in current_user.tenants]
+        if schedule.tenant_id not in tenant_ids:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Sem permissão para editar este agendamento"
+            )
+    
+    return service.update_occurrence(schedule_id, occurrence_date, occurrence_update)
+
+@router.post("/import/csv", response_model=schemas.ImportJob, status_code=status.HTTP_202_ACCEPTED)
 async def import_schedules_csv(
     file: UploadFile = File(...),
     tenant_id: int = Form(...),
+    dry_run: bool = Form(False, description="Só valida o arquivo e devolve o relatório, sem gravar"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    """Importa agendamentos de arquivo CSV"""
+    """Importa agendamentos de arquivo CSV ou Excel (.xlsx) em segundo plano (progresso em /imports/{job_id})"""
     # Verificar permissão
     if not current_user.is_super_admin:
         deps.require_tenant_access(tenant_id, current_user, db)
+    ScheduleImportService(db, current_user).ensure_tenant(tenant_id)
     
-    # Ler arquivo
-    content = await file.read()
+    path = await spool_upload(file)
     
-    service = ScheduleService(db, current_user)
-    result = service.import_schedules_from_csv(content, tenant_id)
+    def handler(job_db, user, chunk, first_row):
+        service = ScheduleImportService(job_db, user)
+        if dry_run:
+            return service.validate_frame(chunk, tenant_id, first_row)
+        return service.import_frame(chunk, tenant_id, first_row)
     
-    return result
+    return import_jobs.submit(
+        "schedules", path, handler, db, current_user,
+        tenant_id=tenant_id, file_name=file.filename, dtype=str, dry_run=dry_run
+    )
 
-@router.get("/upcoming/{tenant_id}")
+@router.get("/upcoming/{tenant_id}", response_model=List[schemas.Schedule])
 async def get_upcoming_schedules(
     tenant_id: int,
     days: int = Query(7, description="Próximos N dias"),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
@@ -253,6 +484,8 @@ async def get_upcoming_schedules(
     start_date = datetime.now()
     end_date = start_date + timedelta(days=days)
     
-    schedules = service.get_schedules_by_date_range(tenant_id, start_date, end_date)
+    schedules = service.get_schedules_by_date_range(
+        tenant_id, start_date, end_date, expand=parse_expand(expand)
+    )
     
     return schedules
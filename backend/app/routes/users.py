@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uuid
 
 from app import schemas, models, deps
 from app.database import get_db
+from app.utils.pagination import paginate
 from app.services.user_service import UserService
+from app.services.import_jobs import import_jobs, spool_upload
 
 router = APIRouter(prefix="/users", tags=["Usuários"])
 
 @router.get("/", response_model=List[schemas.User])
 async def list_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (X-Next-Cursor)"),
     tenant_id: Optional[int] = None,
     status: Optional[schemas.UserStatus] = None,
     user_type: Optional[schemas.UserType] = None,
@@ -29,8 +33,9 @@ async def list_users(
     if user_type:
         query = query.filter(models.User.user_type == user_type)
     
-    users = query.offset(skip).limit(limit).all()
-    return users
+    return paginate(
+        query, [models.User.created_at, models.User.id], response, cursor, skip, limit
+    )
 
 @router.get("/tenant/{tenant_id}", response_model=List[schemas.User])
 async def list_tenant_users(
@@ -153,14 +158,15 @@ async def delete_user(
     service.delete_user(user_id)
     return {"message": "Usuário deletado com sucesso"}
 
-@router.post("/import/csv")
+@router.post("/import/csv", response_model=schemas.ImportJob, status_code=status.HTTP_202_ACCEPTED)
 async def import_users_csv(
     file: UploadFile = File(...),
     tenant_id: int = Form(...),
+    dry_run: bool = Form(False, description="Só valida o arquivo e devolve o relatório, sem gravar"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    """Importa usuários de arquivo CSV"""
+    """Importa usuários de arquivo CSV ou Excel (.xlsx) em segundo plano (progresso em /imports/{job_id})"""
     # Verificar permissão
     if not current_user.is_super_admin:
         deps.require_tenant_access(tenant_id, current_user, db)
@@ -171,13 +177,18 @@ async def import_users_csv(
                 detail="Apenas tenant_admin pode importar usuários"
             )
     
-    # Ler arquivo
-    content = await file.read()
+    path = await spool_upload(file)
     
-    service = UserService(db, current_user)
-    result = service.import_users_from_csv(content, tenant_id)
+    def handler(job_db, user, chunk, first_row):
+        service = UserService(job_db, user)
+        if dry_run:
+            return service.validate_frame(chunk, tenant_id, first_row)
+        return service.import_frame(chunk, tenant_id, first_row)
     
-    return result
+    return import_jobs.submit(
+        "users", path, handler, db, current_user,
+        tenant_id=tenant_id, file_name=file.filename, dtype=str, dry_run=dry_run
+    )
 
 @router.post("/resolve-duplicate/{user_id}")
 async def resolve_duplicate(
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, ConfigDict, Field, validator
-from typing import Optional, List
+from pydantic import BaseModel, BeforeValidator, EmailStr, ConfigDict, Field, validator
+from typing import Annotated, Optional, List
 from datetime import datetime, date
 from enum import Enum
+import json
 import re
 import uuid
 
@@ -233,7 +234,7 @@ class CategoryInDB(CategoryBase):
     updated_at: datetime
     updated_by_id: uuid.UUID
     tenants: List[Tenant] = []
-
+    
     model_config = ConfigDict(from_attributes=True)
 
 class Category(CategoryInDB):
@@ -390,8 +391,13 @@ class ScheduleUpdate(BaseModel):
     recurrence_end_date: Optional[datetime] = None
     recurrence_days: Optional[List[WeekDay]] = None
 
+def _parse_recurrence_days(value):
+    # Gravado no banco como JSON: ["monday","wednesday"]
+    return json.loads(value) if isinstance(value, str) else value
+
 class ScheduleInDB(ScheduleBase):
     id: uuid.UUID
+    recurrence_days: Optional[Annotated[List[WeekDay], BeforeValidator(_parse_recurrence_days)]] = None
     created_at: datetime
     created_by_id: uuid.UUID
     updated_at: datetime
@@ -424,10 +430,58 @@ class RecurringInstance(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+# Schema para ocorrência de agendamento (séries recorrentes expandidas sob demanda)
+class ScheduleOccurrence(BaseModel):
+    schedule_id: uuid.UUID
+    provider_id: uuid.UUID
+    user_id: uuid.UUID
+    category_id: uuid.UUID
+    product_id: uuid.UUID
+    tenant_id: int
+    start_date: datetime
+    end_date: datetime
+    status: ScheduleStatus
+    recurrence_type: RecurrenceType
+    notes: Optional[str] = None
+
+class ScheduleOccurrenceUpdate(BaseModel):
+    status: Optional[ScheduleStatus] = None
+    notes: Optional[str] = None
+
 # Schema para visualização de calendário
 class CalendarView(BaseModel):
     date: date
     schedules: List[Schedule]
+    occurrences: List[ScheduleOccurrence] = []
+
+# Schema para visão por recurso (colunar; índices apontam para as tabelas)
+class ResourceView(BaseModel):
+    start: int  # Epoch (segundos)
+    end: int
+    statuses: List[str]
+    provider_ids: List[uuid.UUID]
+    provider_names: List[str]
+    product_names: List[Optional[str]] = []
+    user_names: List[Optional[str]] = []
+    schedule_ids: List[uuid.UUID] = []
+    provider: List[int] = []
+    starts: List[int] = []
+    ends: List[int] = []
+    status: List[int] = []
+    product: List[int] = []
+    user: List[int] = []
+
+# Schema para mapa de calor do calendário (contagens por dia, a partir de start_date)
+class HeatmapRow(BaseModel):
+    provider_id: uuid.UUID
+    status: ScheduleStatus
+    counts: List[int]
+    minutes: List[int]
+
+class CalendarHeatmap(BaseModel):
+    start_date: date
+    end_date: date
+    rows: List[HeatmapRow]
 
 # Schema para criação de múltiplos agendamentos
 class BulkScheduleCreate(BaseModel):
@@ -443,6 +497,11 @@ class BulkScheduleCreate(BaseModel):
     end_date: Optional[date] = None  # Se None, cria para sempre
     service_price: Optional[int] = None
 
+class BulkScheduleResult(BaseModel):
+    created: List[Schedule]
+    skipped: List[dict]  # Datas com conflito de horário
+    errors: List[dict]
+
 # Schema para verificação de disponibilidade
 class AvailabilityCheck(BaseModel):
     provider_id: uuid.UUID
@@ -450,6 +509,33 @@ class AvailabilityCheck(BaseModel):
     start_time: str
     end_time: str
 
+# Schema para verificação de disponibilidade em lote
+class AvailabilityBatchCheck(BaseModel):
+    items: List[AvailabilityCheck] = Field(..., min_length=1, max_length=500)
+
+# Schema para horários livres
+class TimeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+class FreeSlots(BaseModel):
+    provider_id: uuid.UUID
+    duration_minutes: int
+    step_minutes: int
+    slots: List[TimeSlot]
+
+# Schema para busca do primeiro profissional disponível
+class ProviderSlot(BaseModel):
+    provider_id: uuid.UUID
+    provider_name: str
+    product_id: uuid.UUID
+    start: datetime
+    end: datetime
+
+class FirstAvailable(BaseModel):
+    duration_minutes: int
+    options: List[ProviderSlot]
+
 # Schema para importação
 class ScheduleImport(BaseModel):
     provider_email: str
@@ -471,3 +557,30 @@ class ScheduleImportResult(BaseModel):
     conflicts_found: List[dict]  # Conflitos de horário
     errors: List[dict]
 
+# Schemas para importações em segundo plano
+class ImportJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class ImportJob(BaseModel):
+    id: uuid.UUID
+    kind: str  # schedules, products, users, categories
+    status: ImportJobStatus
+    dry_run: bool = False  # Só validação, nada gravado
+    tenant_id: Optional[int] = None
+    file_name: Optional[str] = None
+    file_size: int
+    rows_done: int
+    chunks_done: int
+    new_records: int
+    duplicates_found: List[dict]
+    conflicts_found: List[dict]
+    errors: List[dict]
+    rows_per_second: float
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    detail: Optional[str] = None  # Motivo da falha
+
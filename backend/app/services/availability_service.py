@@ -0,0 +1,390 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException, status
+import bisect
+import numpy as np
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from itertools import islice
+from sqlalchemy import func
+from app import models
+from app.config import settings
+from app.services.recurrence_service import load_occurrences
+
+# Status que ocupam a agenda do profissional
+BLOCKING_STATUSES = [models.ScheduleStatus.ACTIVE]
+
+# SQLSTATE do PostgreSQL para violação de constraint de exclusão
+EXCLUSION_VIOLATION = '23P01'
+
+def commit_booking(db: Session):
+    """Confirma a transação tratando a constraint de exclusão como conflito de horário (409)"""
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if getattr(e.orig, 'pgcode', None) == EXCLUSION_VIOLATION:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Horário não disponível para este profissional"
+            )
+        raise
+
+def to_epoch(value: datetime) -> float:
+    """Converte datetime para epoch (datas sem fuso são tratadas como UTC)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def schedule_period():
+    """Período do agendamento como tstzrange [início, fim), mesma expressão dos índices GiST"""
+    return func.tstzrange(models.Schedule.start_date, models.Schedule.end_date, '[)')
+
+def period_overlaps(start_date: datetime, end_date: datetime):
+    """Filtro de sobreposição com o período (usa os índices GiST)"""
+    return schedule_period().op('&&')(func.tstzrange(start_date, end_date, '[)'))
+
+def period_within(start_date: datetime, end_date: datetime):
+    """Filtro de agendamentos contidos no período (usa os índices GiST)"""
+    return schedule_period().op('<@')(func.tstzrange(start_date, end_date, '[]'))
+
+class ProviderIntervals:
+    """Intervalos ocupados de um profissional, ordenados pelo início"""
+    
+    def __init__(self, window_start: float, window_end: float):
+        self.window_start = window_start
+        self.window_end = window_end
+        self.loaded_at = time.monotonic()
+        self.starts: List[float] = []
+        self.intervals: List[Tuple[float, float, uuid.UUID]] = []
+        self.max_duration = 0.0
+        # Séries recorrentes têm vários intervalos com o mesmo ID
+        self.series: Set[uuid.UUID] = set()
+    
+    def covers(self, start: float, end: float) -> bool:
+        """Indica se o período está dentro da janela carregada"""
+        return self.window_start <= start and end <= self.window_end
+    
+    def add(self, start: float, end: float, schedule_id: uuid.UUID):
+        """Insere intervalo mantendo a ordenação"""
+        pos = bisect.bisect_right(self.starts, start)
+        self.starts.insert(pos, start)
+        self.intervals.insert(pos, (start, end, schedule_id))
+        self.max_duration = max(self.max_duration, end - start)
+    
+    def remove(self, start: float, schedule_id: uuid.UUID) -> bool:
+        """Remove intervalo pelo início e ID do agendamento"""
+        pos = bisect.bisect_left(self.starts, start)
+        while pos < len(self.starts) and self.starts[pos] == start:
+            if self.intervals[pos][2] == schedule_id:
+                del self.starts[pos]
+                del self.intervals[pos]
+                return True
+            pos += 1
+        return False
+    
+    def has_conflict(
+        self,
+        start: float,
+        end: float,
+        exclude_schedule_id: Optional[uuid.UUID] = None
+    ) -> bool:
+        """Verifica sobreposição em O(log n + k)"""
+        # Só intervalos que começam depois de (start - maior duração) podem terminar após start
+        lo = bisect.bisect_right(self.starts, start - self.max_duration)
+        hi = bisect.bisect_left(self.starts, end)
+        for interval_start, interval_end, schedule_id in self.intervals[lo:hi]:
+            if schedule_id != exclude_schedule_id and interval_end > start:
+                return True
+        return False
+
+def _single_schedules(
+    db: Session,
+    provider_ids: List[uuid.UUID],
+    window_start: datetime,
+    window_end: datetime,
+    exclude_schedule_id: Optional[uuid.UUID] = None
+):
+    """Consulta de agendamentos não recorrentes que ocupam a agenda no período"""
+    query = db.query(
+        models.Schedule.provider_id,
+        models.Schedule.id,
+        models.Schedule.start_date,
+        models.Schedule.end_date
+    ).filter(
+        models.Schedule.provider_id.in_(provider_ids),
+        models.Schedule.is_deleted == False,
+        models.Schedule.recurrence_type == models.RecurrenceType.NONE,
+        models.Schedule.status.in_(BLOCKING_STATUSES),
+        period_overlaps(window_start, window_end)
+    )
+    if exclude_schedule_id:
+        query = query.filter(models.Schedule.id != exclude_schedule_id)
+    return query
+
+def _blocking_occurrences(
+    db: Session,
+    provider_ids: List[uuid.UUID],
+    window_start: datetime,
+    window_end: datetime,
+    exclude_schedule_id: Optional[uuid.UUID] = None
+):
+    """Ocorrências de séries recorrentes que ocupam a agenda no período"""
+    return [
+        occurrence for occurrence in load_occurrences(db, window_start, window_end, provider_ids=provider_ids)
+        if occurrence.status in BLOCKING_STATUSES and occurrence.schedule.id != exclude_schedule_id
+    ]
+
+def load_provider_intervals(
+    db: Session,
+    provider_id: uuid.UUID,
+    window_start: datetime,
+    window_end: datetime
+) -> ProviderIntervals:
+    """Carrega os horários ocupados do profissional no período, com as séries expandidas"""
+    rows = _single_schedules(db, [provider_id], window_start, window_end).order_by(
+        models.Schedule.start_date
+    ).all()
+    
+    intervals = ProviderIntervals(to_epoch(window_start), to_epoch(window_end))
+    for _, schedule_id, start_date, end_date in rows:
+        intervals.add(to_epoch(start_date), to_epoch(end_date), schedule_id)
+    
+    for occurrence in _blocking_occurrences(db, [provider_id], window_start, window_end):
+        intervals.add(to_epoch(occurrence.start_date), to_epoch(occurrence.end_date), occurrence.schedule.id)
+        intervals.series.add(occurrence.schedule.id)
+    
+    return intervals
+
+def load_busy_intervals(
+    db: Session,
+    provider_ids: List[uuid.UUID],
+    window_start: datetime,
+    window_end: datetime,
+    exclude_schedule_id: Optional[uuid.UUID] = None
+) -> Dict[uuid.UUID, List[Tuple[float, float]]]:
+    """Carrega agendamentos e ocorrências recorrentes ocupados, ordenados por profissional"""
+    result: Dict[uuid.UUID, List[Tuple[float, float]]] = {provider_id: [] for provider_id in provider_ids}
+    
+    singles = _single_schedules(db, provider_ids, window_start, window_end, exclude_schedule_id)
+    for provider_id, _, start_date, end_date in singles:
+        result.setdefault(provider_id, []).append((to_epoch(start_date), to_epoch(end_date)))
+    
+    for occurrence in _blocking_occurrences(db, provider_ids, window_start, window_end, exclude_schedule_id):
+        result.setdefault(occurrence.schedule.provider_id, []).append(
+            (to_epoch(occurrence.start_date), to_epoch(occurrence.end_date))
+        )
+    
+    for busy in result.values():
+        busy.sort()
+    
+    return result
+
+def merge_intervals(intervals: Iterable[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Une intervalos sobrepostos ou adjacentes (sweep-line sobre a lista ordenada)"""
+    merged: List[Tuple[float, float]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def free_gaps(
+    busy: Iterable[Tuple[float, float]],
+    window_start: float,
+    window_end: float
+) -> List[Tuple[float, float]]:
+    """Retorna os intervalos livres da janela a partir dos intervalos ocupados"""
+    gaps = []
+    cursor = window_start
+    for start, end in merge_intervals(busy):
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+    return gaps
+
+def overlapping_mask(
+    busy: Iterable[Tuple[float, float]],
+    starts: np.ndarray,
+    ends: np.ndarray
+) -> np.ndarray:
+    """Marca quais períodos [starts, ends) sobrepõem algum intervalo ocupado.
+    
+    Os ocupados são unidos e ordenados; para cada período, searchsorted
+    encontra o primeiro ocupado que termina depois do início, e há conflito
+    se ele começar antes do fim do período.
+    """
+    merged = merge_intervals(busy)
+    if not merged:
+        return np.zeros(len(starts), dtype=bool)
+    
+    busy_starts, busy_ends = np.array(merged, dtype=float).T
+    idx = np.searchsorted(busy_ends, starts, side='right')
+    candidate = np.minimum(idx, len(merged) - 1)
+    return (idx < len(merged)) & (busy_starts[candidate] < ends)
+
+def iter_slots(
+    gaps: Iterable[Tuple[float, float]],
+    duration: float,
+    step: float,
+    anchor: float
+) -> Iterator[Tuple[float, float]]:
+    """Gera horários de `duration` alinhados a `step` a partir de `anchor` dentro dos intervalos livres"""
+    for gap_start, gap_end in gaps:
+        offset = gap_start - anchor
+        slot_start = anchor + -(-offset // step) * step
+        while slot_start + duration <= gap_end:
+            yield (slot_start, slot_start + duration)
+            slot_start += step
+
+def slice_slots(
+    gaps: Iterable[Tuple[float, float]],
+    duration: float,
+    step: float,
+    anchor: float,
+    limit: Optional[int] = None
+) -> List[Tuple[float, float]]:
+    """Divide os intervalos livres em horários (no máximo `limit`)"""
+    return list(islice(iter_slots(gaps, duration, step, anchor), limit))
+
+class AvailabilityIndex:
+    """Índice em memória dos horários ocupados por profissional.
+    
+    Mantém uma janela móvel por profissional, carregada do banco na primeira
+    consulta e atualizada pelas escritas do ScheduleService. Consultas fora da
+    janela retornam None para que o chamador use a verificação via SQL.
+    
+    O índice é do processo: escritas feitas por outros workers só aparecem
+    após o TTL. Por isso serve apenas às consultas de disponibilidade; as
+    gravações sempre verificam no banco.
+    """
+    
+    def __init__(self, window_days: int, ttl_seconds: int):
+        self.window_days = window_days
+        self.ttl_seconds = ttl_seconds
+        self._providers: Dict[uuid.UUID, ProviderIntervals] = {}
+        self._entries: Dict[uuid.UUID, Tuple[uuid.UUID, Optional[float]]] = {}
+        self._lock = threading.Lock()
+    
+    def check(
+        self,
+        db: Session,
+        provider_id: uuid.UUID,
+        start_date: datetime,
+        end_date: datetime,
+        exclude_schedule_id: Optional[uuid.UUID] = None
+    ) -> Optional[bool]:
+        """Retorna disponibilidade ou None se o período não estiver indexado"""
+        start, end = to_epoch(start_date), to_epoch(end_date)
+        
+        with self._lock:
+            intervals = self._providers.get(provider_id)
+            if intervals and time.monotonic() - intervals.loaded_at > self.ttl_seconds:
+                intervals = None
+        
+        if intervals is None:
+            intervals = self.warm(db, provider_id)
+        
+        if not intervals.covers(start, end):
+            return None
+        
+        with self._lock:
+            return not intervals.has_conflict(start, end, exclude_schedule_id)
+    
+    def warm(self, db: Session, provider_id: uuid.UUID) -> ProviderIntervals:
+        """Carrega a janela do profissional com uma única consulta"""
+        now = datetime.now(timezone.utc)
+        intervals = load_provider_intervals(
+            db,
+            provider_id,
+            now - timedelta(days=1),
+            now + timedelta(days=self.window_days)
+        )
+        
+        with self._lock:
+            previous = self._providers.get(provider_id)
+            if previous:
+                for _, _, schedule_id in previous.intervals:
+                    self._entries.pop(schedule_id, None)
+            self._providers[provider_id] = intervals
+            for start, _, schedule_id in intervals.intervals:
+                # Séries não têm início único: qualquer alteração recarrega a janela
+                self._entries[schedule_id] = (
+                    provider_id, None if schedule_id in intervals.series else start
+                )
+        
+        return intervals
+    
+    def sync(self, schedule: models.Schedule):
+        """Reflete no índice o estado atual de um agendamento"""
+        with self._lock:
+            self._discard(schedule.id)
+            
+            if schedule.recurrence_type != models.RecurrenceType.NONE:
+                # Ocorrências são expandidas na próxima carga da janela
+                self._invalidate(schedule.provider_id)
+                return
+            
+            if schedule.is_deleted or schedule.status not in BLOCKING_STATUSES:
+                return
+            
+            intervals = self._providers.get(schedule.provider_id)
+            if intervals is None:
+                # Profissional ainda não indexado: será carregado sob demanda
+                return
+            
+            start = to_epoch(schedule.start_date)
+            intervals.add(start, to_epoch(schedule.end_date), schedule.id)
+            self._entries[schedule.id] = (schedule.provider_id, start)
+    
+    def discard(self, schedule_id: uuid.UUID):
+        """Remove um agendamento do índice"""
+        with self._lock:
+            self._discard(schedule_id)
+    
+    def invalidate(self, provider_id: Optional[uuid.UUID] = None):
+        """Descarta a janela de um profissional (ou de todos)"""
+        with self._lock:
+            if provider_id is None:
+                self._providers.clear()
+                self._entries.clear()
+                return
+            
+            self._invalidate(provider_id)
+    
+    def _invalidate(self, provider_id: uuid.UUID):
+        intervals = self._providers.pop(provider_id, None)
+        if intervals:
+            for _, _, schedule_id in intervals.intervals:
+                self._entries.pop(schedule_id, None)
+    
+    def _discard(self, schedule_id: uuid.UUID):
+        entry = self._entries.pop(schedule_id, None)
+        if entry is None:
+            return
+        
+        provider_id, start = entry
+        if start is None:
+            self._invalidate(provider_id)
+            return
+        
+        intervals = self._providers.get(provider_id)
+        if intervals:
+            intervals.remove(start, schedule_id)
+
+# Instância compartilhada pelo processo
+availability_index = AvailabilityIndex(
+    window_days=settings.AVAILABILITY_INDEX_WINDOW_DAYS,
+    ttl_seconds=settings.AVAILABILITY_INDEX_TTL_SECONDS
+)
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+from app.config import settings
+
+def months_between(start_date: datetime, end_date: datetime) -> Iterator[Tuple[int, int]]:
+    """Meses (ano, mês) tocados pelo período, inclusive"""
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        yield year, month
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+class CalendarCache:
+    """Cache do calendário mensal invalidado por versão.
+    
+    Cada (tenant, ano, mês) tem uma versão incrementada pelas escritas do
+    ScheduleService; a entrada só é válida se foi gerada na versão atual.
+    Escritas sem período definido incrementam a geração do tenant inteiro.
+    
+    Versões e entradas são do processo: escritas atendidas por outro worker
+    não invalidam este cache, por isso toda entrada expira após ttl_seconds.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, Tuple[tuple, float, Any]]" = OrderedDict()
+        self._month_versions: Dict[Tuple[int, int, int], int] = {}
+        self._tenant_versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def version(self, tenant_id: int, year: int, month: int) -> tuple:
+        """Versão atual dos dados de um mês do tenant"""
+        with self._lock:
+            return (
+                self._tenant_versions.get(tenant_id, 0),
+                self._month_versions.get((tenant_id, year, month), 0)
+            )
+    
+    def get(self, key: tuple, version: tuple) -> Optional[Any]:
+        """Retorna o valor em cache se ainda estiver na versão informada e dentro do TTL"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or time.monotonic() - entry[1] >= self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+    
+    def set(self, key: tuple, version: tuple, value: Any):
+        """Guarda o valor calculado na versão lida antes do cálculo"""
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def bump(self, tenant_id: int, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None):
+        """Invalida os meses do período (ou o tenant inteiro, sem período)"""
+        with self._lock:
+            self.invalidations += 1
+            if start_date is None or end_date is None:
+                self._tenant_versions[tenant_id] = self._tenant_versions.get(tenant_id, 0) + 1
+                return
+            for year, month in months_between(start_date, end_date):
+                key = (tenant_id, year, month)
+                self._month_versions[key] = self._month_versions.get(key, 0) + 1
+    
+    def clear(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para dimensionar o cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.CALENDAR_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations
+            }
+
+# Instância compartilhada pelo processo
+calendar_cache = CalendarCache(
+    max_entries=settings.CALENDAR_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.CALENDAR_CACHE_TTL_SECONDS
+)
@@ -6,6 +6,7 @@ import pandas as pd
 import io
 from datetime import datetime
 from typing import List, Optional, Dict, Any
+from app.services.import_validation import validate_in_shards, report_repeated_rows, text_column
 from app import models, schemas
 
 class CategoryService:
@@ -37,8 +38,8 @@ class CategoryService:
             models.Category.status == models.CategoryStatus.ACTIVE
         ).all()
     
-    def create_category(self, category_data: schemas.CategoryCreate) -> models.Category:
-        """Cria uma nova categoria"""
+    def create_category(self, category_data: schemas.CategoryCreate, commit: bool = True) -> models.Category:
+        """Cria uma nova categoria (commit=False só envia ao banco; quem chama confirma)"""
         # Verificar duplicidade por nome
         existing = self.get_category_by_name(category_data.name)
         if existing:
@@ -73,8 +74,11 @@ class CategoryService:
                 )
                 self.db.execute(stmt)
         
-        self.db.commit()
-        self.db.refresh(db_category)
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_category)
+        else:
+            self.db.flush()
         
         return db_category
     
@@ -154,57 +158,83 @@ class CategoryService:
         try:
             # Ler CSV
             df = pd.read_csv(io.StringIO(file_content.decode('utf-8')))
-            
-            result = {
-                'total_records': len(df),
-                'new_records': 0,
-                'duplicates_found': [],
-                'errors': []
-            }
-            
-            for idx, row in df.iterrows():
-                try:
-                    # Verificar duplicidade por nome
-                    existing = None
-                    if 'nome' in row and pd.notna(row['nome']):
-                        existing = self.get_category_by_name(row['nome'].strip())
-                    elif 'name' in row and pd.notna(row['name']):
-                        existing = self.get_category_by_name(row['name'].strip())
-                    
-                    if existing:
-                        # Registro duplicado
-                        result['duplicates_found'].append({
-                            'row': idx + 2,
-                            'data': row.to_dict(),
-                            'existing_category': {
-                                'id': str(existing.id),
-                                'name': existing.name,
-                                'description': existing.description,
-                                'status': existing.status.value if existing.status else None
-                            }
-                        })
-                    else:
-                        # Criar nova categoria
-                        category_data = self._parse_import_row(row)
-                        if category_data:
-                            self.create_category(category_data)
-                            result['new_records'] += 1
-                
-                except Exception as e:
-                    result['errors'].append({
-                        'row': idx + 2,
-                        'error': str(e)
-                    })
-            
-            return schemas.CategoryImportResult(**result)
-        
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Erro ao processar arquivo: {str(e)}"
             )
+        
+        result = self.import_frame(df)
+        self.db.commit()
+        return schemas.CategoryImportResult(**result)
     
-    def _parse_import_row(self, row: pd.Series) -> Optional[schemas.CategoryCreate]:
+    def import_frame(self, df: pd.DataFrame, first_row: int = 2) -> Dict[str, Any]:
+        """Importa as linhas do DataFrame sem confirmar (first_row = número da 1ª linha no arquivo)"""
+        result = {
+            'total_records': len(df),
+            'new_records': 0,
+            'duplicates_found': [],
+            'errors': []
+        }
+        
+        # Categorias já cadastradas com os nomes do bloco (uma consulta)
+        existing_names = self.import_lookups(df)['existing']
+        
+        for idx, row in df.reset_index(drop=True).iterrows():
+            try:
+                # Verificar duplicidade por nome
+                existing = _find_existing_category(row, existing_names)
+                
+                if existing:
+                    # Registro duplicado
+                    result['duplicates_found'].append({
+                        'row': idx + first_row,
+                        'data': row.to_dict(),
+                        'existing_category': existing
+                    })
+                else:
+                    # Criar nova categoria
+                    category_data = self._parse_import_row(row)
+                    if category_data:
+                        # Savepoint por linha: um erro descarta só a linha, o bloco é confirmado por quem chamou
+                        with self.db.begin_nested():
+                            category = self.create_category(category_data, commit=False)
+                        # Linhas seguintes com o mesmo nome viram duplicadas
+                        existing_names[category.name] = _existing_category(category)
+                        result['new_records'] += 1
+            
+            except Exception as e:
+                result['errors'].append({
+                    'row': idx + first_row,
+                    'error': str(e)
+                })
+        
+        return result
+    
+    def import_lookups(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Categorias já cadastradas com os nomes do bloco (uma consulta)"""
+        names = set()
+        for column in ('nome', 'name'):
+            if column in df.columns:
+                names.update(str(name).strip() for name in df[column].dropna())
+        
+        existing: Dict[str, dict] = {}
+        for category in self.db.query(models.Category).filter(
+            models.Category.name.in_(names),
+            models.Category.is_deleted == False
+        ):
+            existing.setdefault(category.name, _existing_category(category))
+        return {'existing': existing}
+    
+    def validate_frame(self, df: pd.DataFrame, first_row: int = 2) -> Dict[str, Any]:
+        """Modo dry_run: só valida as linhas, em paralelo, sem gravar nada"""
+        df = df.reset_index(drop=True)
+        result = validate_in_shards(validate_import_rows, df, self.import_lookups(df), first_row)
+        # Nome repetido no próprio bloco: a importação real cria só o primeiro
+        return report_repeated_rows(result, df, pd.DataFrame({'name': text_column(df, 'nome', 'name')}), first_row)
+    
+    @staticmethod
+    def _parse_import_row(row: pd.Series) -> Optional[schemas.CategoryCreate]:
         """Converte linha do CSV para CategoryCreate"""
         try:
             # Mapear colunas
@@ -263,3 +293,40 @@ class CategoryService:
         self.db.refresh(db_category)
         
         return db_category
+
+def _existing_category(category: models.Category) -> dict:
+    return {
+        'id': str(category.id),
+        'name': category.name,
+        'description': category.description,
+        'status': category.status.value if category.status else None
+    }
+
+def _find_existing_category(row: pd.Series, existing: Dict[str, dict]) -> Optional[dict]:
+    """Categoria já cadastrada com o nome da linha (nome ou name)"""
+    name = row.get('nome') if 'nome' in row and pd.notna(row['nome']) else row.get('name')
+    return existing.get(name.strip()) if isinstance(name, str) else None
+
+def validate_import_rows(df: pd.DataFrame, lookups: Dict[str, Any], first_row: int) -> Dict[str, list]:
+    """Validação de um shard do dry_run (executada em outro processo)"""
+    result = {'duplicates_found': [], 'errors': []}
+    for idx, row in df.iterrows():
+        try:
+            existing = _find_existing_category(row, lookups['existing'])
+            
+            if existing:
+                result['duplicates_found'].append({
+                    'row': idx + first_row,
+                    'data': row.to_dict(),
+                    'existing_category': existing
+                })
+            else:
+                CategoryService._parse_import_row(row)
+        
+        except Exception as e:
+            result['errors'].append({
+                'row': idx + first_row,
+                'error': str(e)
+            })
+    
+    return result
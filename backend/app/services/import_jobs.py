@@ -0,0 +1,261 @@
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import pandas as pd
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.orm import Session, sessionmaker
+from app import models, schemas
+from app.config import settings
+from app.utils.spreadsheet import UNSUPPORTED_EXTENSIONS, read_chunks
+
+# Bloco lido do upload por vez ao gravar o arquivo temporário
+UPLOAD_READ_SIZE = 1024 * 1024
+
+# Processa um bloco do arquivo: (sessão, usuário, DataFrame, nº da 1ª linha) -> resultado parcial
+ChunkHandler = Callable[[Session, models.User, pd.DataFrame, int], Dict[str, Any]]
+
+async def spool_upload(upload: UploadFile) -> str:
+    """Grava o upload em um arquivo temporário aos poucos e retorna o caminho.
+    
+    O arquivo sobrevive à requisição e é apagado pelo job ao terminar.
+    A extensão é mantida: .xlsx é lido como planilha, o resto como CSV.
+    """
+    suffix = os.path.splitext(upload.filename or "")[1].lower()
+    if suffix in UNSUPPORTED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato .xls não suportado; salve a planilha como .xlsx ou CSV"
+        )
+    with tempfile.NamedTemporaryFile(prefix="import-", suffix=suffix, delete=False) as target:
+        while True:
+            block = await upload.read(UPLOAD_READ_SIZE)
+            if not block:
+                break
+            target.write(block)
+    return target.name
+
+class ImportJob:
+    """Estado de uma importação; alterado só pela thread do job"""
+    
+    def __init__(self, kind: str, tenant_id: Optional[int], created_by_id: uuid.UUID,
+                 file_name: Optional[str], file_size: int, dry_run: bool = False):
+        self.id = uuid.uuid4()
+        self.kind = kind
+        self.dry_run = dry_run
+        self.tenant_id = tenant_id
+        self.created_by_id = created_by_id
+        self.file_name = file_name
+        self.file_size = file_size
+        self.status = schemas.ImportJobStatus.PENDING
+        self.rows_done = 0
+        self.chunks_done = 0
+        self.new_records = 0
+        self.duplicates_found: list = []
+        self.conflicts_found: list = []
+        self.errors: list = []
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.detail: Optional[str] = None
+        self._started = 0.0
+        self._elapsed = 0.0
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in (schemas.ImportJobStatus.COMPLETED, schemas.ImportJobStatus.FAILED)
+    
+    def merge(self, result: Dict[str, Any]):
+        """Acumula o resultado de um bloco"""
+        self.new_records += result.get('new_records', 0)
+        self.duplicates_found.extend(_json_safe(result.get('duplicates_found', [])))
+        self.conflicts_found.extend(_json_safe(result.get('conflicts_found', [])))
+        self.errors.extend(_json_safe(result.get('errors', [])))
+    
+    def snapshot(self) -> schemas.ImportJob:
+        elapsed = self._elapsed or (time.perf_counter() - self._started if self._started else 0.0)
+        return schemas.ImportJob(
+            id=self.id,
+            kind=self.kind,
+            status=self.status,
+            dry_run=self.dry_run,
+            tenant_id=self.tenant_id,
+            file_name=self.file_name,
+            file_size=self.file_size,
+            rows_done=self.rows_done,
+            chunks_done=self.chunks_done,
+            new_records=self.new_records,
+            duplicates_found=list(self.duplicates_found),
+            conflicts_found=list(self.conflicts_found),
+            errors=list(self.errors),
+            rows_per_second=round(self.rows_done / elapsed, 1) if elapsed else 0.0,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            detail=self.detail
+        )
+
+class ImportJobManager:
+    """Executa importações em threads, lendo o arquivo (CSV ou .xlsx) em blocos.
+    
+    Cada bloco é processado e confirmado (commit) em uma sessão própria do
+    job; o progresso fica em memória no processo e é consultado por
+    GET /imports/{job_id}. Em dry_run os blocos são maiores e nunca são
+    confirmados (o handler só valida). Jobs concluídos além de max_finished são
+    descartados, do mais antigo para o mais novo.
+    """
+    
+    def __init__(self, max_workers: int, chunk_size: int, dry_run_chunk_size: int, max_finished: int):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.dry_run_chunk_size = dry_run_chunk_size
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[uuid.UUID, ImportJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def submit(
+        self,
+        kind: str,
+        path: str,
+        handler: ChunkHandler,
+        db: Session,
+        current_user: models.User,
+        tenant_id: Optional[int] = None,
+        file_name: Optional[str] = None,
+        dtype: Any = None,
+        dry_run: bool = False
+    ) -> schemas.ImportJob:
+        """Agenda a importação do arquivo e retorna o job sem esperar o processamento"""
+        job = ImportJob(kind, tenant_id, current_user.id, file_name, os.path.getsize(path), dry_run)
+        session_factory = sessionmaker(bind=db.get_bind())
+        snapshot = job.snapshot()
+        
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="import"
+                )
+            self._executor.submit(self._run, job, path, handler, session_factory, current_user.id, dtype)
+        
+        return snapshot
+    
+    def get(self, job_id: uuid.UUID, current_user: models.User) -> schemas.ImportJob:
+        """Progresso do job; só o autor ou um super admin podem consultar"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Importação não encontrada"
+            )
+        if not current_user.is_super_admin and job.created_by_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Sem acesso a esta importação"
+            )
+        return job.snapshot()
+    
+    def _run(self, job: ImportJob, path: str, handler: ChunkHandler,
+             session_factory: sessionmaker, user_id: uuid.UUID, dtype: Any):
+        job.status = schemas.ImportJobStatus.RUNNING
+        job.started_at = datetime.now()
+        job._started = time.perf_counter()
+        db = session_factory()
+        final_status = schemas.ImportJobStatus.COMPLETED
+        try:
+            current_user = db.get(models.User, user_id)
+            chunk_size = self.dry_run_chunk_size if job.dry_run else self.chunk_size
+            for chunk in read_chunks(path, chunk_size, dtype):
+                # +2: cabeçalho e índice iniciado em 0
+                first_row = job.rows_done + 2
+                self._process_chunk(job, db, handler, current_user, chunk, first_row)
+                job.rows_done += len(chunk)
+                job.chunks_done += 1
+        except Exception as e:
+            # Arquivo ilegível: as linhas já confirmadas são mantidas
+            final_status = schemas.ImportJobStatus.FAILED
+            job.detail = f"Erro ao processar arquivo: {str(e)}"
+        finally:
+            db.close()
+            job._elapsed = time.perf_counter() - job._started
+            job.finished_at = datetime.now()
+            job.status = final_status
+            os.unlink(path)
+    
+    def _process_chunk(self, job: ImportJob, db: Session, handler: ChunkHandler,
+                       current_user: models.User, chunk: pd.DataFrame, first_row: int):
+        """Processa um bloco; se ele falhar por inteiro, refaz linha a linha.
+        
+        HTTPException vem de uma validação do bloco todo (ex.: coluna
+        obrigatória ausente) e vale para todas as linhas, reportadas como
+        intervalo. Outro erro (ex.: uma linha que viola uma constraint no
+        commit) descarta o bloco; as linhas são reprocessadas uma a uma para
+        que só as com problema fiquem de fora.
+        """
+        last_row = first_row + len(chunk) - 1
+        try:
+            job.merge(self._apply(job, db, handler, current_user, chunk, first_row))
+            return
+        except HTTPException as e:
+            job.merge({'errors': [{'row': first_row, 'last_row': last_row, 'error': e.detail}]})
+            return
+        except Exception:
+            pass
+        
+        for offset in range(len(chunk)):
+            row = first_row + offset
+            try:
+                result = self._apply(job, db, handler, current_user, chunk.iloc[offset:offset + 1], row)
+            except HTTPException as e:
+                result = {'errors': [{'row': row, 'error': e.detail}]}
+            except Exception as e:
+                result = {'errors': [{'row': row, 'error': f"Erro ao processar linha: {str(e)}"}]}
+            job.merge(result)
+    
+    @staticmethod
+    def _apply(job: ImportJob, db: Session, handler: ChunkHandler,
+               current_user: models.User, chunk: pd.DataFrame, first_row: int) -> Dict[str, Any]:
+        """Executa o handler e confirma (ou desfaz, em dry_run); em erro desfaz e repassa"""
+        try:
+            result = handler(db, current_user, chunk, first_row)
+            if job.dry_run:
+                db.rollback()
+            else:
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return result
+    
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+def _json_safe(items: list) -> list:
+    """NaN das células vazias vira None (o JSON da resposta não aceita NaN)"""
+    def clean(value):
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        if isinstance(value, dict):
+            return {key: clean(item) for key, item in value.items()}
+        return value
+    return [clean(item) for item in items]
+
+# Instância compartilhada pelo processo
+import_jobs = ImportJobManager(
+    max_workers=settings.IMPORT_WORKERS,
+    chunk_size=settings.IMPORT_CHUNK_SIZE,
+    dry_run_chunk_size=settings.IMPORT_DRY_RUN_CHUNK_SIZE,
+    max_finished=settings.IMPORT_JOBS_MAX_FINISHED
+)
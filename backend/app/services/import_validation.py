@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import pandas as pd
+from app.config import settings
+
+# Valida um shard: (DataFrame, lookups pré-carregados, nº da 1ª linha) -> resultado parcial.
+# Precisa ser uma função de módulo (é enviada para outro processo).
+ShardValidator = Callable[[pd.DataFrame, Dict[str, Any], int], Dict[str, list]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def validation_pool() -> ProcessPoolExecutor:
+    """Pool de processos compartilhado, criado no primeiro dry_run.
+    
+    Usa spawn: os processos filhos não herdam conexões nem threads do
+    servidor.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMPORT_VALIDATION_PROCESSES or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def validate_in_shards(
+    validator: ShardValidator,
+    df: pd.DataFrame,
+    lookups: Dict[str, Any],
+    first_row: int = 2
+) -> Dict[str, list]:
+    """Divide o bloco em shards, valida em paralelo e junta os relatórios na ordem das linhas.
+    
+    Nada é gravado: o validador só lê o DataFrame e os lookups. Blocos que
+    cabem em um shard são validados na própria thread.
+    """
+    shard_rows = settings.IMPORT_VALIDATION_SHARD_ROWS
+    starts = range(0, len(df), shard_rows)
+    if len(starts) <= 1:
+        return _with_totals(validator(df, lookups, first_row), len(df))
+    
+    pool = validation_pool()
+    futures = [
+        pool.submit(validator, df.iloc[start:start + shard_rows].reset_index(drop=True), lookups, first_row + start)
+        for start in starts
+    ]
+    
+    result: Dict[str, List[dict]] = {}
+    for future in futures:
+        for key, items in future.result().items():
+            result.setdefault(key, []).extend(items)
+    return _with_totals(result, len(df))
+
+def _with_totals(result: Dict[str, Any], total: int) -> Dict[str, Any]:
+    return {'total_records': total, 'new_records': 0, **result}
+
+def text_column(df: pd.DataFrame, *columns: str) -> pd.Series:
+    """Primeiro valor preenchido entre as colunas (ex.: nome/name), sem espaços nas pontas"""
+    values = pd.Series(None, index=df.index, dtype=object)
+    for column in columns:
+        if column in df.columns:
+            values = values.where(values.notna() & (values != ""), df[column].astype(object))
+    return values.map(lambda value: str(value).strip() if pd.notna(value) else None)
+
+def report_repeated_rows(
+    result: Dict[str, Any],
+    df: pd.DataFrame,
+    keys: pd.DataFrame,
+    first_row: int = 2
+) -> Dict[str, Any]:
+    """Acrescenta ao relatório do dry_run as linhas que repetem outra do próprio bloco.
+    
+    A importação grava linha a linha: uma linha cuja chave (qualquer coluna
+    de `keys`) já foi criada por uma linha anterior vira duplicada, antes de
+    ser validada. Os shards não veem as outras linhas, então a conferência é
+    feita aqui, só nas linhas que duplicated() aponta.
+    """
+    repeated = pd.Series(False, index=keys.index)
+    for column in keys.columns:
+        repeated |= keys[column].notna() & keys[column].duplicated(keep=False)
+    if not repeated.any():
+        return result
+    
+    errors = {item['row']: item for item in result.get('errors', [])}
+    duplicates = {item['row']: item for item in result.get('duplicates_found', [])}
+    created: Dict[tuple, int] = {}
+    for idx in keys.index[repeated]:
+        row = idx + first_row
+        if row in duplicates:
+            continue
+        
+        row_keys = [(column, value) for column, value in keys.loc[idx].items() if pd.notna(value)]
+        earlier = next((created[key] for key in row_keys if key in created), None)
+        if earlier is not None:
+            errors.pop(row, None)
+            duplicates[row] = {'row': row, 'data': df.loc[idx].to_dict(), 'duplicate_of_row': earlier}
+        elif row not in errors:
+            for key in row_keys:
+                created.setdefault(key, row)
+    
+    result['errors'] = [errors[row] for row in sorted(errors)]
+    result['duplicates_found'] = [duplicates[row] for row in sorted(duplicates)]
+    return result
@@ -5,20 +5,30 @@ import uuid
 import pandas as pd
 import io
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from app import models, schemas
+from app.utils.fields import fields_load_only
+from app.services.import_validation import validate_in_shards, report_repeated_rows, text_column
 
 class ProductService:
     def __init__(self, db: Session, current_user: models.User):
         self.db = db
         self.current_user = current_user
     
-    def get_product_by_id(self, product_id: uuid.UUID) -> Optional[models.Product]:
+    def get_product_by_id(
+        self,
+        product_id: uuid.UUID,
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> Optional[models.Product]:
         """Busca produto por ID (ignorando soft delete)"""
-        return self.db.query(models.Product).filter(
+        query = self.db.query(models.Product).filter(
             models.Product.id == product_id,
             models.Product.is_deleted == False
-        ).first()
+        )
+        if fields:
+            # tenant_id é usado no controle de acesso
+            query = query.options(fields_load_only(models.Product, fields, models.Product.tenant_id))
+        return query.first()
     
     def get_product_by_name_and_tenant(self, name: str, tenant_id: int) -> Optional[models.Product]:
         """Busca produto por nome e tenant"""
@@ -49,8 +59,8 @@ class ProductService:
             models.Product.is_deleted == False
         ).all()
     
-    def create_product(self, product_data: schemas.ProductCreate) -> models.Product:
-        """Cria um novo produto"""
+    def create_product(self, product_data: schemas.ProductCreate, commit: bool = True) -> models.Product:
+        """Cria um novo produto (commit=False só envia ao banco; quem chama confirma)"""
         # Verificar duplicidade por nome no mesmo tenant
         existing = self.get_product_by_name_and_tenant(product_data.name, product_data.tenant_id)
         if existing:
@@ -112,8 +122,11 @@ class ProductService:
         )
         
         self.db.add(db_product)
-        self.db.commit()
-        self.db.refresh(db_product)
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_product)
+        else:
+            self.db.flush()
         
         return db_product
     
@@ -197,58 +210,110 @@ class ProductService:
         try:
             # Ler CSV
             df = pd.read_csv(io.StringIO(file_content.decode('utf-8')))
-            
-            result = {
-                'total_records': len(df),
-                'new_records': 0,
-                'duplicates_found': [],
-                'errors': []
-            }
-            
-            for idx, row in df.iterrows():
-                try:
-                    # Verificar duplicidade por nome no tenant
-                    name = row.get('nome') or row.get('name')
-                    if not name:
-                        raise ValueError("Nome do produto é obrigatório")
-                    
-                    existing = self.get_product_by_name_and_tenant(name.strip(), tenant_id)
-                    
-                    if existing:
-                        # Registro duplicado
-                        result['duplicates_found'].append({
-                            'row': idx + 2,
-                            'data': row.to_dict(),
-                            'existing_product': {
-                                'id': str(existing.id),
-                                'name': existing.name,
-                                'price': existing.price,
-                                'status': existing.status.value if existing.status else None
-                            }
-                        })
-                    else:
-                        # Criar novo produto
-                        product_data = self._parse_import_row(row, tenant_id)
-                        if product_data:
-                            self.create_product(product_data)
-                            result['new_records'] += 1
-                
-                except Exception as e:
-                    result['errors'].append({
-                        'row': idx + 2,
-                        'error': str(e)
-                    })
-            
-            return schemas.ProductImportResult(**result)
-        
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Erro ao processar arquivo: {str(e)}"
             )
+        
+        result = self.import_frame(df, tenant_id)
+        self.db.commit()
+        return schemas.ProductImportResult(**result)
     
-    def _parse_import_row(self, row: pd.Series, tenant_id: int) -> Optional[schemas.ProductCreate]:
-        """Converte linha do CSV para ProductCreate"""
+    def import_frame(self, df: pd.DataFrame, tenant_id: int, first_row: int = 2) -> Dict[str, Any]:
+        """Importa as linhas do DataFrame sem confirmar (first_row = número da 1ª linha no arquivo)"""
+        result = {
+            'total_records': len(df),
+            'new_records': 0,
+            'duplicates_found': [],
+            'errors': []
+        }
+        
+        lookups = self.import_lookups(df, tenant_id)
+        
+        for idx, row in df.reset_index(drop=True).iterrows():
+            try:
+                # Verificar duplicidade por nome no tenant
+                name = row.get('nome') or row.get('name')
+                if not name:
+                    raise ValueError("Nome do produto é obrigatório")
+                
+                # Produtos do tenant pré-carregados em import_lookups (um IN por bloco)
+                existing = lookups['existing'].get(name.strip())
+                
+                if existing:
+                    # Registro duplicado
+                    result['duplicates_found'].append({
+                        'row': idx + first_row,
+                        'data': row.to_dict(),
+                        'existing_product': existing
+                    })
+                else:
+                    # Criar novo produto
+                    product_data = self._parse_import_row(row, tenant_id, lookups)
+                    if product_data:
+                        # Savepoint por linha: um erro descarta só a linha, o bloco é confirmado por quem chamou
+                        with self.db.begin_nested():
+                            product = self.create_product(product_data, commit=False)
+                        # Linhas seguintes com o mesmo nome viram duplicadas
+                        lookups['existing'][product.name] = _existing_product(product)
+                        result['new_records'] += 1
+            
+            except Exception as e:
+                result['errors'].append({
+                    'row': idx + first_row,
+                    'error': str(e)
+                })
+        
+        return result
+    
+    def import_lookups(self, df: pd.DataFrame, tenant_id: int) -> Dict[str, Any]:
+        """Categorias, profissionais e produtos do tenant citados no bloco (uma consulta IN cada)"""
+        def distinct(*columns: str) -> List[str]:
+            values = set()
+            for column in columns:
+                if column in df.columns:
+                    values.update(str(value).strip() for value in df[column].dropna())
+            return list(values)
+        
+        categories: Dict[str, uuid.UUID] = {}
+        for name, category_id in self.db.query(models.Category.name, models.Category.id).filter(
+            models.Category.name.in_(distinct('categoria', 'category')),
+            models.Category.is_deleted == False
+        ).order_by(models.Category.created_at):
+            categories.setdefault(name, category_id)
+        
+        professionals = dict(self.db.query(models.User.email, models.User.id).filter(
+            models.User.email.in_(distinct('profissional_email', 'professional_email')),
+            models.User.is_deleted == False,
+            models.User.user_type == models.UserType.PROVIDER
+        ).all())
+        
+        existing: Dict[str, dict] = {}
+        for product in self.db.query(models.Product).filter(
+            models.Product.name.in_(distinct('nome', 'name')),
+            models.Product.tenant_id == tenant_id,
+            models.Product.is_deleted == False
+        ):
+            existing.setdefault(product.name, _existing_product(product))
+        
+        return {
+            'tenant_id': tenant_id,
+            'categories': categories,
+            'professionals': professionals,
+            'existing': existing
+        }
+    
+    def validate_frame(self, df: pd.DataFrame, tenant_id: int, first_row: int = 2) -> Dict[str, Any]:
+        """Modo dry_run: só valida as linhas, em paralelo, sem gravar nada"""
+        df = df.reset_index(drop=True)
+        result = validate_in_shards(validate_import_rows, df, self.import_lookups(df, tenant_id), first_row)
+        # Nome repetido no próprio bloco: a importação real cria só o primeiro
+        return report_repeated_rows(result, df, pd.DataFrame({'name': text_column(df, 'nome', 'name')}), first_row)
+    
+    @staticmethod
+    def _parse_import_row(row: pd.Series, tenant_id: int, lookups: Dict[str, Any]) -> Optional[schemas.ProductCreate]:
+        """Converte linha do CSV para ProductCreate (referências vindas de import_lookups)"""
         try:
             # Mapear colunas
             name = row.get('nome') or row.get('name')
@@ -260,12 +325,8 @@ class ProductService:
             if not category_name:
                 raise ValueError("Categoria é obrigatória")
             
-            category = self.db.query(models.Category).filter(
-                models.Category.name == category_name.strip(),
-                models.Category.is_deleted == False
-            ).first()
-            
-            if not category:
+            category_id = lookups['categories'].get(category_name.strip())
+            if not category_id:
                 raise ValueError(f"Categoria '{category_name}' não encontrada")
             
             # Buscar profissional pelo email
@@ -273,13 +334,8 @@ class ProductService:
             if not professional_email:
                 raise ValueError("Email do profissional é obrigatório")
             
-            professional = self.db.query(models.User).filter(
-                models.User.email == professional_email.strip(),
-                models.User.is_deleted == False,
-                models.User.user_type == models.UserType.PROVIDER
-            ).first()
-            
-            if not professional:
+            professional_id = lookups['professionals'].get(professional_email.strip())
+            if not professional_id:
                 raise ValueError(f"Profissional com email '{professional_email}' não encontrado")
             
             # Comissão
@@ -317,8 +373,8 @@ class ProductService:
                 'professional_commission': int(float(commission)),
                 'product_visible_to_end_user': product_visible,
                 'price_visible_to_end_user': price_visible,
-                'category_id': category.id,
-                'professional_id': professional.id,
+                'category_id': category_id,
+                'professional_id': professional_id,
                 'tenant_id': tenant_id
             }
             
@@ -400,3 +456,38 @@ class ProductService:
             result.append(product_dict)
         
         return result
+
+def _existing_product(product: models.Product) -> dict:
+    return {
+        'id': str(product.id),
+        'name': product.name,
+        'price': product.price,
+        'status': product.status.value if product.status else None
+    }
+
+def validate_import_rows(df: pd.DataFrame, lookups: Dict[str, Any], first_row: int) -> Dict[str, list]:
+    """Validação de um shard do dry_run (executada em outro processo)"""
+    result = {'duplicates_found': [], 'errors': []}
+    for idx, row in df.iterrows():
+        try:
+            name = row.get('nome') or row.get('name')
+            if not name:
+                raise ValueError("Nome do produto é obrigatório")
+            
+            existing = lookups['existing'].get(name.strip())
+            if existing:
+                result['duplicates_found'].append({
+                    'row': idx + first_row,
+                    'data': row.to_dict(),
+                    'existing_product': existing
+                })
+            else:
+                ProductService._parse_import_row(row, lookups['tenant_id'], lookups)
+        
+        except Exception as e:
+            result['errors'].append({
+                'row': idx + first_row,
+                'error': str(e)
+            })
+    
+    return result
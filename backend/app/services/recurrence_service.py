@@ -0,0 +1,108 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import or_
+import uuid
+from datetime import datetime, date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app import models
+from app.utils.recurrence import expand_occurrences, align_timezone
+
+class Occurrence(NamedTuple):
+    """Ocorrência de uma série recorrente, já com a exceção do dia aplicada"""
+    schedule: models.Schedule
+    start_date: datetime
+    end_date: datetime
+    status: models.ScheduleStatus
+    notes: Optional[str]
+    is_exception: bool
+
+def load_recurring_schedules(
+    db: Session,
+    window_start: datetime,
+    window_end: datetime,
+    tenant_id: Optional[int] = None,
+    provider_ids: Optional[List[uuid.UUID]] = None
+) -> List[models.Schedule]:
+    """Busca as séries recorrentes que podem ter ocorrências no período"""
+    query = db.query(models.Schedule).filter(
+        models.Schedule.is_deleted == False,
+        models.Schedule.recurrence_type != models.RecurrenceType.NONE,
+        models.Schedule.start_date < window_end,
+        # Margem para a última ocorrência, que pode começar no dia final da série
+        or_(
+            models.Schedule.recurrence_end_date == None,
+            models.Schedule.recurrence_end_date >= window_start - timedelta(days=2)
+        )
+    )
+    
+    if tenant_id:
+        query = query.filter(models.Schedule.tenant_id == tenant_id)
+    if provider_ids is not None:
+        query = query.filter(models.Schedule.provider_id.in_(provider_ids))
+    
+    return query.order_by(models.Schedule.start_date).all()
+
+def load_exceptions(
+    db: Session,
+    schedule_ids: List[uuid.UUID],
+    window_start: datetime,
+    window_end: datetime
+) -> Dict[Tuple[uuid.UUID, date], models.RecurringScheduleInstance]:
+    """Busca as exceções (status/observações por dia) das séries no período"""
+    if not schedule_ids:
+        return {}
+    
+    rows = db.query(models.RecurringScheduleInstance).filter(
+        models.RecurringScheduleInstance.parent_schedule_id.in_(schedule_ids),
+        models.RecurringScheduleInstance.instance_date >= window_start - timedelta(days=1),
+        models.RecurringScheduleInstance.instance_date < window_end
+    ).all()
+    
+    return {(row.parent_schedule_id, row.instance_date.date()): row for row in rows}
+
+def expand_schedules(
+    db: Session,
+    schedules: List[models.Schedule],
+    window_start: datetime,
+    window_end: datetime
+) -> List[Occurrence]:
+    """Expande as séries no período aplicando as exceções por dia"""
+    exceptions = load_exceptions(db, [s.id for s in schedules], window_start, window_end)
+    
+    occurrences = []
+    for schedule in schedules:
+        for start_date, end_date in expand_occurrences(
+            schedule.start_date,
+            schedule.end_date,
+            schedule.recurrence_type,
+            schedule.recurrence_end_date,
+            schedule.recurrence_days,
+            window_start,
+            window_end
+        ):
+            exception = exceptions.get((schedule.id, start_date.date()))
+            # Série cancelada/inativa vale para todas as ocorrências
+            occurrence_status = schedule.status
+            if exception and schedule.status == models.ScheduleStatus.ACTIVE:
+                occurrence_status = exception.status
+            occurrences.append(Occurrence(
+                schedule=schedule,
+                start_date=start_date,
+                end_date=end_date,
+                status=occurrence_status,
+                notes=exception.notes if exception else None,
+                is_exception=exception is not None
+            ))
+    
+    occurrences.sort(key=lambda o: align_timezone(o.start_date, window_start))
+    return occurrences
+
+def load_occurrences(
+    db: Session,
+    window_start: datetime,
+    window_end: datetime,
+    tenant_id: Optional[int] = None,
+    provider_ids: Optional[List[uuid.UUID]] = None
+) -> List[Occurrence]:
+    """Ocorrências das séries recorrentes no período (duas consultas)"""
+    schedules = load_recurring_schedules(db, window_start, window_end, tenant_id, provider_ids)
+    return expand_schedules(db, schedules, window_start, window_end)
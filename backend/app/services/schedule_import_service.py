@@ -0,0 +1,497 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, tuple_
+from fastapi import HTTPException, status
+import uuid
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from app import models, schemas
+from app.config import settings
+from app.services.availability_service import (
+    availability_index, commit_booking, load_busy_intervals, overlapping_mask, to_epoch, ProviderIntervals
+)
+from app.services.calendar_cache import calendar_cache
+from app.services.import_validation import validate_in_shards
+from app.utils.recurrence import WEEKDAYS, occurrence_offsets
+
+# Coluna interna -> nomes aceitos no arquivo (português ou inglês)
+IMPORT_COLUMNS = {
+    'provider_email': ('profissional_email', 'provider_email'),
+    'user_email': ('usuario_email', 'user_email'),
+    'category': ('categoria', 'category'),
+    'product': ('produto', 'product'),
+    'start_date': ('data_inicio', 'start_date'),
+    'end_date': ('data_fim', 'end_date'),
+    'price': ('preco', 'price'),
+    'recurrence_type': ('recorrencia', 'recurrence_type'),
+    'recurrence_days': ('dias_recorrencia', 'recurrence_days'),
+    'recurrence_end_date': ('data_fim_recorrencia', 'recurrence_end_date'),
+}
+
+# Duração usada quando o arquivo não informa a data de término
+DEFAULT_DURATION = timedelta(hours=1)
+
+# Chaves por consulta na busca de duplicados (limita os parâmetros do IN)
+DUPLICATE_LOOKUP_BATCH = 1000
+
+class ScheduleImportService:
+    """Importação de agendamentos em lote a partir de um DataFrame.
+    
+    As referências (profissionais, usuários, categorias e produtos) são
+    resolvidas com uma consulta IN por entidade, as linhas são validadas
+    com operações vetorizadas do pandas e as válidas são inseridas em uma
+    única transação. Linhas recorrentes gravam só a regra da série, como
+    em ScheduleService.create_schedule, mas todas as ocorrências passam
+    pela verificação de conflitos.
+    
+    Linhas com a mesma chave natural (profissional, usuário, início, fim e
+    produto) de um agendamento existente ou de uma linha anterior do arquivo
+    são duplicadas: vão para o relatório e não são gravadas, o que torna a
+    reimportação do mesmo arquivo idempotente.
+    """
+    
+    def __init__(self, db: Session, current_user: models.User):
+        self.db = db
+        self.current_user = current_user
+    
+    def ensure_tenant(self, tenant_id: int):
+        """404 se o tenant não existir ou estiver inativo"""
+        tenant = self.db.query(models.Tenant).filter(
+            models.Tenant.id == tenant_id,
+            models.Tenant.is_active == True
+        ).first()
+        if not tenant:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Tenant não encontrado"
+            )
+    
+    def import_frame(self, df: pd.DataFrame, tenant_id: int, first_row: int = 2) -> Dict[str, list]:
+        """Valida e insere as linhas do DataFrame (first_row = número da 1ª linha no arquivo)"""
+        result = {
+            'total_records': len(df),
+            'new_records': 0,
+            'duplicates_found': [],
+            'conflicts_found': [],
+            'errors': []
+        }
+        if df.empty:
+            return result
+        
+        df = df.reset_index(drop=True)
+        frame, errors = validate_frame(df, self.import_lookups(df, tenant_id))
+        result['errors'] = _error_list(errors, first_row)
+        
+        valid = frame[errors.isna()]
+        duplicates = self._find_duplicates(valid, first_row)
+        result['duplicates_found'] = _report(df, duplicates, first_row)
+        
+        valid = valid.drop(index=list(duplicates))
+        conflicts = self._find_conflicts(valid)
+        result['conflicts_found'] = _report(df, conflicts, first_row)
+        
+        inserted = valid.drop(index=list(conflicts))
+        rows = self._build_rows(inserted, tenant_id)
+        if rows:
+            self._insert(rows, tenant_id, inserted['span_end'].max().to_pydatetime())
+        result['new_records'] = len(rows)
+        
+        return result
+    
+    def import_lookups(self, df: pd.DataFrame, tenant_id: int) -> Dict[str, Dict[str, uuid.UUID]]:
+        """Resolve e-mails e nomes do bloco com uma consulta IN por entidade"""
+        frame = normalize_frame(df)
+        providers = dict(self.db.query(models.User.email, models.User.id).filter(
+            models.User.email.in_(_distinct(frame['provider_email'])),
+            models.User.is_deleted == False,
+            models.User.user_type == models.UserType.PROVIDER
+        ).all())
+        users = dict(self.db.query(models.User.email, models.User.id).filter(
+            models.User.email.in_(_distinct(frame['user_email'])),
+            models.User.is_deleted == False
+        ).all())
+        # Nomes repetidos: vale o primeiro cadastrado
+        categories = _first_by_name(self.db.query(models.Category.name, models.Category.id).filter(
+            models.Category.name.in_(_distinct(frame['category'])),
+            models.Category.is_deleted == False
+        ).order_by(models.Category.created_at).all())
+        products = _first_by_name(self.db.query(models.Product.name, models.Product.id).filter(
+            models.Product.name.in_(_distinct(frame['product'])),
+            models.Product.tenant_id == tenant_id,
+            models.Product.is_deleted == False
+        ).order_by(models.Product.created_at).all())
+        
+        return {'providers': providers, 'users': users, 'categories': categories, 'products': products}
+    
+    def validate_frame(self, df: pd.DataFrame, tenant_id: int, first_row: int = 2) -> Dict[str, list]:
+        """Modo dry_run: só valida as linhas, em paralelo, sem gravar nada.
+        
+        Duplicados e conflitos de horário dependem do banco e das linhas
+        anteriores do bloco: são procurados na thread do job, entre as
+        linhas sem erro, antes da validação em shards.
+        """
+        df = df.reset_index(drop=True)
+        lookups = self.import_lookups(df, tenant_id)
+        frame, errors = validate_frame(df, lookups)
+        valid = frame[errors.isna()]
+        duplicates = self._find_duplicates(valid, first_row)
+        conflicts = self._find_conflicts(valid.drop(index=list(duplicates)))
+        
+        result = validate_in_shards(validate_import_rows, df, lookups, first_row)
+        result['duplicates_found'] = _report(df, duplicates, first_row)
+        result['conflicts_found'] = _report(df, conflicts, first_row)
+        return result
+    
+    def _find_duplicates(self, valid: pd.DataFrame, first_row: int) -> Dict[int, dict]:
+        """Duplicados no banco (IN de tuplas pela chave natural) e dentro do próprio arquivo"""
+        duplicates: Dict[int, dict] = {}
+        if valid.empty:
+            return duplicates
+        
+        keys = list(zip(
+            valid['provider_id'], valid['user_id'],
+            _datetimes(valid['start']), _datetimes(valid['end']),
+            valid['product_id']
+        ))
+        existing = self._existing_schedules(keys)
+        
+        # Linhas do próprio arquivo: vale a primeira
+        seen: Dict[tuple, int] = {}
+        for idx, key in zip(valid.index, keys):
+            natural_key = _natural_key(*key)
+            if natural_key in existing:
+                duplicates[idx] = {'existing_schedule': existing[natural_key]}
+            elif natural_key in seen:
+                duplicates[idx] = {'duplicate_of_row': seen[natural_key] + first_row}
+            else:
+                seen[natural_key] = idx
+        return duplicates
+    
+    def _existing_schedules(self, keys: List[tuple]) -> Dict[tuple, dict]:
+        """Agendamentos não excluídos com as chaves do bloco (usa ix_schedules_natural_key)"""
+        key_columns = tuple_(
+            models.Schedule.provider_id, models.Schedule.user_id,
+            models.Schedule.start_date, models.Schedule.end_date,
+            models.Schedule.product_id
+        )
+        distinct_keys = list(dict.fromkeys(keys))
+        existing: Dict[tuple, dict] = {}
+        for offset in range(0, len(distinct_keys), DUPLICATE_LOOKUP_BATCH):
+            schedules = self.db.query(
+                models.Schedule.id, models.Schedule.status,
+                models.Schedule.provider_id, models.Schedule.user_id,
+                models.Schedule.start_date, models.Schedule.end_date,
+                models.Schedule.product_id
+            ).filter(
+                key_columns.in_(distinct_keys[offset:offset + DUPLICATE_LOOKUP_BATCH]),
+                models.Schedule.is_deleted == False
+            ).all()
+            for schedule in schedules:
+                existing.setdefault(
+                    _natural_key(
+                        schedule.provider_id, schedule.user_id,
+                        schedule.start_date, schedule.end_date,
+                        schedule.product_id
+                    ),
+                    {
+                        'id': str(schedule.id),
+                        'start_date': schedule.start_date.isoformat(),
+                        'end_date': schedule.end_date.isoformat(),
+                        'status': schedule.status.value if schedule.status else None
+                    }
+                )
+        return existing
+    
+    def _find_conflicts(self, valid: pd.DataFrame) -> Dict[int, dict]:
+        """Conflitos com a agenda (uma carga para todos os profissionais) e entre linhas do arquivo.
+        
+        Linhas recorrentes conflitam se qualquer ocorrência da série
+        conflitar; as datas afetadas vão em `dates`.
+        """
+        conflicts: Dict[int, dict] = {}
+        if valid.empty:
+            return conflicts
+        
+        positions, offsets, starts, ends = expand_occurrences(valid)
+        provider_ids = valid['provider_id'].to_numpy()
+        occurrence_providers = provider_ids[positions]
+        
+        busy = load_busy_intervals(
+            self.db,
+            list(set(provider_ids)),
+            valid['start'].min().to_pydatetime(),
+            valid['span_end'].max().to_pydatetime()
+        )
+        taken = np.zeros(len(starts), dtype=bool)
+        for provider_id, intervals in busy.items():
+            mask = occurrence_providers == provider_id
+            taken[mask] = overlapping_mask(intervals, starts[mask], ends[mask])
+        
+        # Ocorrências de cada linha ficam em [bounds[i], bounds[i + 1])
+        bounds = np.searchsorted(positions, np.arange(len(valid) + 1))
+        recurring = (valid['recurrence'] != schemas.RecurrenceType.NONE.value).to_numpy()
+        first_days = [start.date() for start in _datetimes(valid['start'])]
+        
+        def conflict(position: int, reason: str, mask: np.ndarray) -> dict:
+            info = {'conflict': reason}
+            if recurring[position]:
+                days = offsets[bounds[position]:bounds[position + 1]][mask]
+                info['dates'] = [(first_days[position] + timedelta(days=day)).isoformat() for day in days.tolist()]
+            return info
+        
+        # Linhas do próprio arquivo: vale a primeira, como na importação linha a linha
+        accepted: Dict[uuid.UUID, ProviderIntervals] = {}
+        for position, idx in enumerate(valid.index):
+            lo, hi = bounds[position], bounds[position + 1]
+            if taken[lo:hi].any():
+                conflicts[idx] = conflict(position, "Horário não disponível", taken[lo:hi])
+                continue
+            
+            intervals = accepted.setdefault(provider_ids[position], ProviderIntervals(starts.min(), ends.max()))
+            clashes = np.array([intervals.has_conflict(starts[i], ends[i]) for i in range(lo, hi)], dtype=bool)
+            if clashes.any():
+                conflicts[idx] = conflict(position, "Horário em conflito com outra linha do arquivo", clashes)
+                continue
+            for i in range(lo, hi):
+                intervals.add(starts[i], ends[i], idx)
+        
+        return conflicts
+    
+    def _build_rows(self, valid: pd.DataFrame, tenant_id: int) -> List[dict]:
+        """Parâmetros do INSERT em lote"""
+        rows = []
+        for provider_id, user_id, category_id, product_id, start, end, price, recurrence, days, recurrence_end in zip(
+            valid['provider_id'], valid['user_id'], valid['category_id'], valid['product_id'],
+            _datetimes(valid['start']), _datetimes(valid['end']), valid['service_price'],
+            valid['recurrence'], valid['recurrence_days_json'], valid['recurrence_end']
+        ):
+            rows.append({
+                'id': uuid.uuid4(),
+                'provider_id': provider_id,
+                'user_id': user_id,
+                'category_id': category_id,
+                'product_id': product_id,
+                'tenant_id': tenant_id,
+                'start_date': start,
+                'end_date': end,
+                'service_price': None if pd.isna(price) else int(price),
+                'status': models.ScheduleStatus.ACTIVE,
+                'recurrence_type': models.RecurrenceType(recurrence),
+                'recurrence_days': days,
+                'recurrence_end_date': None if pd.isna(recurrence_end) else recurrence_end.to_pydatetime(),
+                'is_deleted': False,
+                'created_by_id': self.current_user.id,
+                'updated_by_id': self.current_user.id
+            })
+        return rows
+    
+    def _insert(self, rows: List[dict], tenant_id: int, span_end: datetime):
+        """Um único INSERT (executemany) e um commit para todas as linhas"""
+        self.db.execute(insert(models.Schedule), rows)
+        commit_booking(self.db)
+        
+        if settings.AVAILABILITY_INDEX_ENABLED:
+            for provider_id in {row['provider_id'] for row in rows}:
+                availability_index.invalidate(provider_id)
+        calendar_cache.bump(
+            tenant_id,
+            min(row['start_date'] for row in rows),
+            span_end
+        )
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Unifica os nomes de coluna aceitos e remove espaços das células"""
+    frame = pd.DataFrame(index=df.index)
+    for column, aliases in IMPORT_COLUMNS.items():
+        values = pd.Series(pd.NA, index=df.index, dtype="string")
+        for alias in aliases:
+            if alias in df.columns:
+                # Equivale a row.get('pt') or row.get('en')
+                values = values.fillna(_clean(df[alias]))
+        frame[column] = values
+    return frame
+
+def apply_references(frame: pd.DataFrame, lookups: Dict[str, Dict[str, uuid.UUID]], errors: pd.Series):
+    """Troca e-mails e nomes pelos ids pré-carregados"""
+    checks = [
+        ('provider_id', 'provider_email', lookups['providers'],
+         "Email do profissional é obrigatório", "Profissional com email '{}' não encontrado"),
+        ('user_id', 'user_email', lookups['users'],
+         "Email do usuário é obrigatório", "Usuário com email '{}' não encontrado"),
+        ('category_id', 'category', lookups['categories'],
+         "Categoria é obrigatória", "Categoria '{}' não encontrada"),
+        ('product_id', 'product', lookups['products'],
+         "Produto é obrigatório", "Produto '{}' não encontrado neste tenant"),
+    ]
+    for target, column, lookup, missing_message, not_found_message in checks:
+        values = frame[column]
+        frame[target] = values.map(lookup)
+        _fail(errors, values.isna(), missing_message)
+        not_found = values.notna() & frame[target].isna()
+        _fail(errors, not_found, values[not_found].map(not_found_message.format))
+
+def parse_dates(frame: pd.DataFrame, errors: pd.Series):
+    """Converte as datas da coluna inteira de uma vez"""
+    start = _parse_datetimes(frame['start_date'])
+    end = _parse_datetimes(frame['end_date'])
+    
+    _fail(errors, frame['start_date'].isna(), "Data de início é obrigatória")
+    invalid_start = frame['start_date'].notna() & start.isna()
+    _fail(errors, invalid_start, frame['start_date'][invalid_start].map("Data de início inválida: '{}'".format))
+    invalid_end = frame['end_date'].notna() & end.isna()
+    _fail(errors, invalid_end, frame['end_date'][invalid_end].map("Data de término inválida: '{}'".format))
+    
+    # Sem data de término: duração padrão
+    end = end.where(frame['end_date'].notna(), start + DEFAULT_DURATION)
+    _fail(errors, start >= end, "Data de início deve ser anterior à data de término")
+    _fail(errors, start < pd.Timestamp.now(tz="UTC").tz_localize(None), "Não é possível agendar no passado")
+    
+    frame['start'] = start
+    frame['end'] = end
+
+def parse_prices(frame: pd.DataFrame, errors: pd.Series):
+    """Preço em reais com centavos (150.50) ou já em centavos (15050)"""
+    raw = frame['price']
+    price = pd.to_numeric(raw, errors='coerce')
+    invalid = raw.notna() & price.isna()
+    _fail(errors, invalid, raw[invalid].map("Preço inválido: '{}'".format))
+    
+    # Valores com casas decimais estão em reais
+    in_reais = raw.str.contains('.', regex=False, na=False)
+    frame['service_price'] = price.where(~in_reais, (price * 100).round())
+
+def parse_recurrence(frame: pd.DataFrame, errors: pd.Series):
+    """Tipo de recorrência, dias da semana e fim da série (exigido nas recorrentes)"""
+    raw_type = frame['recurrence_type']
+    recurrence = raw_type.str.lower().fillna(schemas.RecurrenceType.NONE.value)
+    invalid_type = ~recurrence.isin([kind.value for kind in schemas.RecurrenceType])
+    _fail(errors, invalid_type, raw_type[invalid_type].map("Tipo de recorrência inválido: '{}'".format))
+    recurring = ~invalid_type & (recurrence != schemas.RecurrenceType.NONE.value)
+    
+    raw_days = frame['recurrence_days']
+    days = raw_days.map(_weekday_list, na_action='ignore')
+    invalid_days = recurring & raw_days.notna() & days.isna()
+    _fail(errors, invalid_days, raw_days[invalid_days].map("Dias da semana inválidos: '{}'".format))
+    
+    raw_end = frame['recurrence_end_date']
+    recurrence_end = _parse_datetimes(raw_end)
+    _fail(errors, recurring & raw_end.isna(), "Data de término da recorrência é obrigatória")
+    invalid_end = recurring & raw_end.notna() & recurrence_end.isna()
+    _fail(errors, invalid_end, raw_end[invalid_end].map("Data de término da recorrência inválida: '{}'".format))
+    _fail(
+        errors, recurring & (recurrence_end <= frame['start']),
+        "Data de término da recorrência deve ser posterior à data de início"
+    )
+    
+    # Colunas de linhas não recorrentes são ignoradas
+    frame['recurrence'] = recurrence.where(recurring, schemas.RecurrenceType.NONE.value)
+    frame['recurrence_days_json'] = days.astype(object).where(recurring & days.notna(), None)
+    frame['recurrence_end'] = recurrence_end.where(recurring)
+    # Limite superior da última ocorrência (fim da série + duração)
+    frame['span_end'] = frame['end'].where(
+        ~recurring, recurrence_end.dt.normalize() + timedelta(days=1) + (frame['end'] - frame['start'])
+    )
+
+def expand_occurrences(valid: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Todas as ocorrências das linhas válidas de uma vez: (linha, dia da série, início, fim).
+    
+    Cada regra distinta (tipo, dias, início e fim da série) é expandida uma
+    vez com occurrence_offsets; os instantes saem de operações numpy sobre
+    o vetor inteiro. Início e fim em epoch, agrupados pela posição da linha.
+    """
+    single = np.zeros(1, dtype=np.int64)
+    rules: Dict[tuple, np.ndarray] = {}
+    per_row = []
+    for start, recurrence, days, recurrence_end in zip(
+        _datetimes(valid['start']), valid['recurrence'], valid['recurrence_days_json'], valid['recurrence_end']
+    ):
+        if recurrence == schemas.RecurrenceType.NONE.value:
+            per_row.append(single)
+            continue
+        key = (recurrence, days, start.date(), recurrence_end.date())
+        if key not in rules:
+            rules[key] = occurrence_offsets(start, recurrence, days, start.date(), recurrence_end.date())
+        per_row.append(rules[key])
+    
+    counts = np.array([len(offsets) for offsets in per_row])
+    positions = np.repeat(np.arange(len(per_row)), counts)
+    offsets = np.concatenate(per_row) if per_row else single[:0]
+    
+    first_starts = np.array([to_epoch(value) for value in _datetimes(valid['start'])])
+    durations = np.array([to_epoch(value) for value in _datetimes(valid['end'])]) - first_starts
+    starts = first_starts[positions] + offsets * 86400.0
+    return positions, offsets, starts, starts + durations[positions]
+
+def validate_frame(df: pd.DataFrame, lookups: Dict[str, Dict[str, uuid.UUID]]) -> Tuple[pd.DataFrame, pd.Series]:
+    """Colunas normalizadas e convertidas + erro por linha (NaN = linha válida)"""
+    frame = normalize_frame(df)
+    errors = pd.Series(None, index=frame.index, dtype=object)
+    apply_references(frame, lookups, errors)
+    parse_dates(frame, errors)
+    parse_prices(frame, errors)
+    parse_recurrence(frame, errors)
+    return frame, errors
+
+def validate_import_rows(df: pd.DataFrame, lookups: Dict[str, Dict[str, uuid.UUID]], first_row: int) -> Dict[str, list]:
+    """Validação de um shard do dry_run (executada em outro processo)"""
+    _, errors = validate_frame(df, lookups)
+    return {'errors': _error_list(errors, first_row)}
+
+def _clean(values: pd.Series) -> pd.Series:
+    """Texto sem espaços nas pontas; células vazias viram NA"""
+    values = values.astype("string").str.strip()
+    return values.mask(values == "")
+
+def _distinct(values: pd.Series) -> List[str]:
+    return values.dropna().unique().tolist()
+
+def _error_list(errors: pd.Series, first_row: int) -> List[dict]:
+    return [{'row': idx + first_row, 'error': message} for idx, message in errors.dropna().items()]
+
+def _natural_key(provider_id, user_id, start: datetime, end: datetime, product_id) -> tuple:
+    """Chave de comparação: datas em epoch (o banco pode devolvê-las com fuso)"""
+    return (provider_id, user_id, to_epoch(start), to_epoch(end), product_id)
+
+def _report(df: pd.DataFrame, found: Dict[int, dict], first_row: int) -> List[dict]:
+    """Linhas duplicadas/em conflito com os dados originais do arquivo"""
+    return [{'row': idx + first_row, 'data': _row_data(df.loc[idx]), **info} for idx, info in found.items()]
+
+def _weekday_list(value: str) -> Optional[str]:
+    """"monday,wednesday" -> JSON gravado em recurrence_days (None se algum dia for inválido)"""
+    days = [day.strip().lower() for day in str(value).split(',') if day.strip()]
+    if not days or any(day not in WEEKDAYS for day in days):
+        return None
+    return json.dumps(list(dict.fromkeys(days)))
+
+def _parse_datetimes(values: pd.Series) -> pd.Series:
+    """Datas do arquivo em UTC sem fuso (datas sem fuso são tratadas como UTC).
+    
+    Misturar células com e sem offset gera valores que não se comparam;
+    inválidas viram NaT.
+    """
+    return pd.to_datetime(values, errors='coerce', format='mixed', utc=True).dt.tz_localize(None)
+
+def _datetimes(values: pd.Series) -> List[datetime]:
+    return [value.to_pydatetime() for value in values]
+
+def _first_by_name(rows: List[Tuple[str, uuid.UUID]]) -> Dict[str, uuid.UUID]:
+    lookup: Dict[str, uuid.UUID] = {}
+    for name, row_id in rows:
+        lookup.setdefault(name, row_id)
+    return lookup
+
+def _fail(errors: pd.Series, mask: pd.Series, message):
+    """Registra o erro nas linhas do mask que ainda não têm erro (vale o primeiro)"""
+    mask = mask.fillna(False).astype(bool) & errors.isna()
+    if not mask.any():
+        return
+    if isinstance(message, pd.Series):
+        errors[mask] = message.reindex(errors.index)[mask]
+    else:
+        errors[mask] = message
+
+def _row_data(row: pd.Series) -> Dict[str, Optional[str]]:
+    """Linha original do arquivo para o relatório"""
+    return {key: (None if pd.isna(value) else value) for key, value in row.items()}
@@ -1,44 +1,231 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session, joinedload, selectinload, noload, aliased
+from sqlalchemy import and_, or_, func, insert, select
 from fastapi import HTTPException, status
 import uuid
-import pandas as pd
 import io
+import csv
 import json
-from datetime import datetime, timedelta, date, time
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta, timezone, date, time
+from typing import Iterable, Iterator, List, Optional, Dict, Any, Set, Tuple
 from app import models, schemas
+from app.config import settings
+from app.services.availability_service import (
+    availability_index, load_provider_intervals, load_busy_intervals,
+    free_gaps, iter_slots, slice_slots, to_epoch, period_overlaps, period_within,
+    overlapping_mask, commit_booking, BLOCKING_STATUSES
+)
+from app.services.recurrence_service import load_occurrences
+from app.services.calendar_cache import calendar_cache
+from app.utils.recurrence import is_occurrence, occurrence_offsets, align_timezone
+from app.utils.fields import fields_load_only
+from app.utils.etag import TENANT_VERSIONS, USER_VERSIONS, CATEGORY_VERSIONS, PRODUCT_VERSIONS
 import calendar
+import heapq
+from itertools import islice
+
+# Limite do período consultado na busca de horários livres
+MAX_FREE_SLOTS_WINDOW_DAYS = 31
+
+# Códigos de status usados na visão por recurso (índice na lista)
+STATUS_CODES = [s.value for s in models.ScheduleStatus]
+
+# Limite do período do mapa de calor
+MAX_HEATMAP_DAYS = 366
+
+# Limite do período expandido na agenda de ocorrências
+MAX_OCCURRENCES_WINDOW_DAYS = 92
+
+# Linhas lidas do cursor no servidor a cada ida ao banco durante a exportação
+EXPORT_BATCH_SIZE = 500
+
+# Colunas da exportação (NDJSON e CSV)
+EXPORT_COLUMNS = (
+    "id", "start_date", "end_date", "status", "service_price", "recurrence_type",
+    "provider_id", "provider_name", "user_id", "user_name",
+    "category_id", "category_name", "product_id", "product_name", "tenant_id"
+)
+
+# Relacionamentos de schemas.Schedule que o cliente pode pedir em ?expand=
+SCHEDULE_RELATIONS = ("provider", "user", "category", "product", "tenant")
+
+def parse_expand(expand: Optional[str]) -> Set[str]:
+    """Lê ?expand=provider,product ("all" expande todos os relacionamentos)"""
+    if not expand:
+        return set()
+    
+    names = {name.strip() for name in expand.split(",") if name.strip()}
+    if "all" in names:
+        return set(SCHEDULE_RELATIONS)
+    
+    invalid = names - set(SCHEDULE_RELATIONS)
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"expand inválido: {', '.join(sorted(invalid))}. Use: {', '.join(SCHEDULE_RELATIONS)} ou all"
+        )
+    return names
+
+def schedule_load_options(expand: Iterable[str] = SCHEDULE_RELATIONS, loader=selectinload):
+    """Carregamento dos relacionamentos serializados em schemas.Schedule.
+    
+    Os expandidos são carregados antecipadamente (selectinload em listas,
+    joinedload para um único agendamento); os demais não são carregados e
+    voltam nulos, ficando só os *_id, sem um SELECT por linha.
+    """
+    options = []
+    for name in SCHEDULE_RELATIONS:
+        relation = getattr(models.Schedule, name)
+        if name not in expand:
+            options.append(noload(relation))
+        elif name in ("provider", "user"):
+            options.append(loader(relation).selectinload(models.User.roles))
+        elif name == "category":
+            options.append(loader(relation).selectinload(models.Category.tenants))
+        elif name == "product":
+            # schemas.Product também serializa categoria, profissional e tenant
+            options.append(loader(relation).options(
+                selectinload(models.Product.category).selectinload(models.Category.tenants),
+                selectinload(models.Product.professional).selectinload(models.User.roles),
+                selectinload(models.Product.tenant)
+            ))
+        else:
+            options.append(loader(relation))
+    return options
+
+def schedule_versions(expand: Iterable[str]) -> List:
+    """Colunas de versão (ETag) das tabelas serializadas junto com os expandidos"""
+    versions = {
+        "provider": USER_VERSIONS,
+        "user": USER_VERSIONS,
+        "category": CATEGORY_VERSIONS,
+        "product": PRODUCT_VERSIONS,
+        "tenant": TENANT_VERSIONS,
+    }
+    return [column for name in SCHEDULE_RELATIONS if name in expand for column in versions[name]]
+
+def _month_windows(start_date: datetime, end_date: datetime) -> Iterator[Tuple[datetime, datetime]]:
+    """Divide o período em janelas que não atravessam a virada do mês"""
+    current = start_date
+    while current < end_date:
+        month_start = current.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        yield current, min(next_month, end_date)
+        current = next_month
+
+def _occurrence_export_row(occurrence) -> Dict[str, Any]:
+    schedule = occurrence.schedule
+    return {
+        "id": schedule.id,
+        "start_date": occurrence.start_date,
+        "end_date": occurrence.end_date,
+        "status": occurrence.status,
+        "service_price": schedule.service_price,
+        "recurrence_type": schedule.recurrence_type,
+        "provider_id": schedule.provider_id,
+        "provider_name": schedule.provider.name,
+        "user_id": schedule.user_id,
+        "user_name": schedule.user.name,
+        "category_id": schedule.category_id,
+        "category_name": schedule.category.name,
+        "product_id": schedule.product_id,
+        "product_name": schedule.product.name,
+        "tenant_id": schedule.tenant_id
+    }
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return getattr(value, 'value', value)
+
+def _encode_export_rows(rows: List[Any], export_format: str) -> str:
+    """Codifica um bloco de linhas em CSV ou NDJSON"""
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([[_export_value(row[column]) for column in EXPORT_COLUMNS] for row in rows])
+        return buffer.getvalue()
+    return "".join(
+        json.dumps({column: _export_value(row[column]) for column in EXPORT_COLUMNS}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+def heatmap_query(
+    tenant_id: int,
+    window_start: datetime,
+    window_end: datetime,
+    provider_id: Optional[uuid.UUID] = None
+):
+    """Contagem e minutos dos agendamentos simples por dia, profissional e status.
+    
+    Séries recorrentes ficam de fora: suas ocorrências vêm da expansão.
+    """
+    day = func.date_trunc('day', models.Schedule.start_date)
+    minutes = func.sum(
+        func.extract('epoch', models.Schedule.end_date - models.Schedule.start_date)
+    ) / 60
+    
+    query = select(
+        day.label('day'),
+        models.Schedule.provider_id,
+        models.Schedule.status,
+        func.count(models.Schedule.id),
+        minutes
+    ).where(
+        models.Schedule.tenant_id == tenant_id,
+        models.Schedule.is_deleted == False,
+        models.Schedule.recurrence_type == models.RecurrenceType.NONE,
+        models.Schedule.start_date >= window_start,
+        models.Schedule.start_date < window_end
+    )
+    if provider_id:
+        query = query.where(models.Schedule.provider_id == provider_id)
+    
+    return query.group_by(day, models.Schedule.provider_id, models.Schedule.status)
 
 class ScheduleService:
     def __init__(self, db: Session, current_user: models.User):
         self.db = db
         self.current_user = current_user
     
-    def get_schedule_by_id(self, schedule_id: uuid.UUID) -> Optional[models.Schedule]:
+    def get_schedule_by_id(
+        self,
+        schedule_id: uuid.UUID,
+        expand: Optional[Set[str]] = None,
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> Optional[models.Schedule]:
         """Busca agendamento por ID (ignorando soft delete)"""
-        return self.db.query(models.Schedule).filter(
+        query = self.db.query(models.Schedule).filter(
             models.Schedule.id == schedule_id,
             models.Schedule.is_deleted == False
-        ).first()
+        )
+        if expand is not None:
+            query = query.options(*schedule_load_options(expand, joinedload))
+        if fields:
+            # tenant_id é usado no controle de acesso
+            query = query.options(fields_load_only(models.Schedule, fields, models.Schedule.tenant_id))
+        return query.first()
     
     def get_schedules_by_date_range(
         self, 
         tenant_id: int, 
         start_date: datetime, 
         end_date: datetime,
-        provider_id: Optional[uuid.UUID] = None
+        provider_id: Optional[uuid.UUID] = None,
+        expand: Optional[Set[str]] = None
     ) -> List[models.Schedule]:
         """Busca agendamentos em um período"""
         query = self.db.query(models.Schedule).filter(
             models.Schedule.tenant_id == tenant_id,
             models.Schedule.is_deleted == False,
-            models.Schedule.start_date >= start_date,
-            models.Schedule.end_date <= end_date
+            period_within(start_date, end_date)
         )
         
         if provider_id:
             query = query.filter(models.Schedule.provider_id == provider_id)
+        if expand is not None:
+            query = query.options(*schedule_load_options(expand))
         
         return query.order_by(models.Schedule.start_date).all()
     
@@ -46,7 +233,8 @@ class ScheduleService:
         self, 
         provider_id: uuid.UUID,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        expand: Optional[Set[str]] = None
     ) -> List[models.Schedule]:
         """Busca agendamentos de um profissional"""
         query = self.db.query(models.Schedule).filter(
@@ -58,6 +246,8 @@ class ScheduleService:
             query = query.filter(models.Schedule.start_date >= start_date)
         if end_date:
             query = query.filter(models.Schedule.end_date <= end_date)
+        if expand is not None:
+            query = query.options(*schedule_load_options(expand))
         
         return query.order_by(models.Schedule.start_date).all()
     
@@ -66,46 +256,240 @@ class ScheduleService:
         provider_id: uuid.UUID, 
         start_date: datetime, 
         end_date: datetime,
-        exclude_schedule_id: Optional[uuid.UUID] = None
+        exclude_schedule_id: Optional[uuid.UUID] = None,
+        use_index: bool = True
     ) -> bool:
-        """Verifica se horário está disponível para o profissional"""
-        query = self.db.query(models.Schedule).filter(
-            models.Schedule.provider_id == provider_id,
-            models.Schedule.is_deleted == False,
-            models.Schedule.status.in_([
-                models.ScheduleStatus.ACTIVE,
-                models.ScheduleStatus.PENDING
-            ]),
-            models.Schedule.start_date < end_date,
-            models.Schedule.end_date > start_date
+        """Verifica se horário está disponível para o profissional.
+        
+        Gravações passam use_index=False: o índice é de cada processo e não vê
+        séries criadas por outros workers, que a constraint de exclusão também
+        não cobre (ocorrências não são linhas).
+        """
+        # Índice em memória responde a maioria das consultas sem ida ao banco
+        if use_index and settings.AVAILABILITY_INDEX_ENABLED:
+            available = availability_index.check(
+                self.db, provider_id, start_date, end_date, exclude_schedule_id
+            )
+            if available is not None:
+                return available
+        
+        # Inclui as ocorrências das séries recorrentes que caem no período
+        intervals = load_provider_intervals(self.db, provider_id, start_date, end_date)
+        return not intervals.has_conflict(
+            to_epoch(start_date), to_epoch(end_date), exclude_schedule_id
+        )
+    
+    def check_availability_batch(self, checks: List[schemas.AvailabilityCheck], tenant_id: int) -> List[Dict[str, Any]]:
+        """Verifica vários horários com uma consulta por profissional (só profissionais do tenant)"""
+        periods = []
+        for check in checks:
+            start_datetime = datetime.combine(check.date, datetime.strptime(check.start_time, "%H:%M").time())
+            end_datetime = datetime.combine(check.date, datetime.strptime(check.end_time, "%H:%M").time())
+            periods.append((start_datetime, end_datetime))
+        
+        # Mesmo limite de período da busca de horários livres
+        self._validate_search_window(min(start for start, _ in periods), max(end for _, end in periods))
+        self._ensure_tenant_providers(tenant_id, {check.provider_id for check in checks})
+        
+        # Agrupar por profissional para carregar o período completo de uma vez
+        by_provider: Dict[uuid.UUID, List[int]] = {}
+        for idx, check in enumerate(checks):
+            by_provider.setdefault(check.provider_id, []).append(idx)
+        
+        available = [False] * len(checks)
+        for provider_id, indexes in by_provider.items():
+            intervals = load_provider_intervals(
+                self.db,
+                provider_id,
+                min(periods[idx][0] for idx in indexes),
+                max(periods[idx][1] for idx in indexes)
+            )
+            for idx in indexes:
+                start_datetime, end_datetime = periods[idx]
+                available[idx] = not intervals.has_conflict(
+                    to_epoch(start_datetime), to_epoch(end_datetime)
+                )
+        
+        return [
+            {
+                "available": available[idx],
+                "provider_id": str(check.provider_id),
+                "date": check.date.isoformat(),
+                "start_time": check.start_time,
+                "end_time": check.end_time
+            }
+            for idx, check in enumerate(checks)
+        ]
+    
+    def find_free_slots(
+        self,
+        provider_id: uuid.UUID,
+        tenant_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        duration_minutes: int,
+        step_minutes: int = 15,
+        limit: int = 200
+    ) -> schemas.FreeSlots:
+        """Lista horários livres do profissional do tenant no período"""
+        self._validate_search_window(start_date, end_date)
+        self._ensure_tenant_providers(tenant_id, {provider_id})
+        
+        busy = load_busy_intervals(self.db, [provider_id], start_date, end_date)[provider_id]
+        window_start, window_end = to_epoch(start_date), to_epoch(end_date)
+        
+        slots = slice_slots(
+            free_gaps(busy, window_start, window_end),
+            duration_minutes * 60,
+            step_minutes * 60,
+            anchor=window_start,
+            limit=limit
+        )
+        
+        return schemas.FreeSlots(
+            provider_id=provider_id,
+            duration_minutes=duration_minutes,
+            step_minutes=step_minutes,
+            slots=[
+                schemas.TimeSlot(
+                    start=datetime.fromtimestamp(slot_start, timezone.utc),
+                    end=datetime.fromtimestamp(slot_end, timezone.utc)
+                )
+                for slot_start, slot_end in slots
+            ]
+        )
+    
+    def find_first_available(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        duration_minutes: int,
+        tenant_id: int,
+        product_id: Optional[uuid.UUID] = None,
+        category_id: Optional[uuid.UUID] = None,
+        step_minutes: int = 15,
+        limit: int = 5,
+        max_per_provider: int = 1
+    ) -> schemas.FirstAvailable:
+        """Busca os primeiros horários livres entre os profissionais de um produto ou categoria do tenant"""
+        if not product_id and not category_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Informe product_id ou category_id"
+            )
+        
+        self._validate_search_window(start_date, end_date)
+        
+        # Profissionais que atendem o produto/categoria
+        query = self.db.query(
+            models.Product.professional_id,
+            models.Product.id,
+            models.User.name
+        ).join(
+            models.User, models.Product.professional_id == models.User.id
+        ).filter(
+            models.Product.tenant_id == tenant_id,
+            models.Product.is_deleted == False,
+            models.Product.status == models.ProductStatus.ACTIVE,
+            models.User.is_deleted == False
+        )
+        
+        if product_id:
+            query = query.filter(models.Product.id == product_id)
+        if category_id:
+            query = query.filter(models.Product.category_id == category_id)
+        
+        providers: Dict[uuid.UUID, tuple] = {}
+        for professional_id, matched_product_id, provider_name in query.order_by(models.Product.created_at):
+            providers.setdefault(professional_id, (matched_product_id, provider_name))
+        
+        if not providers:
+            return schemas.FirstAvailable(duration_minutes=duration_minutes, options=[])
+        
+        # Uma consulta para todos os profissionais
+        busy = load_busy_intervals(self.db, list(providers), start_date, end_date)
+        window_start, window_end = to_epoch(start_date), to_epoch(end_date)
+        
+        def provider_slots(provider_id):
+            slots = iter_slots(
+                free_gaps(busy[provider_id], window_start, window_end),
+                duration_minutes * 60,
+                step_minutes * 60,
+                anchor=window_start
+            )
+            for slot_start, slot_end in islice(slots, max_per_provider):
+                yield slot_start, slot_end, provider_id
+        
+        # Heap entre os profissionais ordenado pelo início
+        ranked = heapq.merge(
+            *(provider_slots(provider_id) for provider_id in providers),
+            key=lambda slot: slot[0]
         )
         
-        if exclude_schedule_id:
-            query = query.filter(models.Schedule.id != exclude_schedule_id)
+        options = []
+        for slot_start, slot_end, provider_id in islice(ranked, limit):
+            matched_product_id, provider_name = providers[provider_id]
+            options.append(schemas.ProviderSlot(
+                provider_id=provider_id,
+                provider_name=provider_name,
+                product_id=matched_product_id,
+                start=datetime.fromtimestamp(slot_start, timezone.utc),
+                end=datetime.fromtimestamp(slot_end, timezone.utc)
+            ))
         
-        conflict = query.first()
-        return conflict is None
+        return schemas.FirstAvailable(duration_minutes=duration_minutes, options=options)
+    
+    def _ensure_tenant_providers(self, tenant_id: int, provider_ids: Set[uuid.UUID]):
+        """404 se algum profissional não existir ou não pertencer ao tenant"""
+        found = {provider_id for provider_id, in self.db.query(models.User.id).filter(
+            models.User.id.in_(provider_ids),
+            models.User.is_deleted == False,
+            or_(
+                models.User.tenant_id == tenant_id,
+                models.User.tenants.any(models.Tenant.id == tenant_id)
+            )
+        )}
+        if found != set(provider_ids):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Profissional não encontrado neste tenant"
+            )
+    
+    def _validate_search_window(self, start_date: datetime, end_date: datetime):
+        """Valida o período de busca de horários"""
+        if start_date >= end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Data de início deve ser anterior à data de término"
+            )
+        
+        if end_date - start_date > timedelta(days=MAX_FREE_SLOTS_WINDOW_DAYS):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Período máximo para busca é de {MAX_FREE_SLOTS_WINDOW_DAYS} dias"
+            )
     
     def create_schedule(self, schedule_data: schemas.ScheduleCreate) -> models.Schedule:
         """Cria um novo agendamento"""
         # Validar dados
         self._validate_schedule_data(schedule_data)
         
+        # Se for recorrente, validar a série inteira
+        if schedule_data.recurrence_type != schemas.RecurrenceType.NONE:
+            return self._create_recurring_schedule(schedule_data)
+        
         # Verificar disponibilidade
         if not self.check_availability(
             schedule_data.provider_id,
             schedule_data.start_date,
-            schedule_data.end_date
+            schedule_data.end_date,
+            use_index=False
         ):
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Horário não disponível para este profissional"
             )
         
-        # Se for recorrente, validar
-        if schedule_data.recurrence_type != schemas.RecurrenceType.NONE:
-            return self._create_recurring_schedule(schedule_data)
-        
         # Criar agendamento único
         db_schedule = models.Schedule(
             id=uuid.uuid4(),
@@ -115,13 +499,51 @@ class ScheduleService:
         )
         
         self.db.add(db_schedule)
-        self.db.commit()
+        commit_booking(self.db)
         self.db.refresh(db_schedule)
+        self._after_write(db_schedule)
         
         return db_schedule
     
+    def _sync_availability_index(self, schedule: models.Schedule):
+        """Atualiza o índice de disponibilidade após uma escrita"""
+        if settings.AVAILABILITY_INDEX_ENABLED:
+            availability_index.sync(schedule)
+    
+    def _after_write(self, schedule: models.Schedule, periods: Optional[List[tuple]] = None):
+        """Propaga uma escrita ao índice de disponibilidade e ao cache do calendário"""
+        self._sync_availability_index(schedule)
+        for start_date, end_date in periods or [self._schedule_span(schedule)]:
+            calendar_cache.bump(schedule.tenant_id, start_date, end_date)
+    
+    def _schedule_span(self, schedule: models.Schedule) -> tuple:
+        """Período coberto pelo agendamento (série inteira, se recorrente)"""
+        if schedule.recurrence_type == models.RecurrenceType.NONE:
+            return schedule.start_date, schedule.end_date
+        if not schedule.recurrence_end_date:
+            # Série sem fim: invalida o tenant inteiro
+            return None, None
+        return schedule.start_date, schedule.recurrence_end_date + (schedule.end_date - schedule.start_date)
+    
     def _validate_schedule_data(self, schedule_data: schemas.ScheduleCreate):
         """Valida dados do agendamento"""
+        self._validate_schedule_references(schedule_data)
+        
+        # Validar datas
+        if schedule_data.start_date >= schedule_data.end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Data de início deve ser anterior à data de término"
+            )
+        
+        if schedule_data.start_date < datetime.now():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Não é possível agendar no passado"
+            )
+    
+    def _validate_schedule_references(self, schedule_data):
+        """Valida profissional, usuário, categoria, produto e tenant referenciados"""
         # Verificar se profissional existe e é prestador
         provider = self.db.query(models.User).filter(
             models.User.id == schedule_data.provider_id,
@@ -177,19 +599,6 @@ class ScheduleService:
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Tenant não encontrado"
             )
-        
-        # Validar datas
-        if schedule_data.start_date >= schedule_data.end_date:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Data de início deve ser anterior à data de término"
-            )
-        
-        if schedule_data.start_date < datetime.now():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Não é possível agendar no passado"
-            )
     
     def _create_recurring_schedule(self, schedule_data: schemas.ScheduleCreate) -> models.Schedule:
         """Cria um agendamento recorrente"""
@@ -206,6 +615,16 @@ class ScheduleService:
                 detail="Data de término da recorrência deve ser posterior à data de início"
             )
         
+        # Verificar disponibilidade de todas as ocorrências
+        self._ensure_series_available(
+            schedule_data.provider_id,
+            schedule_data.start_date,
+            schedule_data.end_date,
+            schedule_data.recurrence_type,
+            schedule_data.recurrence_end_date,
+            schedule_data.recurrence_days
+        )
+        
         # Converter dias da semana para JSON
         recurrence_days = None
         if schedule_data.recurrence_days:
@@ -220,56 +639,68 @@ class ScheduleService:
             updated_by_id=self.current_user.id
         )
         
+        # Apenas a regra é gravada; as ocorrências são expandidas sob demanda
         self.db.add(db_schedule)
-        self.db.flush()
-        
-        # Gerar instâncias recorrentes
-        self._generate_recurring_instances(db_schedule)
-        
-        self.db.commit()
+        commit_booking(self.db)
         self.db.refresh(db_schedule)
+        self._after_write(db_schedule)
         
         return db_schedule
     
-    def _generate_recurring_instances(self, schedule: models.Schedule):
-        """Gera instâncias para agendamentos recorrentes"""
-        current_date = schedule.start_date
-        end_date = schedule.recurrence_end_date
-        duration = schedule.end_date - schedule.start_date
-        
-        while current_date <= end_date:
-            # Verificar se o dia da semana está incluído
-            if schedule.recurrence_days:
-                days = json.loads(schedule.recurrence_days)
-                weekday = list(models.WeekDay)[current_date.weekday()].value
-                if weekday not in days:
-                    current_date += timedelta(days=1)
-                    continue
-            
-            # Criar instância
-            instance = models.RecurringScheduleInstance(
-                id=uuid.uuid4(),
-                parent_schedule_id=schedule.id,
-                instance_date=current_date,
-                status=schedule.status
+    def find_series_conflicts(
+        self,
+        provider_id: uuid.UUID,
+        start_date: datetime,
+        end_date: datetime,
+        recurrence_type,
+        recurrence_end_date: datetime,
+        recurrence_days=None,
+        exclude_schedule_id: Optional[uuid.UUID] = None
+    ) -> List[date]:
+        """Retorna as datas das ocorrências da série que conflitam com a agenda"""
+        recurrence_end_date = align_timezone(recurrence_end_date, start_date)
+        offsets = occurrence_offsets(
+            start_date, recurrence_type, recurrence_days, start_date.date(), recurrence_end_date.date()
+        )
+        if not len(offsets):
+            return []
+        
+        # Uma carga dos ocupados cobrindo toda a série
+        duration = end_date - start_date
+        span_end = start_date + timedelta(days=int(offsets[-1])) + duration
+        busy = load_busy_intervals(
+            self.db, [provider_id], start_date, span_end, exclude_schedule_id
+        )[provider_id]
+        
+        starts = to_epoch(start_date) + offsets * 86400.0
+        conflicts = overlapping_mask(busy, starts, starts + duration.total_seconds())
+        
+        first_day = start_date.date()
+        return [first_day + timedelta(days=offset) for offset in offsets[conflicts].tolist()]
+    
+    def _ensure_series_available(
+        self,
+        provider_id: uuid.UUID,
+        start_date: datetime,
+        end_date: datetime,
+        recurrence_type,
+        recurrence_end_date: datetime,
+        recurrence_days=None,
+        exclude_schedule_id: Optional[uuid.UUID] = None
+    ):
+        """Levanta 409 com todas as datas em conflito da série"""
+        conflicts = self.find_series_conflicts(
+            provider_id, start_date, end_date, recurrence_type,
+            recurrence_end_date, recurrence_days, exclude_schedule_id
+        )
+        if conflicts:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={
+                    "message": "Horário não disponível para este profissional",
+                    "conflicts": [day.isoformat() for day in conflicts]
+                }
             )
-            self.db.add(instance)
-            
-            # Avançar para próxima data baseado no tipo de recorrência
-            if schedule.recurrence_type == models.RecurrenceType.DAILY:
-                current_date += timedelta(days=1)
-            elif schedule.recurrence_type == models.RecurrenceType.WEEKLY:
-                current_date += timedelta(weeks=1)
-            elif schedule.recurrence_type == models.RecurrenceType.BIWEEKLY:
-                current_date += timedelta(weeks=2)
-            elif schedule.recurrence_type == models.RecurrenceType.MONTHLY:
-                # Avançar um mês
-                month = current_date.month + 1
-                year = current_date.year
-                if month > 12:
-                    month = 1
-                    year += 1
-                current_date = current_date.replace(year=year, month=month)
     
     def update_schedule(self, schedule_id: uuid.UUID, schedule_update: schemas.ScheduleUpdate) -> models.Schedule:
         """Atualiza um agendamento"""
@@ -281,9 +712,36 @@ class ScheduleService:
             )
         
         update_data = schedule_update.model_dump(exclude_unset=True)
+        previous_span = self._schedule_span(db_schedule)
+        
+        if update_data.get('recurrence_days') is not None:
+            update_data['recurrence_days'] = json.dumps([d.value for d in schedule_update.recurrence_days])
+        
+        recurrence_type = models.RecurrenceType(update_data.get('recurrence_type', db_schedule.recurrence_type))
+        recurrence_fields = {'recurrence_type', 'recurrence_end_date', 'recurrence_days'}
+        
+        # Série recorrente: verificar todas as ocorrências com o novo horário/regra
+        if recurrence_type != models.RecurrenceType.NONE and (
+            {'start_date', 'end_date'} | recurrence_fields
+        ) & update_data.keys():
+            recurrence_end_date = update_data.get('recurrence_end_date', db_schedule.recurrence_end_date)
+            if not recurrence_end_date:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Data de término da recorrência é obrigatória"
+                )
+            self._ensure_series_available(
+                db_schedule.provider_id,
+                update_data.get('start_date', db_schedule.start_date),
+                update_data.get('end_date', db_schedule.end_date),
+                recurrence_type,
+                recurrence_end_date,
+                update_data.get('recurrence_days', db_schedule.recurrence_days),
+                exclude_schedule_id=schedule_id
+            )
         
         # Se estiver alterando horário, verificar disponibilidade
-        if 'start_date' in update_data or 'end_date' in update_data:
+        elif 'start_date' in update_data or 'end_date' in update_data:
             start_date = update_data.get('start_date', db_schedule.start_date)
             end_date = update_data.get('end_date', db_schedule.end_date)
             
@@ -291,7 +749,8 @@ class ScheduleService:
                 db_schedule.provider_id,
                 start_date,
                 end_date,
-                exclude_schedule_id=schedule_id
+                exclude_schedule_id=schedule_id,
+                use_index=False
             ):
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
@@ -305,11 +764,163 @@ class ScheduleService:
         db_schedule.updated_by_id = self.current_user.id
         db_schedule.updated_at = datetime.now()
         
-        self.db.commit()
+        commit_booking(self.db)
         self.db.refresh(db_schedule)
+        self._after_write(db_schedule, [previous_span, self._schedule_span(db_schedule)])
         
         return db_schedule
     
+    def get_occurrences(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        tenant_id: Optional[int] = None,
+        provider_id: Optional[uuid.UUID] = None
+    ) -> List[schemas.ScheduleOccurrence]:
+        """Agenda do período com agendamentos únicos e ocorrências das séries"""
+        self._validate_occurrence_window(start_date, end_date)
+        
+        query = self.db.query(models.Schedule).filter(
+            models.Schedule.is_deleted == False,
+            models.Schedule.recurrence_type == models.RecurrenceType.NONE,
+            period_overlaps(start_date, end_date)
+        )
+        if tenant_id:
+            query = query.filter(models.Schedule.tenant_id == tenant_id)
+        if provider_id:
+            query = query.filter(models.Schedule.provider_id == provider_id)
+        
+        occurrences = [
+            self._to_occurrence(schedule, schedule.start_date, schedule.end_date, schedule.status)
+            for schedule in query
+        ]
+        
+        provider_ids = [provider_id] if provider_id else None
+        for occurrence in load_occurrences(self.db, start_date, end_date, tenant_id, provider_ids):
+            occurrences.append(self._to_occurrence(
+                occurrence.schedule,
+                occurrence.start_date,
+                occurrence.end_date,
+                occurrence.status,
+                occurrence.notes
+            ))
+        
+        occurrences.sort(key=lambda o: to_epoch(o.start_date))
+        return occurrences
+    
+    def update_occurrence(
+        self,
+        schedule_id: uuid.UUID,
+        occurrence_date: date,
+        occurrence_update: schemas.ScheduleOccurrenceUpdate
+    ) -> schemas.ScheduleOccurrence:
+        """Grava a exceção (status/observações) de uma ocorrência da série"""
+        db_schedule = self.get_schedule_by_id(schedule_id)
+        if not db_schedule:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Agendamento não encontrado"
+            )
+        
+        if db_schedule.recurrence_type == models.RecurrenceType.NONE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Agendamento não é recorrente"
+            )
+        
+        occurrence = is_occurrence(
+            db_schedule.start_date,
+            db_schedule.end_date,
+            db_schedule.recurrence_type,
+            db_schedule.recurrence_end_date,
+            db_schedule.recurrence_days,
+            occurrence_date
+        )
+        if not occurrence:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Data não corresponde a uma ocorrência da série"
+            )
+        start_date, end_date = occurrence
+        
+        # Exceção existente para o dia (instance_date guarda o início da ocorrência)
+        instances = self.db.query(models.RecurringScheduleInstance).filter(
+            models.RecurringScheduleInstance.parent_schedule_id == schedule_id,
+            models.RecurringScheduleInstance.instance_date >= start_date - timedelta(days=1),
+            models.RecurringScheduleInstance.instance_date < start_date + timedelta(days=1)
+        ).all()
+        instance = next((i for i in instances if i.instance_date.date() == occurrence_date), None)
+        if instance is None:
+            instance = models.RecurringScheduleInstance(
+                id=uuid.uuid4(),
+                parent_schedule_id=schedule_id,
+                instance_date=start_date,
+                status=db_schedule.status
+            )
+            self.db.add(instance)
+        
+        update_data = occurrence_update.model_dump(exclude_unset=True)
+        
+        if update_data.get('status') is not None:
+            update_data['status'] = models.ScheduleStatus(update_data['status'])
+        
+        # Reativar uma ocorrência exige o horário livre
+        if (update_data.get('status') in BLOCKING_STATUSES
+                and instance.status not in BLOCKING_STATUSES
+                and not self.check_availability(
+                    db_schedule.provider_id, start_date, end_date,
+                    exclude_schedule_id=schedule_id, use_index=False
+                )):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Horário não disponível para este profissional"
+            )
+        
+        for field, value in update_data.items():
+            setattr(instance, field, value)
+        
+        self.db.commit()
+        self.db.refresh(instance)
+        self._after_write(db_schedule, [(start_date, end_date)])
+        
+        return self._to_occurrence(db_schedule, start_date, end_date, instance.status, instance.notes)
+    
+    def _to_occurrence(
+        self,
+        schedule: models.Schedule,
+        start_date: datetime,
+        end_date: datetime,
+        occurrence_status: models.ScheduleStatus,
+        notes: Optional[str] = None
+    ) -> schemas.ScheduleOccurrence:
+        return schemas.ScheduleOccurrence(
+            schedule_id=schedule.id,
+            provider_id=schedule.provider_id,
+            user_id=schedule.user_id,
+            category_id=schedule.category_id,
+            product_id=schedule.product_id,
+            tenant_id=schedule.tenant_id,
+            start_date=start_date,
+            end_date=end_date,
+            status=occurrence_status,
+            recurrence_type=schedule.recurrence_type,
+            notes=notes
+        )
+    
+    def _validate_occurrence_window(self, start_date: datetime, end_date: datetime):
+        """Limita o período expandido das séries recorrentes"""
+        if start_date >= end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Data de início deve ser anterior à data de término"
+            )
+        
+        if end_date - start_date > timedelta(days=MAX_OCCURRENCES_WINDOW_DAYS):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Período máximo para a agenda é de {MAX_OCCURRENCES_WINDOW_DAYS} dias"
+            )
+    
     def cancel_schedule(self, schedule_id: uuid.UUID) -> bool:
         """Cancela um agendamento"""
         db_schedule = self.get_schedule_by_id(schedule_id)
@@ -324,6 +935,7 @@ class ScheduleService:
         db_schedule.updated_at = datetime.now()
         
         self.db.commit()
+        self._after_write(db_schedule)
         
         return True
     
@@ -335,230 +947,394 @@ class ScheduleService:
         provider_id: Optional[uuid.UUID] = None
     ) -> List[schemas.CalendarView]:
         """Retorna visão mensal do calendário"""
+        if not settings.CALENDAR_CACHE_ENABLED:
+            return self._build_calendar_view(tenant_id, year, month, provider_id)
+        
+        # Versão lida antes do cálculo: uma escrita concorrente invalida o resultado
+        key = (tenant_id, year, month, provider_id)
+        version = calendar_cache.version(tenant_id, year, month)
+        calendar_view = calendar_cache.get(key, version)
+        if calendar_view is None:
+            calendar_view = self._build_calendar_view(tenant_id, year, month, provider_id)
+            calendar_cache.set(key, version, calendar_view)
+        return calendar_view
+    
+    def _build_calendar_view(
+        self,
+        tenant_id: int,
+        year: int,
+        month: int,
+        provider_id: Optional[uuid.UUID] = None
+    ) -> List[schemas.CalendarView]:
         start_date = datetime(year, month, 1)
         if month == 12:
-            end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+            next_month = datetime(year + 1, 1, 1)
         else:
-            end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-        
-        # Buscar agendamentos do mês
-        schedules = self.get_schedules_by_date_range(
-            tenant_id, 
-            start_date, 
-            end_date + timedelta(days=1),  # Incluir último dia
-            provider_id
+            next_month = datetime(year, month + 1, 1)
+        
+        # Agendamentos simples do mês com os relacionamentos serializados
+        query = self.db.query(models.Schedule).options(*schedule_load_options()).filter(
+            models.Schedule.tenant_id == tenant_id,
+            models.Schedule.is_deleted == False,
+            models.Schedule.recurrence_type == models.RecurrenceType.NONE,
+            models.Schedule.start_date >= start_date,
+            models.Schedule.start_date < next_month
         )
+        if provider_id:
+            query = query.filter(models.Schedule.provider_id == provider_id)
         
-        # Agrupar por data
-        calendar = []
-        current_date = start_date
+        # Um balde por dia do mês, preenchido em uma única passada
+        days = (next_month - start_date).days
+        buckets = {
+            (start_date + timedelta(days=offset)).date(): ([], [])
+            for offset in range(days)
+        }
         
-        while current_date <= end_date:
-            day_schedules = [
-                s for s in schedules 
-                if s.start_date.date() == current_date.date()
-            ]
-            
-            calendar.append(schemas.CalendarView(
-                date=current_date.date(),
-                schedules=day_schedules
-            ))
-            
-            current_date += timedelta(days=1)
+        for schedule in query.order_by(models.Schedule.start_date):
+            bucket = buckets.get(schedule.start_date.date())
+            if bucket is not None:
+                bucket[0].append(schedule)
+        
+        # Séries recorrentes: todas as ocorrências, inclusive a primeira, saem da
+        # expansão (dias da semana e exceções aplicados)
+        provider_ids = [provider_id] if provider_id else None
+        for o in load_occurrences(self.db, start_date, next_month, tenant_id, provider_ids):
+            bucket = buckets.get(o.start_date.date())
+            if bucket is not None:
+                bucket[1].append(self._to_occurrence(o.schedule, o.start_date, o.end_date, o.status, o.notes))
         
-        return calendar
+        return [
+            schemas.CalendarView(date=day, schedules=day_schedules, occurrences=day_occurrences)
+            for day, (day_schedules, day_occurrences) in buckets.items()
+        ]
     
-    def create_bulk_schedules(self, bulk_data: schemas.BulkScheduleCreate) -> List[models.Schedule]:
-        """Cria múltiplos agendamentos baseado em dias da semana"""
-        created_schedules = []
-        errors = []
+    def get_resource_view(
+        self,
+        tenant_id: int,
+        day: date,
+        days: int = 1,
+        provider_ids: Optional[List[uuid.UUID]] = None
+    ) -> schemas.ResourceView:
+        """Agenda do dia/semana lado a lado por profissional, em colunas compactas"""
+        window_start = datetime.combine(day, time.min)
+        window_end = window_start + timedelta(days=days)
         
-        # Converter string de tempo para time
-        start_time = datetime.strptime(bulk_data.start_time, "%H:%M").time()
-        end_time = datetime.strptime(bulk_data.end_time, "%H:%M").time()
+        # Colunas: todos os profissionais do tenant, mesmo sem agendamentos
+        providers_query = self.db.query(models.User.id, models.User.name).filter(
+            models.User.is_deleted == False,
+            models.User.user_type == models.UserType.PROVIDER,
+            models.User.tenants.any(models.Tenant.id == tenant_id)
+        )
+        if provider_ids:
+            providers_query = providers_query.filter(models.User.id.in_(provider_ids))
+        providers = providers_query.order_by(models.User.name).all()
+        provider_index = {provider_id: idx for idx, (provider_id, _) in enumerate(providers)}
         
-        current_date = bulk_data.start_date
-        end_date = bulk_data.end_date or (bulk_data.start_date + timedelta(days=365))
+        # Apenas as colunas necessárias, sem objetos ORM
+        customer = aliased(models.User)
+        rows = self.db.query(
+            models.Schedule.id,
+            models.Schedule.provider_id,
+            models.Schedule.start_date,
+            models.Schedule.end_date,
+            models.Schedule.status,
+            models.Schedule.product_id,
+            models.Product.name,
+            models.Schedule.user_id,
+            customer.name
+        ).join(
+            models.Product, models.Schedule.product_id == models.Product.id
+        ).join(
+            customer, models.Schedule.user_id == customer.id
+        ).filter(
+            models.Schedule.tenant_id == tenant_id,
+            models.Schedule.is_deleted == False,
+            models.Schedule.recurrence_type == models.RecurrenceType.NONE,
+            models.Schedule.provider_id.in_(list(provider_index)),
+            period_overlaps(window_start, window_end)
+        ).all()
         
-        while current_date <= end_date:
-            # Verificar se o dia da semana está incluído
-            weekday = list(models.WeekDay)[current_date.weekday()].value
-            if weekday not in [d.value for d in bulk_data.days]:
-                current_date += timedelta(days=1)
-                continue
-            
-            # Criar datetime com horário específico
-            start_datetime = datetime.combine(current_date, start_time)
-            end_datetime = datetime.combine(current_date, end_time)
-            
-            # Verificar disponibilidade
-            if self.check_availability(bulk_data.provider_id, start_datetime, end_datetime):
-                schedule_data = schemas.ScheduleCreate(
-                    provider_id=bulk_data.provider_id,
-                    user_id=bulk_data.user_id,
-                    category_id=bulk_data.category_id,
-                    product_id=bulk_data.product_id,
-                    tenant_id=bulk_data.tenant_id,
-                    start_date=start_datetime,
-                    end_date=end_datetime,
-                    service_price=bulk_data.service_price
-                )
-                
-                try:
-                    schedule = self.create_schedule(schedule_data)
-                    created_schedules.append(schedule)
-                except Exception as e:
-                    errors.append({
-                        'date': current_date.isoformat(),
-                        'error': str(e)
-                    })
-            
-            current_date += timedelta(days=1)
+        # Ocorrências das séries recorrentes (nomes resolvidos abaixo)
+        occurrences = load_occurrences(self.db, window_start, window_end, tenant_id, list(provider_index))
+        product_names = {product_id: name for _, _, _, _, _, product_id, name, _, _ in rows}
+        user_names = {user_id: name for _, _, _, _, _, _, _, user_id, name in rows}
+        missing_products = {o.schedule.product_id for o in occurrences} - product_names.keys()
+        missing_users = {o.schedule.user_id for o in occurrences} - user_names.keys()
+        if missing_products:
+            product_names.update(self.db.query(models.Product.id, models.Product.name).filter(
+                models.Product.id.in_(missing_products)
+            ).all())
+        if missing_users:
+            user_names.update(self.db.query(models.User.id, models.User.name).filter(
+                models.User.id.in_(missing_users)
+            ).all())
+        
+        entries = [
+            (to_epoch(start_date), to_epoch(end_date), schedule_id, provider_id, schedule_status, product_id, user_id)
+            for schedule_id, provider_id, start_date, end_date, schedule_status, product_id, _, user_id, _ in rows
+        ]
+        entries.extend(
+            (to_epoch(o.start_date), to_epoch(o.end_date), o.schedule.id, o.schedule.provider_id,
+             o.status, o.schedule.product_id, o.schedule.user_id)
+            for o in occurrences
+        )
+        entries.sort(key=lambda entry: (provider_index[entry[3]], entry[0]))
+        
+        # Tabelas de nomes internadas: cada produto/usuário aparece uma vez
+        product_ids: Dict[uuid.UUID, int] = {}
+        user_ids: Dict[uuid.UUID, int] = {}
+        view = schemas.ResourceView(
+            start=int(to_epoch(window_start)),
+            end=int(to_epoch(window_end)),
+            statuses=STATUS_CODES,
+            provider_ids=[provider_id for provider_id, _ in providers],
+            provider_names=[name for _, name in providers]
+        )
+        for start, end, schedule_id, provider_id, schedule_status, product_id, user_id in entries:
+            view.schedule_ids.append(schedule_id)
+            view.provider.append(provider_index[provider_id])
+            view.starts.append(int(start))
+            view.ends.append(int(end))
+            view.status.append(STATUS_CODES.index(getattr(schedule_status, 'value', schedule_status)))
+            view.product.append(product_ids.setdefault(product_id, len(product_ids)))
+            view.user.append(user_ids.setdefault(user_id, len(user_ids)))
         
-        return created_schedules
+        view.product_names = [product_names.get(product_id) for product_id in product_ids]
+        view.user_names = [user_names.get(user_id) for user_id in user_ids]
+        return view
     
-    def import_schedules_from_csv(self, file_content: bytes, tenant_id: int) -> schemas.ScheduleImportResult:
-        """Importa agendamentos de arquivo CSV"""
-        try:
-            # Ler CSV
-            df = pd.read_csv(io.StringIO(file_content.decode('utf-8')))
-            
-            result = {
-                'total_records': len(df),
-                'new_records': 0,
-                'duplicates_found': [],
-                'conflicts_found': [],
-                'errors': []
-            }
-            
-            for idx, row in df.iterrows():
-                try:
-                    # Processar linha
-                    schedule_data = self._parse_import_row(row, tenant_id)
-                    
-                    if schedule_data:
-                        # Verificar disponibilidade
-                        if not self.check_availability(
-                            schedule_data.provider_id,
-                            schedule_data.start_date,
-                            schedule_data.end_date
-                        ):
-                            result['conflicts_found'].append({
-                                'row': idx + 2,
-                                'data': row.to_dict(),
-                                'conflict': 'Horário não disponível'
-                            })
-                            continue
-                        
-                        # Criar agendamento
-                        self.create_schedule(schedule_data)
-                        result['new_records'] += 1
-                
-                except Exception as e:
-                    result['errors'].append({
-                        'row': idx + 2,
-                        'error': str(e)
-                    })
-            
-            return schemas.ScheduleImportResult(**result)
+    def get_calendar_heatmap(
+        self,
+        tenant_id: int,
+        start_date: date,
+        end_date: date,
+        provider_id: Optional[uuid.UUID] = None
+    ) -> schemas.CalendarHeatmap:
+        """Contagem e minutos agendados por dia, profissional e status (agregado no banco)"""
+        if start_date > end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Data de início deve ser anterior à data de término"
+            )
         
-        except Exception as e:
+        days = (end_date - start_date).days + 1
+        if days > MAX_HEATMAP_DAYS:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Erro ao processar arquivo: {str(e)}"
+                detail=f"Período máximo para o mapa de calor é de {MAX_HEATMAP_DAYS} dias"
             )
+        
+        window_start = datetime.combine(start_date, time.min)
+        window_end = datetime.combine(end_date + timedelta(days=1), time.min)
+        
+        rows: Dict[tuple, schemas.HeatmapRow] = {}
+        
+        def add(row_day, row_provider_id, row_status, count, total_minutes):
+            key = (row_provider_id, row_status)
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = schemas.HeatmapRow(
+                    provider_id=row_provider_id,
+                    status=row_status.value,
+                    counts=[0] * days,
+                    minutes=[0] * days
+                )
+            idx = (row_day - start_date).days
+            row.counts[idx] += count
+            row.minutes[idx] += int(round(total_minutes or 0))
+        
+        for row_day, row_provider_id, row_status, count, total_minutes in self.db.execute(
+            heatmap_query(tenant_id, window_start, window_end, provider_id)
+        ):
+            add(row_day.date(), row_provider_id, row_status, count, total_minutes)
+        
+        # Séries recorrentes: todas as ocorrências, inclusive a primeira, saem da
+        # expansão (dias da semana e exceções aplicados)
+        provider_ids = [provider_id] if provider_id else None
+        for o in load_occurrences(self.db, window_start, window_end, tenant_id, provider_ids):
+            if start_date <= o.start_date.date() <= end_date:
+                add(
+                    o.start_date.date(), o.schedule.provider_id, o.status, 1,
+                    (o.end_date - o.start_date).total_seconds() / 60
+                )
+        
+        return schemas.CalendarHeatmap(
+            start_date=start_date,
+            end_date=end_date,
+            rows=sorted(rows.values(), key=lambda row: (str(row.provider_id), row.status))
+        )
     
-    def _parse_import_row(self, row: pd.Series, tenant_id: int) -> Optional[schemas.ScheduleCreate]:
-        """Converte linha do CSV para ScheduleCreate"""
-        try:
-            # Buscar profissional pelo email
-            provider_email = row.get('profissional_email') or row.get('provider_email')
-            if not provider_email:
-                raise ValueError("Email do profissional é obrigatório")
-            
-            provider = self.db.query(models.User).filter(
-                models.User.email == provider_email.strip(),
-                models.User.is_deleted == False,
-                models.User.user_type == models.UserType.PROVIDER
-            ).first()
-            
-            if not provider:
-                raise ValueError(f"Profissional com email '{provider_email}' não encontrado")
-            
-            # Buscar usuário pelo email
-            user_email = row.get('usuario_email') or row.get('user_email')
-            if not user_email:
-                raise ValueError("Email do usuário é obrigatório")
-            
-            user = self.db.query(models.User).filter(
-                models.User.email == user_email.strip(),
-                models.User.is_deleted == False
-            ).first()
-            
-            if not user:
-                raise ValueError(f"Usuário com email '{user_email}' não encontrado")
-            
-            # Buscar categoria pelo nome
-            category_name = row.get('categoria') or row.get('category')
-            if not category_name:
-                raise ValueError("Categoria é obrigatória")
-            
-            category = self.db.query(models.Category).filter(
-                models.Category.name == category_name.strip(),
-                models.Category.is_deleted == False
-            ).first()
-            
-            if not category:
-                raise ValueError(f"Categoria '{category_name}' não encontrada")
-            
-            # Buscar produto pelo nome
-            product_name = row.get('produto') or row.get('product')
-            if not product_name:
-                raise ValueError("Produto é obrigatório")
-            
-            product = self.db.query(models.Product).filter(
-                models.Product.name == product_name.strip(),
-                models.Product.tenant_id == tenant_id,
-                models.Product.is_deleted == False
-            ).first()
-            
-            if not product:
-                raise ValueError(f"Produto '{product_name}' não encontrado neste tenant")
-            
-            # Datas
-            start_date_str = row.get('data_inicio') or row.get('start_date')
-            if not start_date_str:
-                raise ValueError("Data de início é obrigatória")
-            
-            start_date = pd.to_datetime(start_date_str).to_pydatetime()
+    def export_schedules(
+        self,
+        tenant_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        export_format: str = "ndjson",
+        provider_id: Optional[uuid.UUID] = None
+    ) -> Iterator[str]:
+        """Exporta os agendamentos do período em NDJSON ou CSV, em blocos de texto.
+        
+        Os agendamentos vêm de um cursor no servidor (yield_per) e as séries
+        recorrentes são expandidas mês a mês e intercaladas por início, então
+        a memória usada não depende do tamanho do período.
+        """
+        if start_date >= end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Data de início deve ser anterior à data de término"
+            )
+        
+        provider = aliased(models.User)
+        client = aliased(models.User)
+        query = select(
+            models.Schedule.id,
+            models.Schedule.start_date,
+            models.Schedule.end_date,
+            models.Schedule.status,
+            models.Schedule.service_price,
+            models.Schedule.recurrence_type,
+            models.Schedule.provider_id,
+            provider.name.label("provider_name"),
+            models.Schedule.user_id,
+            client.name.label("user_name"),
+            models.Schedule.category_id,
+            models.Category.name.label("category_name"),
+            models.Schedule.product_id,
+            models.Product.name.label("product_name"),
+            models.Schedule.tenant_id
+        ).join(
+            provider, provider.id == models.Schedule.provider_id
+        ).join(
+            client, client.id == models.Schedule.user_id
+        ).join(
+            models.Category, models.Category.id == models.Schedule.category_id
+        ).join(
+            models.Product, models.Product.id == models.Schedule.product_id
+        ).where(
+            models.Schedule.tenant_id == tenant_id,
+            models.Schedule.is_deleted == False,
+            models.Schedule.recurrence_type == models.RecurrenceType.NONE
+        ).order_by(models.Schedule.start_date, models.Schedule.id)
+        if provider_id:
+            query = query.where(models.Schedule.provider_id == provider_id)
+        
+        provider_ids = [provider_id] if provider_id else None
+        bind = self.db.get_bind()
+        
+        def generate() -> Iterator[str]:
+            if export_format == "csv":
+                yield ",".join(EXPORT_COLUMNS) + "\r\n"
             
-            end_date_str = row.get('data_fim') or row.get('end_date')
-            if not end_date_str:
-                # Calcular baseado na duração do produto (1 hora padrão)
-                end_date = start_date + timedelta(hours=1)
-            else:
-                end_date = pd.to_datetime(end_date_str).to_pydatetime()
+            # Conexão e sessão próprias: o gerador roda depois que a rota retorna
+            # e a sessão da requisição (get_db) já foi fechada
+            with bind.connect() as connection, Session(bind=connection) as session:
+                for window_start, window_end in _month_windows(start_date, end_date):
+                    # Todas as ocorrências das séries, inclusive a primeira (exceções aplicadas)
+                    occurrences = [
+                        _occurrence_export_row(o)
+                        for o in load_occurrences(session, window_start, window_end, tenant_id, provider_ids)
+                        if window_start <= align_timezone(o.start_date, window_start) < window_end
+                    ]
+                    result = connection.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(
+                        query.where(
+                            models.Schedule.start_date >= window_start,
+                            models.Schedule.start_date < window_end
+                        )
+                    )
+                    rows = heapq.merge(
+                        result.mappings(), occurrences,
+                        key=lambda row: align_timezone(row["start_date"], window_start)
+                    )
+                    while True:
+                        batch = list(islice(rows, EXPORT_BATCH_SIZE))
+                        if not batch:
+                            break
+                        yield _encode_export_rows(batch, export_format)
+        
+        return generate()
+    
+    def create_bulk_schedules(self, bulk_data: schemas.BulkScheduleCreate) -> schemas.BulkScheduleResult:
+        """Cria múltiplos agendamentos baseado em dias da semana (uma transação)"""
+        # Validar referências uma única vez
+        self._validate_schedule_references(bulk_data)
+        
+        # Converter string de tempo para time
+        start_time = datetime.strptime(bulk_data.start_time, "%H:%M").time()
+        end_time = datetime.strptime(bulk_data.end_time, "%H:%M").time()
+        if start_time >= end_time:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Horário de início deve ser anterior ao horário de término"
+            )
+        
+        end_date = bulk_data.end_date or (bulk_data.start_date + timedelta(days=365))
+        
+        # Todas as datas candidatas de uma vez
+        first_start = datetime.combine(bulk_data.start_date, start_time)
+        duration = datetime.combine(bulk_data.start_date, end_time) - first_start
+        offsets = occurrence_offsets(
+            first_start, models.RecurrenceType.DAILY, bulk_data.days, bulk_data.start_date, end_date
+        )
+        
+        result = {'created': [], 'skipped': [], 'errors': []}
+        if not len(offsets):
+            return schemas.BulkScheduleResult(**result)
+        
+        starts = to_epoch(first_start) + offsets * 86400.0
+        ends = starts + duration.total_seconds()
+        
+        # Ocupados do período inteiro em uma consulta
+        busy = load_busy_intervals(
+            self.db,
+            [bulk_data.provider_id],
+            first_start,
+            first_start + timedelta(days=int(offsets[-1])) + duration
+        )[bulk_data.provider_id]
+        conflicts = overlapping_mask(busy, starts, ends)
+        in_past = starts < to_epoch(datetime.now())
+        
+        rows = []
+        for offset, conflict, past in zip(offsets.tolist(), conflicts.tolist(), in_past.tolist()):
+            day = bulk_data.start_date + timedelta(days=offset)
+            if past:
+                result['errors'].append({'date': day.isoformat(), 'error': "Não é possível agendar no passado"})
+                continue
+            if conflict:
+                result['skipped'].append({'date': day.isoformat(), 'reason': "Horário não disponível"})
+                continue
             
-            # Preço (opcional)
-            price = row.get('preco') or row.get('price')
-            if price and pd.notna(price):
-                if isinstance(price, float):
-                    price = int(price * 100)
-                else:
-                    price = int(price)
+            start_datetime = first_start + timedelta(days=offset)
+            rows.append({
+                'id': uuid.uuid4(),
+                'provider_id': bulk_data.provider_id,
+                'user_id': bulk_data.user_id,
+                'category_id': bulk_data.category_id,
+                'product_id': bulk_data.product_id,
+                'tenant_id': bulk_data.tenant_id,
+                'start_date': start_datetime,
+                'end_date': start_datetime + duration,
+                'service_price': bulk_data.service_price,
+                'status': models.ScheduleStatus.ACTIVE,
+                'recurrence_type': models.RecurrenceType.NONE,
+                'is_deleted': False,
+                'created_by_id': self.current_user.id,
+                'updated_by_id': self.current_user.id
+            })
+        
+        if rows:
+            # Um único INSERT para todos os agendamentos
+            self.db.execute(insert(models.Schedule), rows)
+            commit_booking(self.db)
             
-            data = {
-                'provider_id': provider.id,
-                'user_id': user.id,
-                'category_id': category.id,
-                'product_id': product.id,
-                'tenant_id': tenant_id,
-                'start_date': start_date,
-                'end_date': end_date,
-                'service_price': price
-            }
+            if settings.AVAILABILITY_INDEX_ENABLED:
+                availability_index.invalidate(bulk_data.provider_id)
+            calendar_cache.bump(bulk_data.tenant_id, rows[0]['start_date'], rows[-1]['end_date'])
             
-            return schemas.ScheduleCreate(**data)
+            # Recarregar os criados com os relacionamentos em poucas consultas
+            result['created'] = self.db.query(models.Schedule).options(
+                *schedule_load_options()
+            ).filter(
+                models.Schedule.id.in_([row['id'] for row in rows])
+            ).order_by(models.Schedule.start_date).all()
         
-        except Exception as e:
-            raise ValueError(f"Erro ao processar linha: {str(e)}")
+        return schemas.BulkScheduleResult(**result)
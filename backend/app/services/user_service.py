@@ -7,6 +7,8 @@ import io
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from app import models, schemas, auth
+from app.utils.validators import validate_cpf
+from app.services.import_validation import validate_in_shards, report_repeated_rows, text_column
 
 class UserService:
     def __init__(self, db: Session, current_user: Optional[models.User] = None):
@@ -34,8 +36,8 @@ class UserService:
             models.User.is_deleted == False
         ).first()
     
-    def create_user(self, user_data: schemas.UserCreate) -> models.User:
-        """Cria um novo usuário"""
+    def create_user(self, user_data: schemas.UserCreate, commit: bool = True) -> models.User:
+        """Cria um novo usuário (commit=False só envia ao banco; quem chama confirma)"""
         # Verificar duplicidade
         existing_email = self.get_user_by_email(user_data.email)
         if existing_email:
@@ -100,8 +102,11 @@ class UserService:
         db_user.tenants.append(tenant)
         
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_user)
+        else:
+            self.db.flush()
         
         return db_user
     
@@ -180,73 +185,101 @@ class UserService:
     def import_users_from_csv(self, file_content: bytes, tenant_id: int) -> schemas.UserImportResult:
         """Importa usuários de arquivo CSV"""
         try:
-            # Ler CSV
-            df = pd.read_csv(io.StringIO(file_content.decode('utf-8')))
-            
-            result = {
-                'total_records': len(df),
-                'new_records': 0,
-                'duplicates_found': [],
-                'errors': []
-            }
-            
-            for idx, row in df.iterrows():
-                try:
-                    # Verificar duplicidade
-                    existing_by_email = None
-                    existing_by_cpf = None
-                    
-                    if 'email' in row and pd.notna(row['email']):
-                        existing_by_email = self.get_user_by_email(row['email'])
-                    
-                    if 'cpf' in row and pd.notna(row['cpf']):
-                        existing_by_cpf = self.get_user_by_cpf(row['cpf'])
-                    
-                    if existing_by_email or existing_by_cpf:
-                        # Registro duplicado
-                        result['duplicates_found'].append({
-                            'row': idx + 2,  # +2 por causa do header e 0-index
-                            'data': row.to_dict(),
-                            'existing_user': {
-                                'id': str(existing_by_email.id if existing_by_email else existing_by_cpf.id),
-                                'name': existing_by_email.name if existing_by_email else existing_by_cpf.name,
-                                'email': existing_by_email.email if existing_by_email else existing_by_cpf.email,
-                                'cpf': existing_by_email.cpf if existing_by_email else existing_by_cpf.cpf
-                            }
-                        })
-                    else:
-                        # Criar novo usuário
-                        user_data = self._parse_import_row(row, tenant_id)
-                        if user_data:
-                            # Definir status como PENDING para importação
-                            user_data.status = schemas.UserStatus.PENDING
-                            
-                            # Gerar senha temporária
-                            import secrets
-                            import string
-                            temp_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(8))
-                            user_data.password = temp_password
-                            
-                            self.create_user(user_data)
-                            result['new_records'] += 1
-                
-                except Exception as e:
-                    result['errors'].append({
-                        'row': idx + 2,
-                        'error': str(e)
-                    })
-            
-            return schemas.UserImportResult(**result)
-        
+            # Ler CSV (texto: CPF e CEP mantêm zeros à esquerda)
+            df = pd.read_csv(io.StringIO(file_content.decode('utf-8')), dtype=str)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Erro ao processar arquivo: {str(e)}"
             )
+        
+        result = self.import_frame(df, tenant_id)
+        self.db.commit()
+        return schemas.UserImportResult(**result)
     
-    def _parse_import_row(self, row: pd.Series, tenant_id: int) -> Optional[schemas.UserCreate]:
+    def import_frame(self, df: pd.DataFrame, tenant_id: int, first_row: int = 2) -> Dict[str, Any]:
+        """Importa as linhas do DataFrame sem confirmar (first_row = número da 1ª linha no arquivo)"""
+        result = {
+            'total_records': len(df),
+            'new_records': 0,
+            'duplicates_found': [],
+            'errors': []
+        }
+        
+        # Usuários já cadastrados com os e-mails ou CPFs do bloco (uma consulta)
+        lookups = self.import_lookups(df, tenant_id)
+        
+        for idx, row in df.reset_index(drop=True).iterrows():
+            try:
+                # Verificar duplicidade
+                existing = _find_existing_user(row, lookups)
+                
+                if existing:
+                    # Registro duplicado
+                    result['duplicates_found'].append({
+                        'row': idx + first_row,
+                        'data': row.to_dict(),
+                        'existing_user': existing
+                    })
+                else:
+                    # Criar novo usuário
+                    user_data = self._parse_import_row(row, tenant_id)
+                    if user_data:
+                        # Definir status como PENDING para importação
+                        user_data.status = schemas.UserStatus.PENDING
+                        
+                        # Gerar senha temporária
+                        import secrets
+                        import string
+                        temp_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(8))
+                        user_data.password = temp_password
+                        
+                        # Savepoint por linha: um erro descarta só a linha, o bloco é confirmado por quem chamou
+                        with self.db.begin_nested():
+                            user = self.create_user(user_data, commit=False)
+                        # Linhas seguintes com o mesmo e-mail ou CPF viram duplicadas
+                        _remember_user(lookups, user)
+                        result['new_records'] += 1
+            
+            except Exception as e:
+                result['errors'].append({
+                    'row': idx + first_row,
+                    'error': str(e)
+                })
+        
+        return result
+    
+    def import_lookups(self, df: pd.DataFrame, tenant_id: int) -> Dict[str, Any]:
+        """Usuários já cadastrados com os e-mails ou CPFs do bloco (uma consulta)"""
+        emails = df['email'].dropna().tolist() if 'email' in df.columns else []
+        cpfs = [str(cpf) for cpf in df['cpf'].dropna()] if 'cpf' in df.columns else []
+        
+        lookups: Dict[str, Any] = {'tenant_id': tenant_id, 'emails': {}, 'cpfs': {}}
+        for user in self.db.query(models.User).filter(
+            or_(models.User.email.in_(emails), models.User.cpf.in_(cpfs)),
+            models.User.is_deleted == False
+        ):
+            _remember_user(lookups, user)
+        
+        return lookups
+    
+    def validate_frame(self, df: pd.DataFrame, tenant_id: int, first_row: int = 2) -> Dict[str, Any]:
+        """Modo dry_run: só valida as linhas, em paralelo, sem gravar nada"""
+        df = df.reset_index(drop=True)
+        result = validate_in_shards(validate_import_rows, df, self.import_lookups(df, tenant_id), first_row)
+        # E-mail ou CPF repetido no próprio bloco: a importação real cria só o primeiro
+        keys = pd.DataFrame({'email': text_column(df, 'email'), 'cpf': text_column(df, 'cpf')})
+        return report_repeated_rows(result, df, keys, first_row)
+    
+    @staticmethod
+    def _parse_import_row(row: pd.Series, tenant_id: int) -> Optional[schemas.UserCreate]:
         """Converte linha do CSV para UserCreate"""
         try:
+            # Dígitos verificadores (o schema só confere o tamanho)
+            cpf = row.get('cpf')
+            if pd.notna(cpf) and not validate_cpf(str(cpf)):
+                raise ValueError(f"CPF inválido: '{cpf}'")
+            
             # Mapear colunas
             data = {
                 'name': row.get('nome') or row.get('name'),
@@ -305,3 +338,41 @@ class UserService:
         self.db.refresh(db_user)
         
         return db_user
+
+def _remember_user(lookups: Dict[str, Any], user: models.User):
+    existing = {'id': str(user.id), 'name': user.name, 'email': user.email, 'cpf': user.cpf}
+    lookups['emails'][user.email] = existing
+    lookups['cpfs'][user.cpf] = existing
+
+def _find_existing_user(row: pd.Series, lookups: Dict[str, Any]) -> Optional[dict]:
+    """Usuário já cadastrado com o e-mail ou o CPF da linha"""
+    existing = None
+    if 'email' in row and pd.notna(row['email']):
+        existing = lookups['emails'].get(row['email'])
+    if not existing and 'cpf' in row and pd.notna(row['cpf']):
+        existing = lookups['cpfs'].get(str(row['cpf']))
+    return existing
+
+def validate_import_rows(df: pd.DataFrame, lookups: Dict[str, Any], first_row: int) -> Dict[str, list]:
+    """Validação de um shard do dry_run (executada em outro processo)"""
+    result = {'duplicates_found': [], 'errors': []}
+    for idx, row in df.iterrows():
+        try:
+            existing = _find_existing_user(row, lookups)
+            
+            if existing:
+                result['duplicates_found'].append({
+                    'row': idx + first_row,
+                    'data': row.to_dict(),
+                    'existing_user': existing
+                })
+            else:
+                UserService._parse_import_row(row, lookups['tenant_id'])
+        
+        except Exception as e:
+            result['errors'].append({
+                'row': idx + first_row,
+                'error': str(e)
+            })
+    
+    return result
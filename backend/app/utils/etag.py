@@ -0,0 +1,57 @@
+import hashlib
+from typing import Iterable, Optional
+from fastapi import Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Query
+from app import models
+
+# Colunas de versão das tabelas embutidas nas listas: a contagem pega
+# inclusões/remoções e o max pega edições (tenants antigos têm updated_at nulo)
+TENANT_VERSIONS = (func.coalesce(models.Tenant.updated_at, models.Tenant.created_at),)
+USER_VERSIONS = (models.User.updated_at, models.user_roles.c.role_id)
+CATEGORY_VERSIONS = (models.Category.updated_at, models.Category.tenant_categories.c.created_at) + TENANT_VERSIONS
+PRODUCT_VERSIONS = (models.Product.updated_at,) + CATEGORY_VERSIONS + USER_VERSIONS
+
+def compute_etag(query: Query, updated_column, *scope, related: Iterable = ()) -> str:
+    """ETag fraco a partir de contagem + max(updated_at) da consulta filtrada.
+    
+    Uma única consulta agregada, sem carregar linhas; `scope` diferencia
+    filtros, paginação e usuário que compartilham a mesma consulta base.
+    `related` traz as colunas de versão das tabelas embutidas na resposta,
+    somadas ao hash como subconsultas escalares (count + max) não correlacionadas.
+    """
+    versions = []
+    for column in dict.fromkeys(related):
+        versions.append(select(func.count(column)).correlate(None).scalar_subquery())
+        versions.append(select(func.max(column)).correlate(None).scalar_subquery())
+    
+    row = query.with_entities(
+        func.count(), func.max(updated_column), *versions
+    ).order_by(None).one()
+    
+    raw = "|".join(
+        [value.isoformat() if hasattr(value, "isoformat") else "" if value is None else str(value) for value in row]
+        + [str(s) for s in scope]
+    )
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Compara o ETag com o cabeçalho If-None-Match (comparação fraca)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    
+    def normalize(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+    
+    return normalize(etag) in {normalize(tag) for tag in header.split(",")}
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Define o ETag na resposta e retorna 304 se o cliente já tem a versão atual"""
+    response.headers["ETag"] = etag
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
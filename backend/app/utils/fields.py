@@ -0,0 +1,68 @@
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Type
+from fastapi import HTTPException, Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+def selectable_fields(model, schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Campos do schema que são colunas do modelo (relacionamentos ficam de fora)"""
+    columns = set(inspect(model).columns.keys())
+    return tuple(name for name in schema.model_fields if name in columns)
+
+def parse_fields(fields: Optional[str], model, schema: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """Lê ?fields=start_date,status (400 para campos desconhecidos); id sempre incluído"""
+    if not fields:
+        return None
+    
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    allowed = selectable_fields(model, schema)
+    invalid = [name for name in names if name not in allowed]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"fields inválido: {', '.join(invalid)}. Disponíveis: {', '.join(allowed)}"
+        )
+    return tuple(dict.fromkeys(["id", *names]))
+
+def fields_load_only(model, fields: Tuple[str, ...], *extra_columns):
+    """load_only com as colunas pedidas e as usadas pela rota (cursor, controle de acesso)"""
+    names = dict.fromkeys([*fields, *(column.key for column in extra_columns)])
+    return load_only(*(getattr(model, name) for name in names))
+
+@lru_cache(maxsize=256)
+def sparse_schema(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Schema reduzido aos campos pedidos, com os mesmos tipos e validações"""
+    definitions = {
+        name: (schema.model_fields[name].annotation, schema.model_fields[name])
+        for name in fields
+    }
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions
+    )
+
+def sparse_response(
+    data: Any,
+    schema: Type[BaseModel],
+    fields: Tuple[str, ...],
+    response: Optional[Response] = None
+) -> JSONResponse:
+    """Serializa só os campos pedidos (lista ou objeto único).
+    
+    Retorna a resposta pronta, sem passar pelo response_model completo da
+    rota; cabeçalhos já definidos em `response` (ETag, X-Next-Cursor) são
+    copiados.
+    """
+    model = sparse_schema(schema, fields)
+    if isinstance(data, list):
+        content: Any = [model.model_validate(item).model_dump(mode="json") for item in data]
+    else:
+        content = model.model_validate(data).model_dump(mode="json")
+    
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return JSONResponse(content=content, headers=headers)
@@ -0,0 +1,79 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import HTTPException, Response, status
+from sqlalchemy import literal, tuple_
+from sqlalchemy.orm import Query
+
+# Cabeçalho com o cursor da próxima página
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _encode_value(value: Any) -> list:
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, uuid.UUID):
+        return ["uuid", str(value)]
+    return ["raw", value]
+
+def _decode_value(value: list) -> Any:
+    kind, raw = value
+    if kind == "dt":
+        return datetime.fromisoformat(raw)
+    if kind == "uuid":
+        return uuid.UUID(raw)
+    return raw
+
+def encode_cursor(columns: list, row: Any) -> str:
+    """Gera o token opaco com a chave de ordenação da última linha"""
+    payload = {
+        "k": [column.key for column in columns],
+        "v": [_encode_value(getattr(row, column.key)) for column in columns]
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+def decode_cursor(columns: list, cursor: str) -> List[Any]:
+    """Lê o token opaco (400 se inválido ou de outra ordenação)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["k"] != [column.key for column in columns]:
+            raise ValueError("ordenação diferente")
+        return [_decode_value(value) for value in payload["v"]]
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginação inválido"
+        )
+
+def paginate(
+    query: Query,
+    columns: list,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> list:
+    """Pagina por chave (keyset) quando há cursor; sem cursor mantém skip/limit.
+    
+    A consulta é ordenada por `columns` (ex.: start_date, id) e o cursor da
+    próxima página vai no cabeçalho X-Next-Cursor. Com cursor, a página é
+    buscada por comparação de tupla usando o índice composto, com custo
+    constante independente da profundidade.
+    """
+    query = query.order_by(*columns)
+    if cursor:
+        values = decode_cursor(columns, cursor)
+        # Valores tipados pela coluna (UUID/datetime são gravados de forma diferente por dialeto)
+        bound = [literal(value, column.type) for column, value in zip(columns, values)]
+        query = query.filter(tuple_(*columns) > tuple_(*bound))
+    elif skip:
+        query = query.offset(skip)
+    
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(columns, rows[-1])
+    
+    return rows
@@ -0,0 +1,151 @@
+import json
+import numpy as np
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Set, Tuple, Union
+
+# Ordem igual a datetime.weekday(): segunda = 0 ... domingo = 6
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+def parse_recurrence_days(value: Union[str, Iterable, None]) -> Optional[Set[int]]:
+    """Converte dias da semana (JSON ou lista) para índices de weekday()"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    days = set()
+    for day in value:
+        day = getattr(day, 'value', day)
+        days.add(WEEKDAYS.index(str(day).strip().lower()))
+    return days or None
+
+def align_timezone(value: Optional[datetime], reference: datetime) -> Optional[datetime]:
+    """Ajusta `value` para comparar com `reference` (datas sem fuso são tratadas como UTC)"""
+    if value is None:
+        return None
+    if reference.tzinfo is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    if reference.tzinfo is None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _recurrence_value(recurrence_type) -> str:
+    return getattr(recurrence_type, 'value', recurrence_type) or "none"
+
+def occurrence_offsets(
+    start_date: datetime,
+    recurrence_type,
+    recurrence_days: Union[str, Iterable, None],
+    first_day: date,
+    last_day: date
+) -> np.ndarray:
+    """Dias (a partir do início da série) das ocorrências entre first_day e last_day.
+    
+    Gera todas as datas de uma vez com numpy.datetime64, sem laço por dia.
+    """
+    kind = _recurrence_value(recurrence_type)
+    start_day = np.datetime64(start_date.date(), 'D')
+    first = max(np.datetime64(first_day, 'D'), start_day)
+    last = np.datetime64(last_day, 'D')
+    if first > last:
+        return np.empty(0, dtype=np.int64)
+    
+    days = parse_recurrence_days(recurrence_days)
+    weekday_mask = np.zeros(7, dtype=bool)
+    if days:
+        weekday_mask[list(days)] = True
+    
+    if kind == "monthly":
+        # Mesmo dia do mês, limitado ao último dia de meses mais curtos
+        start_month = start_day.astype('datetime64[M]')
+        months = np.arange(
+            max(first.astype('datetime64[M]') - start_month - 1, 0),
+            last.astype('datetime64[M]') - start_month + 1
+        )
+        month_starts = (start_month + months).astype('datetime64[D]')
+        month_lengths = ((start_month + months + 1).astype('datetime64[D]') - month_starts).astype(np.int64)
+        dates = month_starts + np.minimum(start_date.day, month_lengths) - 1
+        mask = (dates >= first) & (dates <= last)
+        if days:
+            mask &= weekday_mask[_weekdays(dates)]
+        return (dates[mask] - start_day).astype(np.int64)
+    
+    dates = np.arange(first, last + 1, dtype='datetime64[D]')
+    offsets = (dates - start_day).astype(np.int64)
+    weekdays = _weekdays(dates)
+    
+    if kind == "daily":
+        mask = weekday_mask[weekdays] if days else np.ones(len(dates), dtype=bool)
+    elif kind == "weekly":
+        mask = weekday_mask[weekdays] if days else offsets % 7 == 0
+    elif kind == "biweekly":
+        # Semanas contadas a partir da segunda-feira da semana de início
+        week_index = (offsets + start_date.weekday()) // 7
+        mask = (weekday_mask[weekdays] & (week_index % 2 == 0)) if days else offsets % 14 == 0
+    else:
+        raise ValueError(f"Tipo de recorrência inválido: {kind}")
+    
+    return offsets[mask]
+
+def _weekdays(dates: np.ndarray) -> np.ndarray:
+    # 01/01/1970 foi uma quinta-feira (weekday 3)
+    return (dates.astype(np.int64) + 3) % 7
+
+def expand_occurrences(
+    start_date: datetime,
+    end_date: datetime,
+    recurrence_type,
+    recurrence_end_date: Optional[datetime],
+    recurrence_days: Union[str, Iterable, None],
+    window_start: datetime,
+    window_end: datetime
+) -> List[Tuple[datetime, datetime]]:
+    """Expande a regra de recorrência nas ocorrências que intersectam a janela.
+    
+    DAILY repete todo dia; WEEKLY e BIWEEKLY repetem nos dias da semana
+    informados (ou no dia da semana do início) a cada uma ou duas semanas;
+    MONTHLY repete no mesmo dia do mês, limitado ao último dia de meses
+    mais curtos. A série termina no dia de `recurrence_end_date` (inclusive).
+    """
+    window_start = align_timezone(window_start, start_date)
+    window_end = align_timezone(window_end, start_date)
+    recurrence_end_date = align_timezone(recurrence_end_date, start_date)
+    duration = end_date - start_date
+    
+    if _recurrence_value(recurrence_type) == "none":
+        if start_date < window_end and end_date > window_start:
+            return [(start_date, end_date)]
+        return []
+    
+    last_day = window_end.date()
+    if recurrence_end_date and recurrence_end_date.date() < last_day:
+        last_day = recurrence_end_date.date()
+    
+    offsets = occurrence_offsets(
+        start_date, recurrence_type, recurrence_days, (window_start - duration).date(), last_day
+    )
+    
+    occurrences = []
+    for offset in offsets.tolist():
+        occurrence = start_date + timedelta(days=offset)
+        if occurrence < window_end and occurrence + duration > window_start:
+            occurrences.append((occurrence, occurrence + duration))
+    
+    return occurrences
+
+def is_occurrence(
+    start_date: datetime,
+    end_date: datetime,
+    recurrence_type,
+    recurrence_end_date: Optional[datetime],
+    recurrence_days: Union[str, Iterable, None],
+    occurrence_date: date
+) -> Optional[Tuple[datetime, datetime]]:
+    """Retorna a ocorrência da série no dia informado (ou None)"""
+    day_start = datetime.combine(occurrence_date, datetime.min.time(), tzinfo=start_date.tzinfo)
+    for occurrence in expand_occurrences(
+        start_date, end_date, recurrence_type, recurrence_end_date, recurrence_days,
+        day_start, day_start + timedelta(days=1)
+    ):
+        if occurrence[0].date() == occurrence_date:
+            return occurrence
+    return None
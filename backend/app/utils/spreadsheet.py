@@ -0,0 +1,51 @@
+import os
+from itertools import islice
+from typing import Any, Iterator
+import pandas as pd
+from openpyxl import load_workbook
+
+# Extensões aceitas pelas importações (demais arquivos são lidos como CSV)
+EXCEL_EXTENSIONS = {".xlsx", ".xlsm"}
+UNSUPPORTED_EXTENSIONS = {".xls"}
+
+def is_excel(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in EXCEL_EXTENSIONS
+
+def read_chunks(path: str, chunk_size: int, dtype: Any = None) -> Iterator[pd.DataFrame]:
+    """Lê CSV ou planilha Excel em blocos de chunk_size linhas"""
+    if is_excel(path):
+        return read_excel_chunks(path, chunk_size, dtype)
+    return iter(pd.read_csv(path, chunksize=chunk_size, dtype=dtype))
+
+def read_excel_chunks(path: str, chunk_size: int, dtype: Any = None) -> Iterator[pd.DataFrame]:
+    """Lê a primeira aba em modo read_only, linha a linha.
+    
+    Só o bloco atual fica em memória; a primeira linha é o cabeçalho e
+    linhas totalmente vazias são ignoradas, como no read_csv.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else f"Unnamed: {idx}" for idx, name in enumerate(header)]
+        
+        rows = (row for row in rows if any(value is not None and value != "" for value in row))
+        while True:
+            block = list(islice(rows, chunk_size))
+            if not block:
+                break
+            width = len(columns)
+            # object: cada célula mantém o tipo do Excel (int, float, datetime)
+            frame = pd.DataFrame(
+                [tuple(row[:width]) + (None,) * (width - len(row)) for row in block],
+                columns=columns,
+                dtype=object
+            )
+            if dtype is str:
+                # Mesmo formato do read_csv(dtype=str): células como texto
+                frame = frame.map(lambda value: None if value is None else str(value))
+            yield frame
+    finally:
+        workbook.close()
@@ -0,0 +1,190 @@
+"""Esquema inicial
+
+Cópia congelada das tabelas como eram antes das migrações; alterações
+posteriores nos modelos entram em revisões próprias. Bancos criados antes
+das migrações (Base.metadata.create_all no startup) já têm as tabelas:
+a criação com checkfirst não altera nada e a revisão só é registrada.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+metadata = sa.MetaData()
+
+def _audit_columns():
+    """Colunas de auditoria e soft delete comuns a categorias, produtos e agendamentos"""
+    return [
+        sa.Column('id', UUID(as_uuid=True), primary_key=True, index=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('created_by_id', UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_by_id', UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_deleted', sa.Boolean),
+    ]
+
+sa.Table(
+    'tenants', metadata,
+    sa.Column('id', sa.Integer, primary_key=True, index=True),
+    sa.Column('name', sa.String(100), nullable=False),
+    sa.Column('subdomain', sa.String(50), unique=True, index=True, nullable=False),
+    sa.Column('is_active', sa.Boolean),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    sa.Column('updated_at', sa.DateTime(timezone=True)),
+)
+
+sa.Table(
+    'roles', metadata,
+    sa.Column('id', sa.Integer, primary_key=True, index=True),
+    sa.Column('name', sa.String(50), unique=True, nullable=False),
+    sa.Column('description', sa.String(200)),
+    sa.Column('is_system_role', sa.Boolean),
+)
+
+sa.Table(
+    'users', metadata,
+    sa.Column('id', UUID(as_uuid=True), primary_key=True, index=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('created_by_id', UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_by_id', UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_deleted', sa.Boolean),
+    sa.Column('tenant_id', sa.Integer, sa.ForeignKey('tenants.id'), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'ACTIVE', 'INACTIVE', name='userstatus'), nullable=False),
+    sa.Column('user_type', sa.Enum('PROVIDER', 'END_USER', name='usertype'), nullable=False),
+    sa.Column('name', sa.String(100), nullable=False),
+    sa.Column('nickname', sa.String(50), nullable=True),
+    sa.Column('email', sa.String(100), unique=True, index=True, nullable=False),
+    sa.Column('cpf', sa.String(11), unique=True, index=True, nullable=False),
+    sa.Column('birth_date', sa.DateTime, nullable=False),
+    sa.Column('hashed_password', sa.String(200), nullable=False),
+    sa.Column('notes', sa.Text, nullable=True),
+    sa.Column('address', sa.String(200), nullable=True),
+    sa.Column('address_number', sa.String(10), nullable=True),
+    sa.Column('complement', sa.String(100), nullable=True),
+    sa.Column('zip_code', sa.String(8), nullable=True),
+    sa.Column('neighborhood', sa.String(100), nullable=True),
+    sa.Column('city', sa.String(100), nullable=True),
+    sa.Column('state', sa.String(2), nullable=True),
+    sa.Column('country', sa.String(50), nullable=True),
+    sa.Column('photo_url', sa.String(500), nullable=True),
+)
+
+sa.Table(
+    'user_roles', metadata,
+    sa.Column('user_id', UUID(as_uuid=True), sa.ForeignKey('users.id')),
+    sa.Column('role_id', sa.Integer, sa.ForeignKey('roles.id')),
+)
+
+sa.Table(
+    'user_tenants', metadata,
+    sa.Column('user_id', UUID(as_uuid=True), sa.ForeignKey('users.id')),
+    sa.Column('tenant_id', sa.Integer, sa.ForeignKey('tenants.id')),
+)
+
+sa.Table(
+    'appointments', metadata,
+    sa.Column('id', UUID(as_uuid=True), primary_key=True, index=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('title', sa.String(200), nullable=False),
+    sa.Column('description', sa.Text),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('end_time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('status', sa.String(20)),
+    sa.Column('tenant_id', sa.Integer, sa.ForeignKey('tenants.id'), nullable=False),
+    sa.Column('user_id', UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=False),
+)
+
+sa.Table(
+    'payments', metadata,
+    sa.Column('id', UUID(as_uuid=True), primary_key=True, index=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('amount', sa.Integer, nullable=False),
+    sa.Column('status', sa.String(20), nullable=False),
+    sa.Column('payment_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('user_id', UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=False),
+    sa.Column('appointment_id', UUID(as_uuid=True), sa.ForeignKey('appointments.id'), nullable=True),
+)
+
+sa.Table(
+    'categories', metadata,
+    *_audit_columns(),
+    sa.Column('status', sa.Enum('ACTIVE', 'INACTIVE', name='categorystatus'), nullable=False),
+    sa.Column('name', sa.String(100), nullable=False, index=True),
+    sa.Column('description', sa.Text, nullable=True),
+)
+
+sa.Table(
+    'tenant_categories', metadata,
+    sa.Column('tenant_id', sa.Integer, sa.ForeignKey('tenants.id'), primary_key=True),
+    sa.Column('category_id', UUID(as_uuid=True), sa.ForeignKey('categories.id'), primary_key=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    sa.Column('created_by_id', UUID(as_uuid=True), sa.ForeignKey('users.id')),
+)
+
+sa.Table(
+    'products', metadata,
+    *_audit_columns(),
+    sa.Column('status', sa.Enum('ACTIVE', 'INACTIVE', name='productstatus'), nullable=False),
+    sa.Column('name', sa.String(200), nullable=False, index=True),
+    sa.Column('description', sa.Text, nullable=True),
+    sa.Column('photo_url', sa.String(500), nullable=True),
+    sa.Column('price', sa.Integer, nullable=True),
+    sa.Column('professional_commission', sa.Integer, nullable=False),
+    sa.Column('product_visible_to_end_user', sa.Boolean, nullable=False),
+    sa.Column('price_visible_to_end_user', sa.Boolean, nullable=False),
+    sa.Column('category_id', UUID(as_uuid=True), sa.ForeignKey('categories.id'), nullable=False),
+    sa.Column('professional_id', UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=False),
+    sa.Column('tenant_id', sa.Integer, sa.ForeignKey('tenants.id'), nullable=False),
+)
+
+schedule_status = sa.Enum('ACTIVE', 'INACTIVE', 'CANCELLED', 'COMPLETED', name='schedulestatus')
+
+sa.Table(
+    'schedules', metadata,
+    *_audit_columns(),
+    sa.Column('status', schedule_status, nullable=False),
+    sa.Column('start_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('end_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('service_price', sa.Integer, nullable=True),
+    sa.Column(
+        'recurrence_type',
+        sa.Enum('NONE', 'DAILY', 'WEEKLY', 'BIWEEKLY', 'MONTHLY', name='recurrencetype'),
+        nullable=False
+    ),
+    sa.Column('recurrence_end_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('recurrence_days', sa.Text, nullable=True),
+    sa.Column('provider_id', UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=False),
+    sa.Column('user_id', UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=False),
+    sa.Column('category_id', UUID(as_uuid=True), sa.ForeignKey('categories.id'), nullable=False),
+    sa.Column('product_id', UUID(as_uuid=True), sa.ForeignKey('products.id'), nullable=False),
+    sa.Column('tenant_id', sa.Integer, sa.ForeignKey('tenants.id'), nullable=False),
+)
+
+sa.Table(
+    'recurring_schedule_instances', metadata,
+    sa.Column('id', UUID(as_uuid=True), primary_key=True, index=True),
+    sa.Column('parent_schedule_id', UUID(as_uuid=True), sa.ForeignKey('schedules.id'), nullable=False),
+    sa.Column('instance_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('status', schedule_status, nullable=False),
+    sa.Column('notes', sa.Text, nullable=True),
+)
+
+def upgrade():
+    metadata.create_all(bind=op.get_bind(), checkfirst=True)
+
+def downgrade():
+    # O esquema inicial não é removido por migração
+    pass
@@ -0,0 +1,81 @@
+"""Índices compostos e parciais dos acessos mais frequentes a agendamentos
+
+- disponibilidade: sobreposição por profissional usa o GiST da constraint
+  schedules_provider_no_overlap (revisão 0004); a agenda em ordem de
+  início usa provider_id + start_date
+- calendário/próximos: GiST tenant_id + período e btree tenant_id + start_date
+- agendamentos do cliente: user_id + start_date
+- séries recorrentes e suas exceções por dia
+- paginação por cursor das demais listagens (created_at, id)
+
+No PostgreSQL os índices são criados com CONCURRENTLY, sem bloquear
+escritas em tabelas grandes. IF NOT EXISTS torna a revisão segura para
+bancos que já receberam os índices por Base.metadata.create_all.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00
+"""
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# nome -> (tabela e colunas, filtro do índice parcial, só PostgreSQL)
+INDEXES = {
+    "ix_schedules_tenant_period": (
+        "schedules USING gist (tenant_id, tstzrange(start_date, end_date, '[)'))",
+        "is_deleted = false",
+        True
+    ),
+    "ix_schedules_tenant_start_id": ("schedules (tenant_id, start_date, id)", None, False),
+    "ix_schedules_provider_start": ("schedules (provider_id, start_date)", "is_deleted = false", False),
+    "ix_schedules_user_start": ("schedules (user_id, start_date)", "is_deleted = false", False),
+    "ix_schedules_recurring": (
+        "schedules (tenant_id, provider_id)",
+        "is_deleted = false AND recurrence_type <> 'NONE'",
+        False
+    ),
+    "ix_recurring_instances_parent_date": (
+        "recurring_schedule_instances (parent_schedule_id, instance_date)", None, False
+    ),
+    "ix_users_created_id": ("users (created_at, id)", None, False),
+    "ix_appointments_tenant_created_id": ("appointments (tenant_id, created_at, id)", None, False),
+    "ix_categories_created_id": ("categories (created_at, id)", None, False),
+    "ix_products_tenant_created_id": ("products (tenant_id, created_at, id)", None, False),
+}
+
+def index_statements(postgresql: bool, table_prefix: str = ""):
+    """CREATE INDEX de cada índice (table_prefix permite criar em cópias, ex.: benchmark)"""
+    concurrently = "CONCURRENTLY " if postgresql else ""
+    for name, (definition, where, postgresql_only) in INDEXES.items():
+        if postgresql_only and not postgresql:
+            continue
+        if where and not postgresql:
+            where = where.replace("false", "0")
+        statement = f"CREATE INDEX {concurrently}IF NOT EXISTS {table_prefix}{name} ON {table_prefix}{definition}"
+        if where:
+            statement += f" WHERE {where}"
+        yield statement
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
+
+def upgrade():
+    postgresql = _is_postgresql()
+    if postgresql:
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de transação
+    with op.get_context().autocommit_block():
+        for statement in index_statements(postgresql):
+            op.execute(statement)
+
+def downgrade():
+    concurrently = "CONCURRENTLY " if _is_postgresql() else ""
+    
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX {concurrently}IF EXISTS {name}")
@@ -0,0 +1,37 @@
+"""Índice da chave natural de agendamentos (detecção de duplicados na importação)
+
+A importação procura, com um IN de tuplas por bloco, agendamentos não
+excluídos com o mesmo profissional, usuário, início, fim e produto.
+O índice parcial atende essa busca pela igualdade das cinco colunas.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00
+"""
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_schedules_natural_key"
+INDEX_DEFINITION = "schedules (provider_id, start_date, end_date, user_id, product_id)"
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
+
+def upgrade():
+    postgresql = _is_postgresql()
+    concurrently = "CONCURRENTLY " if postgresql else ""
+    where = "is_deleted = false" if postgresql else "is_deleted = 0"
+    
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de transação
+    with op.get_context().autocommit_block():
+        op.execute(f"CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON {INDEX_DEFINITION} WHERE {where}")
+
+def downgrade():
+    concurrently = "CONCURRENTLY " if _is_postgresql() else ""
+    
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}")
@@ -0,0 +1,79 @@
+"""Constraint de exclusão contra agendamentos sobrepostos do mesmo profissional
+
+schedules_provider_no_overlap impede, no próprio banco, dois agendamentos
+simples ativos do mesmo profissional com períodos que se cruzam, mesmo
+quando duas requisições concorrentes passam juntas pela verificação de
+disponibilidade. Séries recorrentes ficam de fora: o período da linha da
+série não é uma ocorrência, e as ocorrências são verificadas pela
+expansão. Só existe no PostgreSQL (GiST com btree_gist).
+
+A criação falha se já houver agendamentos sobrepostos; os primeiros pares
+encontrados são listados na mensagem para serem resolvidos antes.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+CONSTRAINT_NAME = "schedules_provider_no_overlap"
+
+# Linhas cobertas pela constraint (mesmo predicado de models.Schedule)
+PREDICATE = "is_deleted = false AND status = 'ACTIVE' AND recurrence_type = 'NONE'"
+
+# Pares de agendamentos simples ativos sobrepostos que impediriam a criação da constraint
+OVERLAPS_SQL = """
+SELECT a.id, b.id, a.provider_id, a.start_date, a.end_date
+FROM schedules a
+JOIN schedules b
+  ON a.provider_id = b.provider_id
+ AND a.id < b.id
+ AND tstzrange(a.start_date, a.end_date, '[)') && tstzrange(b.start_date, b.end_date, '[)')
+WHERE a.is_deleted = false AND a.status = 'ACTIVE' AND a.recurrence_type = 'NONE'
+  AND b.is_deleted = false AND b.status = 'ACTIVE' AND b.recurrence_type = 'NONE'
+LIMIT 50
+"""
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
+
+def upgrade():
+    if not _is_postgresql():
+        return
+    
+    bind = op.get_bind()
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    
+    # Bancos criados por Base.metadata.create_all podem ter a constraint com o
+    # predicado antigo (incluía séries recorrentes): é recriada com o atual
+    op.execute(f"ALTER TABLE schedules DROP CONSTRAINT IF EXISTS {CONSTRAINT_NAME}")
+    
+    overlaps = bind.execute(sa.text(OVERLAPS_SQL)).all()
+    if overlaps:
+        pairs = "\n".join(
+            f"  profissional {provider_id}: {first_id} x {second_id} ({start_date} - {end_date})"
+            for first_id, second_id, provider_id, start_date, end_date in overlaps
+        )
+        raise RuntimeError(
+            f"Existem agendamentos sobrepostos; resolva-os antes de criar {CONSTRAINT_NAME}:\n{pairs}"
+        )
+    
+    op.execute(f"""
+        ALTER TABLE schedules
+        ADD CONSTRAINT {CONSTRAINT_NAME}
+        EXCLUDE USING gist (provider_id WITH =, tstzrange(start_date, end_date, '[)') WITH &&)
+        WHERE ({PREDICATE})
+    """)
+
+def downgrade():
+    if not _is_postgresql():
+        return
+    
+    # btree_gist continua instalada: ix_schedules_tenant_period (0002) também a usa
+    op.execute(f"ALTER TABLE schedules DROP CONSTRAINT IF EXISTS {CONSTRAINT_NAME}")
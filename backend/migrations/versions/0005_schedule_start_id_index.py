@@ -0,0 +1,38 @@
+"""Índice parcial (start_date, id) da paginação por cursor sem tenant único
+
+Super admin sem filtro de tenant e usuários com vários tenants (tenant_id IN)
+ordenam por (start_date, id) sem igualdade em tenant_id, então o índice
+(tenant_id, start_date, id) não entrega a ordem. O índice parcial sobre os
+não excluídos permite ler as páginas em ordem, sem ordenar a tabela.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_schedules_start_id"
+INDEX_DEFINITION = "schedules (start_date, id)"
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == 'postgresql'
+
+def upgrade():
+    postgresql = _is_postgresql()
+    concurrently = "CONCURRENTLY " if postgresql else ""
+    where = "is_deleted = false" if postgresql else "is_deleted = 0"
+    
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de transação
+    with op.get_context().autocommit_block():
+        op.execute(f"CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON {INDEX_DEFINITION} WHERE {where}")
+
+def downgrade():
+    concurrently = "CONCURRENTLY " if _is_postgresql() else ""
+    
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}")
@@ -0,0 +1,96 @@
+import pytest
+from datetime import datetime, timedelta
+import uuid
+import numpy as np
+from sqlalchemy.dialects import postgresql
+
+from app.services.availability_service import (
+    ProviderIntervals, to_epoch, merge_intervals, free_gaps, slice_slots,
+    overlapping_mask, period_overlaps, period_within
+)
+
+def _intervals(*ranges):
+    """Monta índice de um profissional a partir de pares (início, fim) em horas"""
+    base = to_epoch(datetime(2030, 1, 7, 8, 0))
+    intervals = ProviderIntervals(base, base + 24 * 3600)
+    ids = []
+    for start_hour, end_hour in ranges:
+        schedule_id = uuid.uuid4()
+        intervals.add(base + start_hour * 3600, base + end_hour * 3600, schedule_id)
+        ids.append(schedule_id)
+    return intervals, base, ids
+
+def test_interval_index_detects_overlap():
+    """Testa detecção de sobreposição no índice em memória"""
+    intervals, base, _ = _intervals((1, 2), (4, 6))
+
+    assert intervals.has_conflict(base + 1.5 * 3600, base + 3 * 3600)
+    assert intervals.has_conflict(base + 5 * 3600, base + 5.5 * 3600)
+    assert not intervals.has_conflict(base + 2 * 3600, base + 4 * 3600)
+    assert not intervals.has_conflict(base, base + 3600)
+
+def test_interval_index_long_interval_before_window():
+    """Testa intervalo longo que começa bem antes do período consultado"""
+    intervals, base, _ = _intervals((0, 10), (2, 3))
+
+    assert intervals.has_conflict(base + 9 * 3600, base + 11 * 3600)
+
+def test_interval_index_remove_and_exclude():
+    """Testa remoção e exclusão do próprio agendamento"""
+    intervals, base, ids = _intervals((1, 2))
+
+    assert not intervals.has_conflict(base + 3600, base + 2 * 3600, exclude_schedule_id=ids[0])
+    assert intervals.remove(base + 3600, ids[0])
+    assert not intervals.has_conflict(base + 3600, base + 2 * 3600)
+
+def test_interval_index_window_coverage():
+    """Testa que períodos fora da janela não são respondidos pelo índice"""
+    intervals, base, _ = _intervals()
+
+    assert intervals.covers(base, base + 3600)
+    assert not intervals.covers(base - 3600, base)
+
+def test_merge_intervals_sweep_line():
+    """Testa união de intervalos sobrepostos e adjacentes"""
+    merged = merge_intervals([(5, 7), (1, 3), (2, 4), (4, 5), (9, 10)])
+
+    assert merged == [(1, 7), (9, 10)]
+
+def test_free_gaps_and_slots():
+    """Testa cálculo de intervalos livres e divisão em horários"""
+    gaps = free_gaps([(60, 120), (180, 240)], 0, 300)
+    assert gaps == [(0, 60), (120, 180), (240, 300)]
+
+    slots = slice_slots(gaps, duration=40, step=30, anchor=0)
+    assert slots == [(0, 40), (120, 160), (240, 280)]
+
+def test_slice_slots_respects_limit():
+    """Testa limite de horários retornados"""
+    slots = slice_slots([(0, 600)], duration=60, step=60, anchor=0, limit=3)
+
+    assert len(slots) == 3
+
+def test_overlapping_mask_sorted_search():
+    """Testa detecção vetorizada de conflitos de uma série"""
+    busy = [(100, 200), (150, 260), (400, 500)]
+    starts = np.array([0, 90, 200, 260, 300, 450, 600], dtype=float)
+    ends = starts + 50
+    
+    mask = overlapping_mask(busy, starts, ends)
+    
+    assert mask.tolist() == [False, True, True, False, False, True, False]
+    assert not overlapping_mask([], starts, ends).any()
+
+def test_period_filters_use_range_operators():
+    """Testa que os filtros de período usam tstzrange, como os índices GiST"""
+    start, end = datetime(2030, 1, 7, 8, 0), datetime(2030, 1, 7, 9, 0)
+    
+    overlaps = period_overlaps(start, end).compile(dialect=postgresql.dialect())
+    within = period_within(start, end).compile(dialect=postgresql.dialect())
+    
+    period = "tstzrange(schedules.start_date, schedules.end_date, %(tstzrange_1)s)"
+    window = "tstzrange(%(tstzrange_2)s, %(tstzrange_3)s, %(tstzrange_4)s)"
+    assert str(overlaps) == f"{period} && {window}"
+    assert str(within) == f"{period} <@ {window}"
+    assert overlaps.params == {"tstzrange_1": "[)", "tstzrange_2": start, "tstzrange_3": end, "tstzrange_4": "[)"}
+    assert within.params["tstzrange_4"] == "[]"
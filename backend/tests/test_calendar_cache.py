@@ -0,0 +1,46 @@
+import pytest
+from datetime import datetime
+
+from app.services.calendar_cache import CalendarCache, months_between
+
+def test_months_between_crosses_year():
+    """Testa meses tocados por um período na virada do ano"""
+    months = list(months_between(datetime(2024, 11, 20), datetime(2025, 2, 1)))
+    
+    assert months == [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+
+def test_cache_invalidated_only_for_written_month():
+    """Testa que a escrita invalida apenas o mês afetado do tenant"""
+    cache = CalendarCache(max_entries=10, ttl_seconds=60)
+    for month in (1, 2):
+        key = (1, 2030, month, None)
+        cache.set(key, cache.version(1, 2030, month), [month])
+    cache.set((2, 2030, 1, None), cache.version(2, 2030, 1), ["outro"])
+    
+    cache.bump(1, datetime(2030, 1, 10, 9), datetime(2030, 1, 10, 10))
+    
+    assert cache.get((1, 2030, 1, None), cache.version(1, 2030, 1)) is None
+    assert cache.get((1, 2030, 2, None), cache.version(1, 2030, 2)) == [2]
+    assert cache.get((2, 2030, 1, None), cache.version(2, 2030, 1)) == ["outro"]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+def test_cache_tenant_wide_bump_and_eviction():
+    """Testa invalidação do tenant inteiro e limite de entradas"""
+    cache = CalendarCache(max_entries=2, ttl_seconds=60)
+    for month in (1, 2, 3):
+        cache.set((1, 2030, month, None), cache.version(1, 2030, month), [month])
+    
+    assert cache.stats()["entries"] == 2
+    assert cache.get((1, 2030, 1, None), cache.version(1, 2030, 1)) is None
+    
+    cache.bump(1)
+    
+    assert cache.get((1, 2030, 3, None), cache.version(1, 2030, 3)) is None
+
+def test_cache_entries_expire_after_ttl():
+    """Testa que entradas expiram mesmo sem escrita neste processo"""
+    cache = CalendarCache(max_entries=10, ttl_seconds=0)
+    cache.set((1, 2030, 1, None), cache.version(1, 2030, 1), [1])
+    
+    assert cache.get((1, 2030, 1, None), cache.version(1, 2030, 1)) is None
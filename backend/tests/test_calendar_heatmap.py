@@ -0,0 +1,27 @@
+import uuid
+from datetime import datetime
+from sqlalchemy.dialects import postgresql
+
+from app.services.schedule_service import heatmap_query
+
+def compile_sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect()))
+
+def test_heatmap_query_aggregates_single_schedules_per_day():
+    """Testa que o mapa de calor agrega por dia no banco e deixa as séries para a expansão"""
+    query = heatmap_query(1, datetime(2030, 1, 1), datetime(2030, 2, 1))
+    columns = [compile_sql(column) for column in query.selected_columns]
+    
+    assert columns[0] == "date_trunc(%(date_trunc_1)s, schedules.start_date)"
+    assert columns[3] == "count(schedules.id)"
+    assert columns[4].startswith("sum(EXTRACT(epoch FROM schedules.end_date - schedules.start_date)) /")
+    assert "schedules.recurrence_type = %(recurrence_type_1)s" in compile_sql(query.whereclause)
+
+def test_heatmap_query_filters_provider():
+    """Testa o filtro opcional por profissional"""
+    window = (datetime(2030, 1, 1), datetime(2030, 2, 1))
+    
+    assert "provider_id" not in compile_sql(heatmap_query(1, *window).whereclause)
+    assert "schedules.provider_id = %(provider_id_1)s" in compile_sql(
+        heatmap_query(1, *window, provider_id=uuid.uuid4()).whereclause
+    )
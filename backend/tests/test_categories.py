@@ -1,6 +1,9 @@
 import pytest
 from fastapi import status
 import uuid
+import pandas as pd
+
+from app.services.category_service import CategoryService
 
 def test_create_category(client, super_admin_headers, test_tenant):
     """Testa criação de categoria"""
@@ -96,3 +99,31 @@ def test_remove_category_from_tenant(client, super_admin_headers, test_category,
     )
     
     assert response.status_code == status.HTTP_200_OK
+
+def test_list_categories_etag(client, auth_headers, test_category):
+    """Testa resposta 304 quando a lista não mudou"""
+    response = client.get("/api/v1/categories", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    etag = response.headers["etag"]
+    
+    response = client.get("/api/v1/categories",
+                         headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    
+    # Outro filtro/paginação gera outro ETag
+    response = client.get("/api/v1/categories?limit=1",
+                         headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+
+def test_import_frame_leaves_commit_to_the_caller(db_session, test_super_admin, monkeypatch):
+    """Testa que a importação em blocos não confirma linha a linha (o job confirma o bloco)"""
+    monkeypatch.setattr(db_session, "commit", lambda: pytest.fail("import_frame não deve confirmar"))
+    
+    result = CategoryService(db_session, test_super_admin).import_frame(
+        pd.DataFrame({"nome": ["Exames", "Exames", None]})
+    )
+    
+    assert result["new_records"] == 1
+    assert [duplicate["row"] for duplicate in result["duplicates_found"]] == [3]
+    assert [error["row"] for error in result["errors"]] == [4]
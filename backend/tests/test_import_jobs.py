@@ -0,0 +1,45 @@
+import uuid
+import pandas as pd
+from fastapi import HTTPException
+
+from app.services.import_jobs import ImportJob, ImportJobManager
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+    
+    def commit(self):
+        self.commits += 1
+    
+    def rollback(self):
+        self.rollbacks += 1
+
+def test_failed_chunk_is_retried_row_by_row():
+    """Testa que um erro inesperado no bloco só descarta a linha com problema"""
+    manager = ImportJobManager(max_workers=1, chunk_size=10, dry_run_chunk_size=10, max_finished=1)
+    job = ImportJob("products", 1, uuid.uuid4(), "produtos.csv", 0)
+    db = FakeSession()
+    
+    def handler(db, current_user, chunk, first_row):
+        if (chunk['nome'] == 'ruim').any():
+            raise ValueError("violação de constraint")
+        return {'new_records': len(chunk)}
+    
+    manager._process_chunk(job, db, handler, None, pd.DataFrame({'nome': ['a', 'ruim', 'c']}), 2)
+    
+    assert job.new_records == 2
+    assert job.errors == [{'row': 3, 'error': "Erro ao processar linha: violação de constraint"}]
+    assert db.commits == 2
+
+def test_chunk_validation_error_reports_the_whole_range():
+    """Testa que um erro de validação do bloco todo aponta o intervalo de linhas"""
+    manager = ImportJobManager(max_workers=1, chunk_size=10, dry_run_chunk_size=10, max_finished=1)
+    job = ImportJob("products", 1, uuid.uuid4(), "produtos.csv", 0)
+    
+    def handler(db, current_user, chunk, first_row):
+        raise HTTPException(status_code=400, detail="Coluna obrigatória ausente: nome")
+    
+    manager._process_chunk(job, FakeSession(), handler, None, pd.DataFrame({'preco': ['1', '2', '3']}), 12)
+    
+    assert job.errors == [{'row': 12, 'last_row': 14, 'error': "Coluna obrigatória ausente: nome"}]
@@ -0,0 +1,117 @@
+import time
+import uuid
+import pandas as pd
+
+from app.config import settings
+from app.services.import_validation import validate_in_shards, report_repeated_rows, text_column
+from app.services import product_service
+from app.services.schedule_import_service import validate_frame, validate_import_rows
+
+def test_dry_run_shards_report_rows_in_order(monkeypatch):
+    """Testa que os shards validados em outros processos mantêm o número da linha"""
+    monkeypatch.setattr(settings, "IMPORT_VALIDATION_SHARD_ROWS", 2)
+    monkeypatch.setattr(settings, "IMPORT_VALIDATION_PROCESSES", 2)
+    lookups = {
+        'providers': {'prof@teste.com': uuid.uuid4()},
+        'users': {'user@teste.com': uuid.uuid4()},
+        'categories': {'Consultas': uuid.uuid4()},
+        'products': {'Consulta': uuid.uuid4()},
+    }
+    valid = ['prof@teste.com', 'user@teste.com', 'Consultas', 'Consulta', '2099-01-10 09:00', None, '150.50']
+    df = pd.DataFrame(
+        [
+            valid,
+            ['outro@teste.com', *valid[1:]],
+            valid,
+            [*valid[:4], 'amanhã', None, None],
+            [*valid[:6], 'abc'],
+        ],
+        columns=['profissional_email', 'usuario_email', 'categoria', 'produto', 'data_inicio', 'data_fim', 'preco']
+    )
+    
+    result = validate_in_shards(validate_import_rows, df, lookups, first_row=10)
+    
+    assert result['total_records'] == 5
+    assert result['new_records'] == 0
+    assert result['errors'] == [
+        {'row': 11, 'error': "Profissional com email 'outro@teste.com' não encontrado"},
+        {'row': 13, 'error': "Data de início inválida: 'amanhã'"},
+        {'row': 14, 'error': "Preço inválido: 'abc'"},
+    ]
+
+def test_schedule_dates_with_utc_offset_are_validated_per_row():
+    """Testa datas com e sem offset no mesmo bloco (comparadas em UTC, erro por linha)"""
+    lookups = {
+        'providers': {'prof@teste.com': uuid.uuid4()},
+        'users': {'user@teste.com': uuid.uuid4()},
+        'categories': {'Consultas': uuid.uuid4()},
+        'products': {'Consulta': uuid.uuid4()},
+    }
+    refs = ['prof@teste.com', 'user@teste.com', 'Consultas', 'Consulta']
+    df = pd.DataFrame(
+        [
+            [*refs, '2099-01-10T09:00:00+02:00', '2099-01-10T09:30:00+02:00'],
+            [*refs, '2099-01-10 09:00', None],
+            [*refs, '2020-01-10T09:00:00Z', None],
+        ],
+        columns=['profissional_email', 'usuario_email', 'categoria', 'produto', 'data_inicio', 'data_fim']
+    )
+    
+    frame, errors = validate_frame(df, lookups)
+    
+    assert frame['start'].tolist() == [
+        pd.Timestamp('2099-01-10 07:00'), pd.Timestamp('2099-01-10 09:00'), pd.Timestamp('2020-01-10 09:00')
+    ]
+    assert errors.dropna().to_dict() == {2: "Não é possível agendar no passado"}
+
+def test_schedule_in_the_past_is_checked_in_utc(monkeypatch):
+    """Testa que o "agora" da validação também é UTC, independente do fuso do servidor"""
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    time.tzset()
+    lookups = {
+        'providers': {'prof@teste.com': uuid.uuid4()},
+        'users': {'user@teste.com': uuid.uuid4()},
+        'categories': {'Consultas': uuid.uuid4()},
+        'products': {'Consulta': uuid.uuid4()},
+    }
+    soon = (pd.Timestamp.now(tz="UTC") + pd.Timedelta(hours=1)).isoformat()
+    df = pd.DataFrame(
+        [['prof@teste.com', 'user@teste.com', 'Consultas', 'Consulta', soon, None]],
+        columns=['profissional_email', 'usuario_email', 'categoria', 'produto', 'data_inicio', 'data_fim']
+    )
+    
+    try:
+        frame, errors = validate_frame(df, lookups)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    
+    assert errors.dropna().empty
+
+def test_product_dry_run_reports_names_repeated_in_the_file():
+    """Testa que o dry_run marca como duplicada a linha que repete um produto criado antes no bloco"""
+    lookups = {
+        'tenant_id': 1,
+        'categories': {'Consultas': uuid.uuid4()},
+        'professionals': {'prof@teste.com': uuid.uuid4()},
+        'existing': {},
+    }
+    df = pd.DataFrame(
+        [
+            ['Consulta', 'Consultas', 'prof@teste.com', '40'],
+            ['Consulta', 'Inexistente', 'prof@teste.com', '40'],
+            [' Exame', 'Inexistente', 'prof@teste.com', '40'],
+            ['Exame', 'Consultas', 'prof@teste.com', '40'],
+            ['Exame ', 'Consultas', 'prof@teste.com', '40'],
+        ],
+        columns=['nome', 'categoria', 'profissional_email', 'comissao']
+    )
+    
+    result = report_repeated_rows(
+        product_service.validate_import_rows(df, lookups, 2),
+        df, pd.DataFrame({'name': text_column(df, 'nome', 'name')})
+    )
+    
+    # A importação real confere a duplicidade antes da categoria
+    assert [error['row'] for error in result['errors']] == [4]
+    assert [(duplicate['row'], duplicate['duplicate_of_row']) for duplicate in result['duplicates_found']] == [(3, 2), (6, 5)]
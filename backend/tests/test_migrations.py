@@ -0,0 +1,76 @@
+import importlib.util
+import os
+
+from app.database import Base
+from app import models  # noqa: F401
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations', 'versions')
+
+def load_revision(filename):
+    spec = importlib.util.spec_from_file_location(filename[:-3], os.path.join(VERSIONS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_revision_chain_is_linear():
+    """Testa que cada revisão aponta para a anterior"""
+    revisions = [load_revision(name) for name in sorted(os.listdir(VERSIONS_DIR)) if name.endswith('.py')]
+    
+    assert revisions[0].down_revision is None
+    for previous, current in zip(revisions, revisions[1:]):
+        assert current.down_revision == previous.revision
+
+def test_hot_path_indexes_match_models():
+    """Testa que os índices da migração também estão declarados nos modelos"""
+    migration = load_revision('0002_schedule_hot_path_indexes.py')
+    declared = {index.name for table in Base.metadata.tables.values() for index in table.indexes}
+    
+    assert set(migration.INDEXES) <= declared
+    statements = list(migration.index_statements(postgresql=False))
+    assert all("CONCURRENTLY" not in statement for statement in statements)
+    assert not any("gist" in statement for statement in statements)
+
+def test_natural_key_index_matches_models():
+    """Testa que o índice da chave natural da importação está declarado no modelo"""
+    migration = load_revision('0003_schedule_natural_key_index.py')
+    index = next(index for index in models.Schedule.__table__.indexes if index.name == migration.INDEX_NAME)
+    
+    assert [column.name for column in index.columns] == ['provider_id', 'start_date', 'end_date', 'user_id', 'product_id']
+
+def test_baseline_is_a_frozen_copy_of_the_tables():
+    """Testa que a revisão inicial não depende dos modelos e cobre as mesmas tabelas"""
+    baseline = load_revision('0001_baseline.py')
+    
+    assert not hasattr(baseline, 'Base')
+    assert set(baseline.metadata.tables) == set(Base.metadata.tables)
+    for name, table in baseline.metadata.tables.items():
+        assert set(table.columns.keys()) == set(Base.metadata.tables[name].columns.keys())
+
+def test_no_overlap_constraint_has_its_own_revision():
+    """Testa que a constraint de exclusão é criada e removida por migração"""
+    migration = load_revision('0004_schedule_no_overlap_constraint.py')
+    constraints = {constraint.name for constraint in models.Schedule.__table__.constraints}
+    
+    assert migration.CONSTRAINT_NAME in constraints
+    assert migration.down_revision == '0003'
+
+def test_no_overlap_constraint_skips_recurring_series():
+    """Testa que a constraint cobre só agendamentos simples, no modelo e na migração"""
+    migration = load_revision('0004_schedule_no_overlap_constraint.py')
+    constraint = next(
+        constraint for constraint in models.Schedule.__table__.constraints
+        if constraint.name == migration.CONSTRAINT_NAME
+    )
+    
+    assert str(constraint.where) == migration.PREDICATE
+    assert "recurrence_type = 'NONE'" in migration.PREDICATE
+    assert migration.OVERLAPS_SQL.count("recurrence_type = 'NONE'") == 2
+
+def test_cursor_index_without_tenant_matches_models():
+    """Testa que o índice (start_date, id) da paginação sem tenant está no modelo e é parcial"""
+    migration = load_revision('0005_schedule_start_id_index.py')
+    index = next(index for index in models.Schedule.__table__.indexes if index.name == migration.INDEX_NAME)
+    
+    assert [column.name for column in index.columns] == ['start_date', 'id']
+    assert str(index.dialect_options['postgresql']['where']) == "is_deleted = false"
+    assert migration.down_revision == '0004'
@@ -0,0 +1,29 @@
+import pytest
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from fastapi import HTTPException
+
+from app import models
+from app.utils.pagination import encode_cursor, decode_cursor
+
+def test_cursor_round_trip():
+    """Testa que o cursor preserva a chave de ordenação da última linha"""
+    columns = [models.Schedule.start_date, models.Schedule.id]
+    row = SimpleNamespace(id=uuid.uuid4(), start_date=datetime(2030, 1, 10, 9, 30))
+    
+    values = decode_cursor(columns, encode_cursor(columns, row))
+    
+    assert values == [row.start_date, row.id]
+
+def test_cursor_from_other_ordering_is_rejected():
+    """Testa que um cursor de outra ordenação retorna 400"""
+    row = SimpleNamespace(id=uuid.uuid4(), created_at=datetime(2030, 1, 10))
+    cursor = encode_cursor([models.Product.created_at, models.Product.id], row)
+    
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor([models.Schedule.start_date, models.Schedule.id], cursor)
+    assert exc.value.status_code == 400
+    
+    with pytest.raises(HTTPException):
+        decode_cursor([models.Product.created_at, models.Product.id], "invalido")
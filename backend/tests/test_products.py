@@ -1,6 +1,7 @@
 import pytest
 from fastapi import status
 import uuid
+from datetime import timedelta
 
 def test_create_product(client, admin_auth_headers, test_tenant, test_category, test_admin_user):
     """Testa criação de produto"""
@@ -56,6 +57,44 @@ def test_get_product_by_id(client, auth_headers, test_product):
     data = response.json()
     assert data["id"] == str(test_product.id)
 
+def test_product_sparse_fields(client, auth_headers, test_product):
+    """Testa que fields retorna apenas as colunas pedidas (e o id)"""
+    response = client.get("/api/v1/products", params={"fields": "name,price"}, headers=auth_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.json()[0]) == {"id", "name", "price"}
+    
+    response = client.get(f"/api/v1/products/{test_product.id}",
+                         params={"fields": "name"},
+                         headers=auth_headers)
+    assert response.json() == {"id": str(test_product.id), "name": test_product.name}
+    
+    response = client.get("/api/v1/products", params={"fields": "category"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_list_products_etag_tracks_category(client, auth_headers, db_session, test_product, test_category):
+    """Testa que editar a categoria embutida invalida o ETag da lista de produtos"""
+    response = client.get("/api/v1/products", headers=auth_headers)
+    etag = response.headers["etag"]
+    
+    test_category.name = "Consultas Pediátricas"
+    test_category.updated_at = test_category.updated_at + timedelta(minutes=1)
+    db_session.commit()
+    
+    response = client.get("/api/v1/products", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["category"]["name"] == "Consultas Pediátricas"
+    
+    # Com fields a categoria não é serializada e o ETag só acompanha os produtos
+    response = client.get("/api/v1/products", params={"fields": "name"}, headers=auth_headers)
+    etag = response.headers["etag"]
+    test_category.updated_at = test_category.updated_at + timedelta(minutes=1)
+    db_session.commit()
+    
+    response = client.get("/api/v1/products", params={"fields": "name"},
+                         headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
 def test_update_product(client, admin_auth_headers, test_product):
     """Testa atualização de produto"""
     response = client.put(f"/api/v1/products/{test_product.id}",
@@ -0,0 +1,69 @@
+import pytest
+from datetime import datetime, timedelta
+
+from app.utils.recurrence import expand_occurrences, is_occurrence, occurrence_offsets
+
+def _days(occurrences):
+    return [start.date().isoformat() for start, _ in occurrences]
+
+def test_monthly_series_on_31st():
+    """Testa série mensal iniciada no dia 31"""
+    start = datetime(2024, 1, 31, 9)
+    occurrences = expand_occurrences(
+        start, start + timedelta(hours=1), "monthly", datetime(2024, 5, 31),
+        None, datetime(2024, 1, 1), datetime(2024, 12, 31)
+    )
+    
+    assert _days(occurrences) == ["2024-01-31", "2024-02-29", "2024-03-31", "2024-04-30", "2024-05-31"]
+
+def test_weekly_series_with_days():
+    """Testa série semanal em vários dias da semana"""
+    start = datetime(2024, 1, 15, 9)  # segunda-feira
+    occurrences = expand_occurrences(
+        start, start + timedelta(hours=1), "weekly", datetime(2024, 1, 24),
+        '["monday", "wednesday", "friday"]', datetime(2024, 1, 1), datetime(2024, 2, 1)
+    )
+    
+    assert _days(occurrences) == ["2024-01-15", "2024-01-17", "2024-01-19", "2024-01-22", "2024-01-24"]
+
+def test_biweekly_series_skips_alternate_weeks():
+    """Testa série quinzenal"""
+    start = datetime(2024, 1, 15, 9)
+    occurrences = expand_occurrences(
+        start, start + timedelta(hours=1), "biweekly", None,
+        None, datetime(2024, 1, 1), datetime(2024, 2, 20)
+    )
+    
+    assert _days(occurrences) == ["2024-01-15", "2024-01-29", "2024-02-12"]
+
+def test_expansion_limited_to_window():
+    """Testa que apenas ocorrências do período são geradas"""
+    start = datetime(2024, 1, 1, 9)
+    occurrences = expand_occurrences(
+        start, start + timedelta(hours=1), "daily", None,
+        None, datetime(2025, 6, 10), datetime(2025, 6, 12)
+    )
+    
+    assert _days(occurrences) == ["2025-06-10", "2025-06-11"]
+
+def test_is_occurrence():
+    """Testa verificação de ocorrência em uma data"""
+    start = datetime(2024, 1, 15, 9)
+    args = (start, start + timedelta(hours=1), "weekly", datetime(2024, 3, 1), None)
+    
+    assert is_occurrence(*args, datetime(2024, 1, 22).date()) == (
+        datetime(2024, 1, 22, 9), datetime(2024, 1, 22, 10)
+    )
+    assert is_occurrence(*args, datetime(2024, 1, 23).date()) is None
+    assert is_occurrence(*args, datetime(2024, 3, 4).date()) is None
+
+def test_occurrence_offsets_multi_year_series():
+    """Testa geração vetorizada de uma série de vários anos"""
+    start = datetime(2024, 1, 1, 9)  # segunda-feira
+    offsets = occurrence_offsets(
+        start, "weekly", ["monday", "friday"], start.date(), datetime(2028, 12, 31).date()
+    )
+    
+    assert offsets[:4].tolist() == [0, 4, 7, 11]
+    assert len(offsets) == 522
+    assert (offsets[1:] > offsets[:-1]).all()
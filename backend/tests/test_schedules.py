@@ -1,6 +1,8 @@
 import pytest
 from fastapi import status
 from datetime import datetime, timedelta
+import json
+import time
 import uuid
 
 def test_create_schedule(client, admin_auth_headers, test_tenant, test_admin_user, 
@@ -83,6 +85,21 @@ def test_get_schedule_by_id(client, auth_headers, test_schedule):
     data = response.json()
     assert data["id"] == str(test_schedule.id)
 
+def test_get_schedule_expand(client, auth_headers, test_schedule, test_product):
+    """Testa que só os relacionamentos pedidos em expand são incluídos"""
+    response = client.get(f"/api/v1/schedules/{test_schedule.id}",
+                         params={"expand": "product"},
+                         headers=auth_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["product"]["name"] == test_product.name
+    assert data["provider"] is None
+    assert data["provider_id"] == str(test_schedule.provider_id)
+    
+    response = client.get("/api/v1/schedules", params={"expand": "invalido"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 def test_update_schedule(client, admin_auth_headers, test_schedule):
     """Testa atualização de agendamento"""
     new_start = (datetime.now() + timedelta(days=3)).isoformat()
@@ -130,6 +147,28 @@ def test_check_availability(client, test_admin_user):
     data = response.json()
     assert "available" in data
 
+def test_schedules_router_is_registered(client, admin_auth_headers, test_tenant, test_admin_user):
+    """Testa que as rotas de agendamentos respondem sob /api/v1"""
+    check_date = (datetime.now() + timedelta(days=4)).date().isoformat()
+    
+    response = client.post("/api/v1/schedules/check-availability/batch",
+        params={"tenant_id": test_tenant.id},
+        headers=admin_auth_headers,
+        json={
+            "items": [
+                {
+                    "provider_id": str(test_admin_user.id),
+                    "date": check_date,
+                    "start_time": "09:00",
+                    "end_time": "10:00"
+                }
+            ]
+        }
+    )
+    
+    assert response.status_code != status.HTTP_404_NOT_FOUND
+    assert response.json()["results"][0]["provider_id"] == str(test_admin_user.id)
+
 def test_get_calendar(client, auth_headers, test_tenant):
     """Testa visualização do calendário"""
     now = datetime.now()
@@ -150,3 +189,566 @@ def test_get_upcoming_schedules(client, auth_headers, test_tenant):
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert isinstance(data, list)
+
+def test_check_availability_batch(client, admin_auth_headers, test_tenant, test_admin_user):
+    """Testa verificação de disponibilidade em lote"""
+    check_date = (datetime.now() + timedelta(days=4)).date().isoformat()
+    
+    response = client.post("/api/v1/schedules/check-availability/batch",
+        params={"tenant_id": test_tenant.id},
+        headers=admin_auth_headers,
+        json={
+            "items": [
+                {
+                    "provider_id": str(test_admin_user.id),
+                    "date": check_date,
+                    "start_time": "09:00",
+                    "end_time": "10:00"
+                },
+                {
+                    "provider_id": str(test_admin_user.id),
+                    "date": check_date,
+                    "start_time": "14:00",
+                    "end_time": "15:00"
+                }
+            ]
+        }
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()["results"]
+    assert [r["start_time"] for r in results] == ["09:00", "14:00"]
+    assert all("available" in r for r in results)
+
+def test_get_free_slots(client, admin_auth_headers, test_tenant, test_admin_user):
+    """Testa busca de horários livres"""
+    day = (datetime.now() + timedelta(days=5)).replace(hour=8, minute=0, second=0, microsecond=0)
+    
+    response = client.get("/api/v1/schedules/free-slots", headers=admin_auth_headers, params={
+        "tenant_id": test_tenant.id,
+        "provider_id": str(test_admin_user.id),
+        "start_date": day.isoformat(),
+        "end_date": (day + timedelta(hours=2)).isoformat(),
+        "duration_minutes": 40,
+        "step_minutes": 30
+    })
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["duration_minutes"] == 40
+    assert len(data["slots"]) == 3
+
+def test_availability_search_requires_login_and_tenant(client, admin_auth_headers, test_tenant, test_admin_user):
+    """Testa que as buscas de disponibilidade não são públicas nem atravessam tenants"""
+    day = (datetime.now() + timedelta(days=5)).replace(hour=8, minute=0, second=0, microsecond=0)
+    params = {
+        "tenant_id": test_tenant.id,
+        "provider_id": str(test_admin_user.id),
+        "start_date": day.isoformat(),
+        "end_date": (day + timedelta(hours=2)).isoformat(),
+        "duration_minutes": 40
+    }
+    
+    response = client.get("/api/v1/schedules/free-slots", params=params)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    response = client.get("/api/v1/schedules/free-slots", headers=admin_auth_headers,
+                         params={**params, "provider_id": str(uuid.uuid4())})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    response = client.get("/api/v1/schedules/free-slots", headers=admin_auth_headers,
+                         params={**params, "end_date": (day + timedelta(days=60)).isoformat()})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    item = {"provider_id": str(test_admin_user.id), "date": day.date().isoformat(),
+            "start_time": "09:00", "end_time": "10:00"}
+    response = client.post("/api/v1/schedules/check-availability/batch",
+                          params={"tenant_id": test_tenant.id}, json={"items": [item]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_get_first_available_by_category(client, admin_auth_headers, test_tenant, test_category, test_product):
+    """Testa busca do primeiro profissional disponível por categoria"""
+    day = (datetime.now() + timedelta(days=5)).replace(hour=8, minute=0, second=0, microsecond=0)
+    
+    response = client.get("/api/v1/schedules/first-available", headers=admin_auth_headers, params={
+        "tenant_id": test_tenant.id,
+        "category_id": str(test_category.id),
+        "start_date": day.isoformat(),
+        "end_date": (day + timedelta(hours=4)).isoformat(),
+        "duration_minutes": 30,
+        "limit": 2
+    })
+    
+    assert response.status_code == status.HTTP_200_OK
+    options = response.json()["options"]
+    assert options[0]["provider_id"] == str(test_product.professional_id)
+    assert options == sorted(options, key=lambda o: o["start"])
+
+def test_get_first_available_requires_filter(client, admin_auth_headers, test_tenant):
+    """Testa que a busca exige produto ou categoria"""
+    day = datetime.now() + timedelta(days=5)
+    
+    response = client.get("/api/v1/schedules/first-available", headers=admin_auth_headers, params={
+        "tenant_id": test_tenant.id,
+        "start_date": day.isoformat(),
+        "end_date": (day + timedelta(hours=4)).isoformat(),
+        "duration_minutes": 30
+    })
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_get_first_available_requires_login(client, test_category):
+    """Testa que a busca não é pública"""
+    day = datetime.now() + timedelta(days=5)
+    params = {
+        "category_id": str(test_category.id),
+        "start_date": day.isoformat(),
+        "end_date": (day + timedelta(hours=4)).isoformat(),
+        "duration_minutes": 30
+    }
+    
+    response = client.get("/api/v1/schedules/first-available", params=params)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_recurring_schedule_occurrences(client, admin_auth_headers, test_tenant, test_admin_user,
+                                        test_regular_user, test_category, test_product):
+    """Testa expansão de série recorrente e exceção em uma ocorrência"""
+    start_date = (datetime.now() + timedelta(days=1)).replace(hour=7, minute=0, second=0, microsecond=0)
+    
+    response = client.post("/api/v1/schedules",
+        json={
+            "provider_id": str(test_admin_user.id),
+            "user_id": str(test_regular_user.id),
+            "category_id": str(test_category.id),
+            "product_id": str(test_product.id),
+            "tenant_id": test_tenant.id,
+            "start_date": start_date.isoformat(),
+            "end_date": (start_date + timedelta(hours=1)).isoformat(),
+            "recurrence_type": "daily",
+            "recurrence_end_date": (start_date + timedelta(days=30)).isoformat()
+        },
+        headers=admin_auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    schedule_id = response.json()["id"]
+    
+    params = {
+        "tenant_id": test_tenant.id,
+        "start_date": start_date.isoformat(),
+        "end_date": (start_date + timedelta(days=5)).isoformat()
+    }
+    response = client.get("/api/v1/schedules/occurrences", params=params, headers=admin_auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 5
+    
+    # Cancelar apenas a segunda ocorrência
+    second_day = (start_date + timedelta(days=1)).date().isoformat()
+    response = client.put(f"/api/v1/schedules/{schedule_id}/occurrences/{second_day}",
+        json={"status": "cancelled", "notes": "Feriado"},
+        headers=admin_auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "cancelled"
+    
+    response = client.post("/api/v1/schedules/check-availability", json={
+        "provider_id": str(test_admin_user.id),
+        "date": second_day,
+        "start_time": "07:00",
+        "end_time": "08:00"
+    })
+    assert response.json()["available"] is True
+
+def test_recurring_schedule_reports_all_conflicts(client, admin_auth_headers, test_tenant, test_admin_user,
+                                                  test_regular_user, test_category, test_product):
+    """Testa que a série recorrente informa todas as datas em conflito"""
+    start_date = (datetime.now() + timedelta(days=1)).replace(hour=6, minute=0, second=0, microsecond=0)
+    payload = {
+        "provider_id": str(test_admin_user.id),
+        "user_id": str(test_regular_user.id),
+        "category_id": str(test_category.id),
+        "product_id": str(test_product.id),
+        "tenant_id": test_tenant.id
+    }
+    
+    # Agendamentos avulsos na 3ª e na 7ª semana
+    for week in (3, 7):
+        day = start_date + timedelta(weeks=week)
+        response = client.post("/api/v1/schedules",
+            json={**payload, "start_date": day.isoformat(), "end_date": (day + timedelta(hours=1)).isoformat()},
+            headers=admin_auth_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+    
+    response = client.post("/api/v1/schedules",
+        json={
+            **payload,
+            "start_date": start_date.isoformat(),
+            "end_date": (start_date + timedelta(hours=1)).isoformat(),
+            "recurrence_type": "weekly",
+            "recurrence_end_date": (start_date + timedelta(weeks=10)).isoformat()
+        },
+        headers=admin_auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json()["detail"]["conflicts"] == [
+        (start_date + timedelta(weeks=week)).date().isoformat() for week in (3, 7)
+    ]
+
+def test_create_bulk_schedules_report(client, admin_auth_headers, test_tenant, test_admin_user,
+                                      test_regular_user, test_category, test_product):
+    """Testa criação em lote com relatório de datas ignoradas"""
+    first_day = (datetime.now() + timedelta(days=1)).date()
+    payload = {
+        "provider_id": str(test_admin_user.id),
+        "user_id": str(test_regular_user.id),
+        "category_id": str(test_category.id),
+        "product_id": str(test_product.id),
+        "tenant_id": test_tenant.id
+    }
+    
+    # Ocupar o horário do primeiro dia
+    busy_start = datetime.combine(first_day, datetime.min.time()).replace(hour=5)
+    response = client.post("/api/v1/schedules",
+        json={**payload, "start_date": busy_start.isoformat(), "end_date": (busy_start + timedelta(hours=1)).isoformat()},
+        headers=admin_auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    response = client.post("/api/v1/schedules/bulk",
+        json={
+            **payload,
+            "start_time": "05:00",
+            "end_time": "06:00",
+            "days": ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"],
+            "start_date": first_day.isoformat(),
+            "end_date": (first_day + timedelta(days=6)).isoformat()
+        },
+        headers=admin_auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert len(data["created"]) == 6
+    assert data["skipped"] == [{"date": first_day.isoformat(), "reason": "Horário não disponível"}]
+    assert data["errors"] == []
+
+def test_get_calendar_buckets_recurring_occurrences(client, admin_auth_headers, test_tenant, test_admin_user,
+                                                    test_regular_user, test_category, test_product):
+    """Testa calendário com série recorrente distribuída pelos dias"""
+    start_date = (datetime.now() + timedelta(days=32)).replace(day=1, hour=4, minute=0, second=0, microsecond=0)
+    
+    response = client.post("/api/v1/schedules",
+        json={
+            "provider_id": str(test_admin_user.id),
+            "user_id": str(test_regular_user.id),
+            "category_id": str(test_category.id),
+            "product_id": str(test_product.id),
+            "tenant_id": test_tenant.id,
+            "start_date": start_date.isoformat(),
+            "end_date": (start_date + timedelta(hours=1)).isoformat(),
+            "recurrence_type": "daily",
+            "recurrence_end_date": (start_date + timedelta(days=4)).isoformat()
+        },
+        headers=admin_auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    response = client.get(
+        f"/api/v1/schedules/calendar/{test_tenant.id}?year={start_date.year}&month={start_date.month}",
+        headers=admin_auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    days = response.json()
+    assert len(days[0]["schedules"]) == 1 and days[0]["occurrences"] == []
+    assert [len(day["occurrences"]) for day in days[1:6]] == [1, 1, 1, 1, 0]
+
+def test_get_calendar_heatmap(client, admin_auth_headers, test_tenant, test_admin_user,
+                              test_regular_user, test_category, test_product):
+    """Testa mapa de calor agregado por dia, profissional e status"""
+    day = (datetime.now() + timedelta(days=3)).replace(hour=3, minute=0, second=0, microsecond=0)
+    
+    response = client.post("/api/v1/schedules",
+        json={
+            "provider_id": str(test_admin_user.id),
+            "user_id": str(test_regular_user.id),
+            "category_id": str(test_category.id),
+            "product_id": str(test_product.id),
+            "tenant_id": test_tenant.id,
+            "start_date": day.isoformat(),
+            "end_date": (day + timedelta(minutes=45)).isoformat()
+        },
+        headers=admin_auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    response = client.get(f"/api/v1/schedules/calendar/{test_tenant.id}/heatmap", params={
+        "start_date": (day - timedelta(days=1)).date().isoformat(),
+        "end_date": (day + timedelta(days=1)).date().isoformat()
+    }, headers=admin_auth_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    rows = response.json()["rows"]
+    assert len(rows) == 1
+    assert rows[0]["status"] == "active"
+    assert rows[0]["counts"] == [0, 1, 0]
+    assert rows[0]["minutes"] == [0, 45, 0]
+
+def test_get_calendar_heatmap_recurring_first_day(client, admin_auth_headers, test_tenant, test_admin_user,
+                                                  test_regular_user, test_category, test_product):
+    """Testa que o início da série fora dos dias da semana não entra no mapa de calor"""
+    monday = (datetime.now() + timedelta(days=7 - datetime.now().weekday())).replace(
+        hour=3, minute=0, second=0, microsecond=0
+    )
+    
+    response = client.post("/api/v1/schedules",
+        json={
+            "provider_id": str(test_admin_user.id),
+            "user_id": str(test_regular_user.id),
+            "category_id": str(test_category.id),
+            "product_id": str(test_product.id),
+            "tenant_id": test_tenant.id,
+            "start_date": monday.isoformat(),
+            "end_date": (monday + timedelta(minutes=30)).isoformat(),
+            "recurrence_type": "weekly",
+            "recurrence_days": ["wednesday"],
+            "recurrence_end_date": (monday + timedelta(days=6)).isoformat()
+        },
+        headers=admin_auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    response = client.get(f"/api/v1/schedules/calendar/{test_tenant.id}/heatmap", params={
+        "start_date": monday.date().isoformat(),
+        "end_date": (monday + timedelta(days=2)).date().isoformat()
+    }, headers=admin_auth_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["rows"][0]["counts"] == [0, 0, 1]
+
+def test_get_resource_view(client, admin_auth_headers, test_tenant, test_admin_user,
+                           test_regular_user, test_category, test_product):
+    """Testa visão por recurso em formato colunar"""
+    day = (datetime.now() + timedelta(days=4)).replace(hour=2, minute=0, second=0, microsecond=0)
+    
+    response = client.post("/api/v1/schedules",
+        json={
+            "provider_id": str(test_admin_user.id),
+            "user_id": str(test_regular_user.id),
+            "category_id": str(test_category.id),
+            "product_id": str(test_product.id),
+            "tenant_id": test_tenant.id,
+            "start_date": day.isoformat(),
+            "end_date": (day + timedelta(minutes=30)).isoformat()
+        },
+        headers=admin_auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    response = client.get(f"/api/v1/schedules/resource-view/{test_tenant.id}",
+        params={"day": day.date().isoformat()},
+        headers=admin_auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["ends"][0] - data["starts"][0] == 30 * 60
+    assert data["provider_ids"][data["provider"][0]] == str(test_admin_user.id)
+    assert data["product_names"][data["product"][0]] == test_product.name
+    assert data["statuses"][data["status"][0]] == "active"
+
+def test_export_schedules_stream(client, admin_auth_headers, test_tenant, test_admin_user,
+                                 test_regular_user, test_category, test_product):
+    """Testa exportação em NDJSON e CSV do período"""
+    day = (datetime.now() + timedelta(days=5)).replace(hour=4, minute=0, second=0, microsecond=0)
+    
+    response = client.post("/api/v1/schedules",
+        json={
+            "provider_id": str(test_admin_user.id),
+            "user_id": str(test_regular_user.id),
+            "category_id": str(test_category.id),
+            "product_id": str(test_product.id),
+            "tenant_id": test_tenant.id,
+            "start_date": day.isoformat(),
+            "end_date": (day + timedelta(minutes=30)).isoformat()
+        },
+        headers=admin_auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    params = {
+        "start_date": (day - timedelta(days=1)).isoformat(),
+        "end_date": (day + timedelta(days=1)).isoformat()
+    }
+    response = client.get(f"/api/v1/schedules/export/{test_tenant.id}",
+                         params=params, headers=admin_auth_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 1
+    assert rows[0]["product_name"] == test_product.name
+    
+    response = client.get(f"/api/v1/schedules/export/{test_tenant.id}",
+                         params={**params, "format": "csv"}, headers=admin_auth_headers)
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,start_date,end_date,status")
+    assert len(lines) == 2
+
+def wait_import(client, job_id, headers):
+    """Aguarda o processamento em segundo plano da importação"""
+    for _ in range(50):
+        data = client.get(f"/api/v1/imports/{job_id}", headers=headers).json()
+        if data["status"] in ("completed", "failed"):
+            break
+        time.sleep(0.1)
+    return data
+
+def test_import_schedules_csv(client, admin_auth_headers, test_tenant, test_admin_user,
+                              test_regular_user, test_category, test_product):
+    """Testa importação de CSV com erros e conflitos por linha"""
+    day = (datetime.now() + timedelta(days=7)).replace(hour=3, minute=0, second=0, microsecond=0)
+    prefix = f"{test_admin_user.email},{test_regular_user.email},{test_category.name},{test_product.name}"
+    content = "\n".join([
+        "profissional_email,usuario_email,categoria,produto,data_inicio,data_fim,preco",
+        f"{prefix},{day.isoformat()},{(day + timedelta(minutes=30)).isoformat()},150.50",
+        f"{prefix},{(day + timedelta(minutes=15)).isoformat()},,",
+        f"naoexiste@teste.com,{test_regular_user.email},{test_category.name},{test_product.name},{day.isoformat()},,",
+        f"{prefix},2020-01-01 09:00,,",
+    ])
+    
+    response = client.post("/api/v1/schedules/import/csv",
+        files={"file": ("agenda.csv", content.encode(), "text/csv")},
+        data={"tenant_id": test_tenant.id},
+        headers=admin_auth_headers
+    )
+    
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    data = wait_import(client, response.json()["id"], admin_auth_headers)
+    
+    assert data["status"] == "completed"
+    assert data["rows_done"] == 4
+    assert data["new_records"] == 1
+    assert [conflict["row"] for conflict in data["conflicts_found"]] == [3]
+    assert data["errors"] == [
+        {"row": 4, "error": "Profissional com email 'naoexiste@teste.com' não encontrado"},
+        {"row": 5, "error": "Não é possível agendar no passado"}
+    ]
+
+def test_import_schedules_csv_dry_run_reports_conflicts(client, admin_auth_headers, test_tenant, test_admin_user,
+                                                        test_regular_user, test_category, test_product):
+    """Testa que o dry_run reporta os conflitos de horário sem gravar"""
+    day = (datetime.now() + timedelta(days=8)).replace(hour=3, minute=0, second=0, microsecond=0)
+    prefix = f"{test_admin_user.email},{test_regular_user.email},{test_category.name},{test_product.name}"
+    content = "\n".join([
+        "profissional_email,usuario_email,categoria,produto,data_inicio,data_fim",
+        f"{prefix},{day.isoformat()},{(day + timedelta(minutes=30)).isoformat()}",
+        f"{prefix},{(day + timedelta(minutes=15)).isoformat()},",
+    ])
+    
+    response = client.post("/api/v1/schedules/import/csv",
+        files={"file": ("agenda.csv", content.encode(), "text/csv")},
+        data={"tenant_id": test_tenant.id, "dry_run": "true"},
+        headers=admin_auth_headers
+    )
+    data = wait_import(client, response.json()["id"], admin_auth_headers)
+    
+    assert data["status"] == "completed"
+    assert data["new_records"] == 0
+    assert data["errors"] == []
+    assert [(conflict["row"], conflict["conflict"]) for conflict in data["conflicts_found"]] == [
+        (3, "Horário em conflito com outra linha do arquivo")
+    ]
+    
+    response = client.post("/api/v1/schedules/check-availability", json={
+        "provider_id": str(test_admin_user.id),
+        "date": day.date().isoformat(),
+        "start_time": "03:00",
+        "end_time": "03:30"
+    })
+    assert response.json()["available"] is True
+
+def test_import_recurring_schedules_csv(client, admin_auth_headers, test_tenant, test_admin_user,
+                                        test_regular_user, test_category, test_product):
+    """Testa importação de séries recorrentes com conflito em uma ocorrência"""
+    monday = (datetime.now() + timedelta(days=7 - datetime.now().weekday())).replace(
+        hour=2, minute=0, second=0, microsecond=0
+    )
+    
+    # Ocupar a segunda ocorrência da primeira série
+    busy = monday + timedelta(days=7)
+    response = client.post("/api/v1/schedules",
+        json={
+            "provider_id": str(test_admin_user.id),
+            "user_id": str(test_regular_user.id),
+            "category_id": str(test_category.id),
+            "product_id": str(test_product.id),
+            "tenant_id": test_tenant.id,
+            "start_date": busy.isoformat(),
+            "end_date": (busy + timedelta(minutes=30)).isoformat()
+        },
+        headers=admin_auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    
+    prefix = f"{test_admin_user.email},{test_regular_user.email},{test_category.name},{test_product.name}"
+    series_end = (monday + timedelta(days=20)).date().isoformat()
+    afternoon = monday.replace(hour=4)
+    content = "\n".join([
+        "profissional_email,usuario_email,categoria,produto,data_inicio,data_fim,preco,"
+        "recorrencia,dias_recorrencia,data_fim_recorrencia",
+        f"{prefix},{monday.isoformat()},,,weekly,monday,{series_end}",
+        f"{prefix},{afternoon.isoformat()},,,weekly,\"monday,wednesday\",{series_end}",
+        f"{prefix},{afternoon.isoformat()},,,monthly,,",
+    ])
+    
+    response = client.post("/api/v1/schedules/import/csv",
+        files={"file": ("agenda.csv", content.encode(), "text/csv")},
+        data={"tenant_id": test_tenant.id},
+        headers=admin_auth_headers
+    )
+    data = wait_import(client, response.json()["id"], admin_auth_headers)
+    
+    assert data["status"] == "completed"
+    assert data["new_records"] == 1
+    assert data["conflicts_found"][0]["row"] == 2
+    assert data["conflicts_found"][0]["dates"] == [busy.date().isoformat()]
+    assert data["errors"] == [{"row": 4, "error": "Data de término da recorrência é obrigatória"}]
+    
+    # A série importada ocupa a quarta-feira seguinte
+    wednesday = afternoon + timedelta(days=2)
+    response = client.post("/api/v1/schedules/check-availability", json={
+        "provider_id": str(test_admin_user.id),
+        "date": wednesday.date().isoformat(),
+        "start_time": "04:00",
+        "end_time": "04:30"
+    })
+    assert response.json()["available"] is False
+
+def test_reimport_schedules_csv_is_idempotent(client, admin_auth_headers, test_tenant, test_admin_user,
+                                              test_regular_user, test_category, test_product):
+    """Testa que reimportar o mesmo arquivo só reporta duplicados"""
+    day = (datetime.now() + timedelta(days=9)).replace(hour=4, minute=0, second=0, microsecond=0)
+    prefix = f"{test_admin_user.email},{test_regular_user.email},{test_category.name},{test_product.name}"
+    row = f"{prefix},{day.isoformat()},{(day + timedelta(minutes=30)).isoformat()}"
+    content = "\n".join(["profissional_email,usuario_email,categoria,produto,data_inicio,data_fim", row, row])
+    
+    def upload():
+        response = client.post("/api/v1/schedules/import/csv",
+            files={"file": ("agenda.csv", content.encode(), "text/csv")},
+            data={"tenant_id": test_tenant.id},
+            headers=admin_auth_headers
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        return wait_import(client, response.json()["id"], admin_auth_headers)
+    
+    first = upload()
+    assert first["new_records"] == 1
+    assert [(item["row"], item["duplicate_of_row"]) for item in first["duplicates_found"]] == [(3, 2)]
+    
+    second = upload()
+    assert second["new_records"] == 0
+    assert second["conflicts_found"] == []
+    assert [item["row"] for item in second["duplicates_found"]] == [2, 3]
+    assert len({item["existing_schedule"]["id"] for item in second["duplicates_found"]}) == 1
@@ -0,0 +1,38 @@
+from datetime import datetime
+from openpyxl import Workbook
+
+from app.utils.spreadsheet import read_chunks
+
+def test_read_excel_chunks(tmp_path):
+    """Testa leitura de .xlsx em blocos, ignorando linhas vazias"""
+    path = tmp_path / "agenda.xlsx"
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["nome", "preco", "data_inicio"])
+    sheet.append(["Consulta", 15000, datetime(2030, 1, 10, 9, 30)])
+    sheet.append([None, None, None])
+    sheet.append(["Retorno", 150.5, None])
+    sheet.append(["Exame", None, None])
+    workbook.save(path)
+    
+    chunks = list(read_chunks(str(path), chunk_size=2))
+    
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert list(chunks[0].columns) == ["nome", "preco", "data_inicio"]
+    assert chunks[0]["preco"].tolist() == [15000, 150.5]
+    assert chunks[0]["data_inicio"][0] == datetime(2030, 1, 10, 9, 30)
+    
+    # dtype=str: mesmo formato do read_csv usado na importação de agendamentos
+    chunk = next(read_chunks(str(path), chunk_size=2, dtype=str))
+    assert chunk["preco"].tolist() == ["15000", "150.5"]
+    assert chunk["data_inicio"].tolist() == ["2030-01-10 09:30:00", None]
+
+def test_read_csv_chunks(tmp_path):
+    """Testa que arquivos sem extensão de planilha são lidos como CSV"""
+    path = tmp_path / "agenda.csv"
+    path.write_text("nome,preco\nConsulta,15000\nRetorno,150.50\nExame,\n")
+    
+    chunks = list(read_chunks(str(path), chunk_size=2, dtype=str))
+    
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[0]["preco"].tolist() == ["15000", "150.50"]
@@ -117,6 +117,7 @@ export default function Calendar() {
         params: {
           start_date: startDate,
           end_date: endDate,
+          expand: 'provider,user,category,product',
         },
       });
       setSchedules(response.data);
@@ -49,7 +49,7 @@ import { useForm, Controller } from 'react-hook-form';
 import { yupResolver } from '@hookform/resolvers/yup';
 import * as yup from 'yup';
 import { toast } from 'react-toastify';
-import api from '../services/api';
+import api, { waitForImport } from '../services/api';
 import { useAuth } from '../contexts/AuthContext';
 import ImportDialog from '../components/ImportDialog';
 
@@ -224,15 +224,16 @@ export default function Categories() {
       const response = await api.post('/api/v1/categories/import/csv', formData, {
         headers: { 'Content-Type': 'multipart/form-data' },
       });
+      const result = await waitForImport(response.data.id);
 
-      if (response.data.duplicates_found?.length > 0) {
-        setDuplicates(response.data.duplicates_found);
+      if (result.duplicates_found?.length > 0) {
+        setDuplicates(result.duplicates_found);
       }
 
-      toast.success(`Importação concluída! ${response.data.new_records} novas categorias.`);
+      toast.success(`Importação concluída! ${result.new_records} novas categorias.`);
       
-      if (response.data.errors?.length > 0) {
-        console.warn('Erros na importação:', response.data.errors);
+      if (result.errors?.length > 0) {
+        console.warn('Erros na importação:', result.errors);
       }
 
       setOpenImportDialog(false);
@@ -54,7 +54,7 @@ import { yupResolver } from '@hookform/resolvers/yup';
 import * as yup from 'yup';
 import { toast } from 'react-toastify';
 import * as XLSX from 'xlsx';
-import api from '../services/api';
+import api, { waitForImport } from '../services/api';
 import { useAuth } from '../contexts/AuthContext';
 import UserDetails from '../components/Users/UserDetails';
 import ImportDialog from '../components/ImportDialog';
@@ -235,15 +235,16 @@ export default function Users() {
       const response = await api.post('/api/v1/users/import/csv', formData, {
         headers: { 'Content-Type': 'multipart/form-data' },
       });
+      const result = await waitForImport(response.data.id);
 
-      if (response.data.duplicates_found?.length > 0) {
-        setDuplicates(response.data.duplicates_found);
+      if (result.duplicates_found?.length > 0) {
+        setDuplicates(result.duplicates_found);
       }
 
-      toast.success(`Importação concluída! ${response.data.new_records} novos registros.`);
+      toast.success(`Importação concluída! ${result.new_records} novos registros.`);
       
-      if (response.data.errors?.length > 0) {
-        console.warn('Erros na importação:', response.data.errors);
+      if (result.errors?.length > 0) {
+        console.warn('Erros na importação:', result.errors);
       }
 
       setOpenImportDialog(false);
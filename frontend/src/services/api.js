@@ -26,4 +26,18 @@ api.interceptors.response.use(
   }
 );
 
+// Importações rodam em segundo plano: acompanha o job até terminar
+export const waitForImport = async (jobId, intervalMs = 1000) => {
+  for (;;) {
+    const { data } = await api.get(`/api/v1/imports/${jobId}`);
+    if (data.status === 'completed') {
+      return data;
+    }
+    if (data.status === 'failed') {
+      throw new Error(data.detail);
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
 export default api;
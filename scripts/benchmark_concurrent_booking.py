@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Dispara N agendamentos simultâneos para o mesmo horário e mede vazão e conflitos.
+
+Uso:
+    python scripts/benchmark_concurrent_booking.py --requests 50 --workers 16
+
+Sem a constraint de exclusão, mais de um agendamento pode ser criado para o
+mesmo horário; com ela, exatamente um deve ter sucesso e os demais recebem 409.
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+import argparse
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from app import models, schemas
+from app.database import SessionLocal
+from app.services.schedule_service import ScheduleService
+
+def pick_product(db, product_id=None):
+    """Seleciona o produto (e seu profissional) usado no teste"""
+    query = db.query(models.Product).filter(models.Product.is_deleted == False)
+    if product_id:
+        query = query.filter(models.Product.id == product_id)
+    product = query.first()
+    if not product:
+        raise SystemExit("Nenhum produto encontrado para o benchmark")
+    return product
+
+def book(start_signal, schedule_data, provider_id):
+    """Cria um agendamento em sessão própria e retorna (resultado, latência)"""
+    db = SessionLocal()
+    try:
+        current_user = db.query(models.User).filter(models.User.id == provider_id).first()
+        service = ScheduleService(db, current_user)
+        start_signal.wait()
+        started = time.perf_counter()
+        try:
+            schedule = service.create_schedule(schedule_data)
+            return 'created', time.perf_counter() - started, schedule.id
+        except HTTPException as e:
+            return f'http_{e.status_code}', time.perf_counter() - started, None
+        except Exception as e:
+            return type(e).__name__, time.perf_counter() - started, None
+    finally:
+        db.close()
+
+def run(requests: int, workers: int, product_id=None, keep: bool = False):
+    db = SessionLocal()
+    product = pick_product(db, product_id)
+
+    # Horário único, fora do expediente, para não colidir com dados reais
+    start_date = (datetime.now() + timedelta(days=400)).replace(hour=3, minute=0, second=0, microsecond=0)
+    schedule_data = schemas.ScheduleCreate(
+        provider_id=product.professional_id,
+        user_id=product.professional_id,
+        category_id=product.category_id,
+        product_id=product.id,
+        tenant_id=product.tenant_id,
+        start_date=start_date,
+        end_date=start_date + timedelta(minutes=30)
+    )
+
+    # Todas as threads abrem sessão e aguardam o sinal para disparar juntas
+    start_signal = threading.Event()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(book, start_signal, schedule_data, product.professional_id)
+            for _ in range(requests)
+        ]
+        time.sleep(0.5)
+        started = time.perf_counter()
+        start_signal.set()
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - started
+
+    outcomes = Counter(outcome for outcome, _, _ in results)
+    latencies = sorted(latency for _, latency, _ in results)
+
+    print(f"Requisições:   {requests} ({workers} em paralelo)")
+    print(f"Tempo total:   {elapsed:.3f}s")
+    print(f"Vazão:         {requests / elapsed:.1f} req/s")
+    print(f"Latência p50:  {latencies[len(latencies) // 2] * 1000:.1f} ms")
+    print(f"Latência p95:  {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome}: {count}")
+
+    created = [schedule_id for outcome, _, schedule_id in results if outcome == 'created']
+    if len(created) > 1:
+        print(f"ATENÇÃO: {len(created)} agendamentos criados para o mesmo horário (double booking)")
+
+    if not keep and created:
+        db.query(models.Schedule).filter(models.Schedule.id.in_(created)).delete(synchronize_session=False)
+        db.commit()
+    db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--product-id', default=None)
+    parser.add_argument('--keep', action='store_true', help="Mantém os agendamentos criados")
+    args = parser.parse_args()
+
+    run(args.requests, args.workers, args.product_id, args.keep)
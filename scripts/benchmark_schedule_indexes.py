@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Compara planos e latências das consultas de agendamentos antes e depois dos índices.
+
+Uso:
+    python scripts/benchmark_schedule_indexes.py --rows 3000000 --repeat 30
+
+Cria uma cópia UNLOGGED de `schedules` (bench_schedules) com N linhas
+sintéticas, roda as consultas mais frequentes só com a chave primária,
+cria os índices da migração 0002 (mais o GiST da constraint de exclusão,
+como índice comum) e repete as medições. Requer PostgreSQL.
+"""
+import sys
+import os
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.append(BACKEND_DIR)
+
+import argparse
+import importlib.util
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from app.database import engine
+
+TABLE = "bench_schedules"
+
+# Mesmas expressões usadas pelos serviços (period_overlaps/period_within no PostgreSQL)
+QUERIES = {
+    "disponibilidade (profissional + período, ativos)": """
+        SELECT id FROM bench_schedules
+        WHERE provider_id = :provider_id AND is_deleted = false AND status = 'ACTIVE'
+          AND tstzrange(start_date, end_date, '[)') && tstzrange(:start, :end, '[)')
+        LIMIT 1
+    """,
+    "calendário do mês (tenant + período)": """
+        SELECT id, start_date FROM bench_schedules
+        WHERE tenant_id = :tenant_id AND is_deleted = false
+          AND tstzrange(start_date, end_date, '[)') && tstzrange(:month_start, :month_end, '[)')
+        ORDER BY start_date
+    """,
+    "próximos do tenant (tenant + start_date)": """
+        SELECT id FROM bench_schedules
+        WHERE tenant_id = :tenant_id AND is_deleted = false AND start_date >= :start
+        ORDER BY start_date, id
+        LIMIT 50
+    """,
+    "agendamentos do cliente (user + start_date)": """
+        SELECT id FROM bench_schedules
+        WHERE user_id = :user_id AND is_deleted = false AND start_date >= :start
+        ORDER BY start_date
+        LIMIT 20
+    """,
+    "séries recorrentes do tenant": """
+        SELECT id FROM bench_schedules
+        WHERE tenant_id = :tenant_id AND is_deleted = false AND recurrence_type <> 'NONE'
+          AND start_date < :month_end
+    """,
+}
+
+# Índice equivalente à constraint schedules_provider_no_overlap (dados sintéticos se sobrepõem)
+EXCLUSION_INDEX = f"""
+    CREATE INDEX IF NOT EXISTS bench_schedules_provider_no_overlap
+    ON {TABLE} USING gist (provider_id, tstzrange(start_date, end_date, '[)'))
+    WHERE is_deleted = false AND status = 'ACTIVE'
+"""
+
+def load_migration_indexes():
+    """Lê os índices da migração 0002, mantendo uma única definição"""
+    path = os.path.join(BACKEND_DIR, 'migrations', 'versions', '0002_schedule_hot_path_indexes.py')
+    spec = importlib.util.spec_from_file_location('schedule_hot_path_indexes', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def enum_type(conn, column: str) -> str:
+    return conn.execute(text(
+        "SELECT udt_name FROM information_schema.columns "
+        "WHERE table_name = 'schedules' AND column_name = :column"
+    ), {"column": column}).scalar_one()
+
+def populate(conn, rows: int, tenants: int, providers: int, users: int):
+    """Gera as linhas no banco com generate_series (sem tráfego pelo driver)"""
+    status_type = enum_type(conn, 'status')
+    recurrence_type = enum_type(conn, 'recurrence_type')
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    conn.execute(text(f"CREATE UNLOGGED TABLE {TABLE} (LIKE schedules INCLUDING DEFAULTS)"))
+    conn.execute(text(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)"))
+    conn.execute(text(f"""
+        INSERT INTO {TABLE} (
+            id, created_at, created_by_id, updated_at, updated_by_id, is_deleted, status,
+            start_date, end_date, recurrence_type,
+            provider_id, user_id, category_id, product_id, tenant_id
+        )
+        SELECT
+            md5('s' || g)::uuid, now(), provider_id, now(), provider_id,
+            random() < 0.05,
+            (CASE WHEN random() < 0.9 THEN 'ACTIVE' ELSE 'CANCELLED' END)::{status_type},
+            start_date, start_date + interval '30 minutes',
+            (CASE WHEN random() < 0.001 THEN 'WEEKLY' ELSE 'NONE' END)::{recurrence_type},
+            provider_id, md5('u' || (g % :users))::uuid,
+            md5('c' || (g % 50))::uuid, md5('p' || (g % 500))::uuid,
+            1 + (g % :tenants)
+        FROM (
+            SELECT
+                g,
+                md5('prof' || (g % :providers))::uuid AS provider_id,
+                date_trunc('hour', now()) - interval '365 days'
+                    + floor(random() * 730 * 24 * 4) * interval '15 minutes' AS start_date
+            FROM generate_series(1, :rows) AS g
+        ) AS source
+    """), {"rows": rows, "tenants": tenants, "providers": providers, "users": users})
+    conn.execute(text(f"ANALYZE {TABLE}"))
+
+def random_params(tenants: int, providers: int, users: int) -> dict:
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    start = now + timedelta(days=random.randint(-300, 300), hours=random.randint(0, 23))
+    month_start = start.replace(day=1, hour=0)
+    return {
+        "provider_id": f"{random.randrange(providers)}",
+        "tenant_id": 1 + random.randrange(tenants),
+        "user_id": f"{random.randrange(users)}",
+        "start": start,
+        "end": start + timedelta(minutes=30),
+        "month_start": month_start,
+        "month_end": (month_start + timedelta(days=32)).replace(day=1),
+    }
+
+def bind(conn, params: dict) -> dict:
+    """Converte os ids sintéticos para os mesmos UUIDs gerados no INSERT"""
+    provider_id, user_id = conn.execute(
+        text("SELECT md5('prof' || :provider)::uuid, md5('u' || :user)::uuid"),
+        {"provider": params["provider_id"], "user": params["user_id"]}
+    ).one()
+    return {**params, "provider_id": provider_id, "user_id": user_id}
+
+def measure(conn, label: str, param_sets: list):
+    """Mostra o plano de uma execução e as latências das demais"""
+    print(f"\n=== {label} ===")
+    for name, sql in QUERIES.items():
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), param_sets[0]).scalars().all()
+        latencies = []
+        for params in param_sets:
+            started = time.perf_counter()
+            conn.execute(text(sql), params).all()
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        print(f"\n-- {name}")
+        print(f"   p50 {latencies[len(latencies) // 2] * 1000:.2f} ms | "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.2f} ms")
+        for line in plan:
+            print(f"   {line}")
+
+def run(rows: int, repeat: int, tenants: int, providers: int, users: int, keep: bool = False):
+    if engine.dialect.name != 'postgresql':
+        raise SystemExit("O benchmark requer PostgreSQL")
+
+    migration = load_migration_indexes()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+
+        started = time.perf_counter()
+        populate(conn, rows, tenants, providers, users)
+        print(f"{rows} linhas geradas em {time.perf_counter() - started:.1f}s")
+
+        param_sets = [bind(conn, random_params(tenants, providers, users)) for _ in range(repeat)]
+        try:
+            measure(conn, "Antes (somente chave primária)", param_sets)
+
+            started = time.perf_counter()
+            for statement in migration.index_statements(postgresql=True, table_prefix="bench_"):
+                if f" ON {TABLE}" in statement:
+                    conn.execute(text(statement))
+            conn.execute(text(EXCLUSION_INDEX))
+            conn.execute(text(f"ANALYZE {TABLE}"))
+            print(f"\nÍndices criados em {time.perf_counter() - started:.1f}s")
+
+            measure(conn, "Depois (índices da migração 0002)", param_sets)
+        finally:
+            if not keep:
+                conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=3000000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--tenants', type=int, default=20)
+    parser.add_argument('--providers', type=int, default=500)
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--keep', action='store_true', help="Mantém a tabela bench_schedules")
+    args = parser.parse_args()
+
+    run(args.rows, args.repeat, args.tenants, args.providers, args.users, args.keep)